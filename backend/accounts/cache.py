@@ -0,0 +1,56 @@
+"""
+Per-user dashboard cache.
+
+Like the course caches, each user has a version counter that writes to
+their enrollments, group memberships, watch progress or read watermarks
+bump (see accounts.signals, courses.enrollment, courses.progress and
+groups.unread). The cached dashboard is keyed by that version, so a
+dashboard built while a write lands is stored under a version nobody
+reads any more. Entries also expire
+after DASHBOARD_CACHE_TIMEOUT seconds, which bounds how stale the parts
+nothing bumps for (new messages from others, session schedules) can get.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'dashboard:{pk}:version'
+ENTRY_KEY = 'dashboard:{pk}:v{version}'
+
+
+def get_version(pk):
+    key = VERSION_KEY.format(pk=pk)
+    version = cache.get(key)
+    if version is None:
+        # Seed with a clock value so an evicted version never repeats one
+        # an older entry was stored under
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(user_ids):
+    """Invalidate the users' dashboards once the current transaction commits"""
+    user_ids = set(user_ids)
+
+    def bump():
+        for pk in user_ids:
+            try:
+                cache.incr(VERSION_KEY.format(pk=pk))
+            except ValueError:
+                # Nothing cached for this user yet
+                pass
+
+    # Bumping earlier would let a concurrent read cache the old rows
+    # under the new version
+    transaction.on_commit(bump)
+
+
+def get_entry(pk, version):
+    return cache.get(ENTRY_KEY.format(pk=pk, version=version))
+
+
+def set_entry(pk, version, entry):
+    cache.set(ENTRY_KEY.format(pk=pk, version=version), entry, settings.DASHBOARD_CACHE_TIMEOUT)
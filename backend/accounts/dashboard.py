@@ -0,0 +1,124 @@
+"""
+The logged-in user's dashboard in one response: enrollments with
+progress, groups with unread counts, upcoming sessions and videos to
+continue watching. Each section is one query (two for sessions), whatever
+the number of courses or groups, and the result is cached per user
+(see accounts.cache).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from courses.models import CourseProgress, Enrollment
+from courses.serializers import CourseSummarySerializer
+from groups.calendar import member_group_ids
+from groups.models import GroupMembership, SessionOccurrence
+from groups.recurrence import occurrences_between
+from groups.unread import unread_counts, unread_display
+
+from . import cache as dashboard_cache
+from .serializers import UserSerializer
+
+
+class DashboardEnrollmentSerializer(serializers.ModelSerializer):
+    course = CourseSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Enrollment
+        fields = [
+            'id', 'course', 'enrolled_at', 'progress_percentage',
+            'watched_seconds', 'completed'
+        ]
+        read_only_fields = fields
+
+
+class DashboardGroupSerializer(serializers.ModelSerializer):
+    """A membership annotated by groups.unread.unread_counts"""
+    id = serializers.IntegerField(source='group.id', read_only=True)
+    name = serializers.CharField(source='group.name', read_only=True)
+    slug = serializers.CharField(source='group.slug', read_only=True)
+    member_count = serializers.IntegerField(source='group.member_count', read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
+    unread_display = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GroupMembership
+        fields = [
+            'id', 'name', 'slug', 'member_count', 'role',
+            'last_read_message_id', 'unread_count', 'unread_display'
+        ]
+        read_only_fields = fields
+
+    def get_unread_display(self, obj):
+        return unread_display(obj.unread_count)
+
+
+class DashboardSessionSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(source='session.title', read_only=True)
+    session_type = serializers.CharField(source='session.session_type', read_only=True)
+    meeting_link = serializers.URLField(source='session.meeting_link', read_only=True)
+    group_name = serializers.CharField(source='session.group.name', read_only=True)
+
+    class Meta:
+        model = SessionOccurrence
+        fields = [
+            'session', 'group', 'group_name', 'title', 'session_type',
+            'meeting_link', 'start_time', 'end_time'
+        ]
+        read_only_fields = fields
+
+
+class ContinueWatchingSerializer(serializers.ModelSerializer):
+    course = serializers.IntegerField(source='enrollment.course_id', read_only=True)
+    course_title = serializers.CharField(source='enrollment.course.title', read_only=True)
+    video_title = serializers.CharField(source='video.title', read_only=True)
+    duration_seconds = serializers.IntegerField(source='video.duration_seconds', read_only=True)
+
+    class Meta:
+        model = CourseProgress
+        fields = [
+            'course', 'course_title', 'video', 'video_title',
+            'duration_seconds', 'watched_seconds', 'last_watched_at'
+        ]
+        read_only_fields = fields
+
+
+def build_dashboard(user, context=None):
+    now = timezone.now()
+    enrollments = (
+        Enrollment.objects.filter(student=user)
+        .select_related('course__creator')
+        .order_by('-enrolled_at')
+    )
+    memberships = unread_counts(user).select_related('group')
+    sessions = occurrences_between(
+        now,
+        now + timedelta(days=settings.DASHBOARD_SESSION_DAYS),
+        group_id__in=member_group_ids(user),
+    )[:settings.DASHBOARD_ITEM_LIMIT]
+    watching = (
+        CourseProgress.objects.filter(
+            enrollment__student=user, completed=False, watched_seconds__gt=0
+        )
+        .select_related('video', 'enrollment__course')
+        .order_by('-last_watched_at')[:settings.DASHBOARD_ITEM_LIMIT]
+    )
+    return {
+        'user': UserSerializer(user, context=context).data,
+        'enrollments': DashboardEnrollmentSerializer(enrollments, many=True).data,
+        'groups': DashboardGroupSerializer(memberships, many=True).data,
+        'next_sessions': DashboardSessionSerializer(sessions, many=True).data,
+        'continue_watching': ContinueWatchingSerializer(watching, many=True).data,
+    }
+
+
+def get_dashboard(user, context=None):
+    """The user's dashboard, from the cache when nothing changed since it was built"""
+    version = dashboard_cache.get_version(user.pk)
+    entry = dashboard_cache.get_entry(user.pk, version)
+    if entry is None:
+        entry = build_dashboard(user, context)
+        dashboard_cache.set_entry(user.pk, version, entry)
+    return entry
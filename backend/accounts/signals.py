@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Enrollment
+from groups.models import GroupMembership
+from . import cache as dashboard_cache
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def refresh_student_dashboard(sender, instance, **kwargs):
+    dashboard_cache.bump_versions([instance.student_id])
+
+
+@receiver(post_save, sender=GroupMembership)
+@receiver(post_delete, sender=GroupMembership)
+def refresh_member_dashboard(sender, instance, **kwargs):
+    dashboard_cache.bump_versions([instance.user_id])
+
+
+@receiver(post_save, sender=get_user_model())
+def refresh_own_dashboard(sender, instance, created=False, update_fields=None, **kwargs):
+    # The dashboard carries the profile; logins only touch last_login
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    dashboard_cache.bump_versions([instance.pk])
@@ -1,3 +1,85 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from courses.enrollment import bulk_enroll
+from courses.models import Course, Enrollment, Video
+from courses.progress import ProgressBuffer
+from groups.models import GroupMembership, GroupMessage, StudyGroup, StudySession
+
+User = get_user_model()
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', email='s@example.com')
+        self.instructor = User.objects.create_user(username='instructor', email='i@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_course_and_group(self, n):
+        course = Course.objects.create(title=f'Course {n}', description='d', creator=self.instructor)
+        video = Video.objects.create(course=course, title='Intro', duration_seconds=600)
+        enrollment = Enrollment.objects.create(student=self.user, course=course)
+        ProgressBuffer(interval=0).add(enrollment.pk, video.pk, 120)
+
+        group = StudyGroup.objects.create(name=f'Group {n}', description='d', creator=self.instructor)
+        GroupMembership.objects.create(user=self.user, group=group)
+        GroupMessage.objects.create(group=group, sender=self.instructor, content='hi')
+        start = timezone.now() + timedelta(days=1)
+        StudySession.objects.create(
+            group=group, title='Review', facilitator=self.instructor,
+            start_time=start, end_time=start + timedelta(hours=1),
+            is_recurring=True, recurrence_pattern='daily',
+        )
+
+    def dashboard_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_query_count_does_not_grow_with_courses_and_groups(self):
+        self.add_course_and_group(1)
+        _, few = self.dashboard_queries()
+        for n in range(2, 7):
+            self.add_course_and_group(n)
+        data, many = self.dashboard_queries()
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(data['enrollments']), 6)
+        self.assertEqual(len(data['groups']), 6)
+        self.assertEqual(data['groups'][0]['unread_count'], 1)
+        self.assertEqual(len(data['next_sessions']), 5)
+        self.assertEqual(len(data['continue_watching']), 5)
+
+    def test_writes_invalidate_the_cached_dashboard(self):
+        self.client.get('/api/v1/dashboard/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/v1/dashboard/')
+        self.assertEqual(len(queries), 0)
+
+        course = Course.objects.create(title='New', description='d', creator=self.instructor)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_enroll(course, [self.user])
+        self.assertEqual(len(self.client.get('/api/v1/dashboard/').json()['enrollments']), 1)
+
+        group = StudyGroup.objects.create(name='New', description='d', creator=self.instructor)
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupMembership.objects.create(user=self.user, group=group)
+        self.assertEqual(len(self.client.get('/api/v1/dashboard/').json()['groups']), 1)
 
-# Create your tests here.
+    def test_profile_edits_invalidate_the_cached_dashboard(self):
+        self.client.get('/api/v1/dashboard/')
+        self.user.first_name = 'Ada'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get('/api/v1/dashboard/').json()['user']['first_name'], 'Ada')
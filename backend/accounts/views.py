@@ -5,6 +5,7 @@ from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import logout
+from .dashboard import get_dashboard
 from .serializers import UserSerializer, AuthTokenSerializer
 from django.views.generic import TemplateView
 
@@ -59,6 +60,14 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
+class DashboardAPIView(APIView):
+    """Everything the dashboard page shows, in one cached response"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        return Response(get_dashboard(request.user, context={'request': request}))
+
+
 class LoginViewHTML(TemplateView):
     template_name = 'accounts/login.html'
 
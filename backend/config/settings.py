@@ -90,6 +90,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts so concurrent
+            # writers queue on the busy timeout instead of failing with
+            # "database is locked" when a read lock cannot be upgraded
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # A file rather than shared-cache memory, so tests that run
+            # requests from several threads get real locking
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -132,6 +144,8 @@ STATIC_URL = 'static/'
 
 AUTH_USER_MODEL = 'accounts.User'
 
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
@@ -145,6 +159,104 @@ CORS_ALLOW_ALL_ORIGINS = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Archived group chat (see groups.archive) is private, so it is kept
+# outside MEDIA_ROOT, which is served publicly
+GROUP_ARCHIVE_ROOT = os.path.join(BASE_DIR, 'private', 'group_archive')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'group_archive': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': GROUP_ARCHIVE_ROOT},
+    },
+}
+
+# Watch-progress heartbeats are buffered in memory and written in bulk
+# every PROGRESS_FLUSH_INTERVAL seconds or once PROGRESS_FLUSH_SIZE
+# (enrollment, video) pairs are pending, whichever comes first
+PROGRESS_FLUSH_INTERVAL = 5
+PROGRESS_FLUSH_SIZE = 500
+
+# Course recommendations (see courses.recommendations): how many similar
+# courses `manage.py compute_course_similarity` keeps per course and how
+# many shared students a pair needs; how many courses a user is
+# recommended, seeded from their most recent COURSE_RECOMMENDATION_SEEDS
+# enrollments
+COURSE_SIMILARITY_TOP_K = 20
+COURSE_SIMILARITY_MIN_CO_ENROLLMENTS = 2
+COURSE_RECOMMENDATION_LIMIT = 10
+COURSE_RECOMMENDATION_SEEDS = 50
+
+# Group chat history page size (?limit=) and its upper bound
+GROUP_MESSAGE_PAGE_SIZE = 50
+GROUP_MESSAGE_MAX_PAGE_SIZE = 200
+
+# Suggested study groups (see groups.suggestions) are ranked by messages
+# of the last GROUP_ACTIVITY_WINDOW_DAYS, each day's counting half as much
+# every GROUP_ACTIVITY_HALF_LIFE_DAYS; at most GROUP_SUGGESTION_LIMIT are listed
+GROUP_ACTIVITY_WINDOW_DAYS = 28
+GROUP_ACTIVITY_HALF_LIFE_DAYS = 7
+GROUP_SUGGESTION_LIMIT = 20
+
+# Unread counts stop at this many; larger ones show as e.g. "99+"
+GROUP_UNREAD_COUNT_CAP = 99
+
+# `manage.py archive_messages` moves messages older than this many days
+# into compressed segment files of up to GROUP_MESSAGE_SEGMENT_SIZE
+# messages each (see groups.archive)
+GROUP_MESSAGE_ARCHIVE_AFTER_DAYS = 180
+GROUP_MESSAGE_SEGMENT_SIZE = 5000
+
+# Study group resource downloads (see groups.downloads). Set
+# GROUP_RESOURCE_SENDFILE to 'X-Sendfile' (Apache, lighttpd) or
+# 'X-Accel-Redirect' (nginx, with an internal location mapping
+# GROUP_RESOURCE_ACCEL_PREFIX to MEDIA_ROOT) to let the web server stream
+# files. Download counts are written every DOWNLOAD_COUNT_FLUSH_INTERVAL seconds.
+GROUP_RESOURCE_SENDFILE = None
+GROUP_RESOURCE_ACCEL_PREFIX = '/protected-media/'
+DOWNLOAD_COUNT_FLUSH_INTERVAL = 10
+
+# Chunked resource uploads (see groups.uploads): where partial files are
+# assembled (outside MEDIA_ROOT, so unfinished uploads are never served),
+# the largest file accepted, the chunk size suggested to clients, and how
+# long an upload may sit idle before `cleanup_uploads` removes it
+RESOURCE_UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'private', 'resource_uploads')
+RESOURCE_UPLOAD_MAX_SIZE = 500 * 1024 * 1024
+RESOURCE_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+RESOURCE_UPLOAD_EXPIRE_HOURS = 24
+
+# Study session occurrences are materialized this many weeks ahead
+# (see groups.recurrence); calendar windows are capped at
+# SESSION_CALENDAR_MAX_DAYS
+SESSION_OCCURRENCE_WEEKS = 12
+SESSION_CALENDAR_MAX_DAYS = 366
+
+# Longest a single study session may run; conflict checks look this far
+# back for sessions already under way (see groups.calendar)
+SESSION_MAX_DURATION_HOURS = 24
+
+# Most users a single bulk session check-in or check-out may name
+SESSION_ATTENDANCE_BATCH_SIZE = 1000
+
+# /api/v1/dashboard/ (see accounts.dashboard): how long a user's dashboard
+# is cached, how far ahead it lists sessions and how many sessions and
+# continue-watching videos it shows
+DASHBOARD_CACHE_TIMEOUT = 60
+DASHBOARD_SESSION_DAYS = 14
+DASHBOARD_ITEM_LIMIT = 5
+
+# Pub/sub broker for real-time group chat (see groups.realtime), the
+# interval, in seconds, between keepalive comments on idle SSE streams and
+# membership re-checks, and how long a subscription ticket stays valid
+GROUP_CHAT_BROKER = 'groups.realtime.InProcessBroker'
+GROUP_CHAT_KEEPALIVE = 15
+GROUP_CHAT_TICKET_TIMEOUT = 30
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'# for development purpose
 
 # Login URLs
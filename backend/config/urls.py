@@ -4,6 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 from courses import views
+from accounts.views import DashboardAPIView
 
 # Import views
 from courses.views import (
@@ -20,6 +21,8 @@ urlpatterns = [
     # API Endpoints
     path('api/v1/', include('courses.urls')),
     path('api/v1/auth/', include('accounts.urls')),
+    path('api/v1/', include('groups.urls')),
+    path('api/v1/dashboard/', DashboardAPIView.as_view(), name='dashboard-api'),
     
     # HTML Pages
     path('', HomeView.as_view(), name='home'),
@@ -0,0 +1,90 @@
+"""
+Course-level caches.
+
+Each course has a version counter in the cache that is bumped whenever the
+course or one of its videos is written (see courses.signals). Cached
+representations and ETags are keyed by that version, so a conditional
+request can be answered from the cache alone and stale entries simply
+stop being read.
+
+The total video duration of each course is also cached, for progress
+calculations; it is dropped whenever one of the course's videos changes.
+
+Invalidation waits for the writing transaction to commit: a read racing
+the write could otherwise cache the old rows under the new version.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+VERSION_KEY = 'course:{pk}:version'
+ENTRY_KEY = 'course:{pk}:{kind}:v{version}'
+DURATION_KEY = 'course:{pk}:duration'
+
+# How long a rendered representation stays cached; versions never expire
+ENTRY_TIMEOUT = 60 * 60
+
+
+def get_version(pk):
+    key = VERSION_KEY.format(pk=pk)
+    version = cache.get(key)
+    if version is None:
+        # Seed with a clock value so a version evicted from the cache can
+        # never come back as a number an older entry was stored under
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(pk):
+    def bump():
+        try:
+            cache.incr(VERSION_KEY.format(pk=pk))
+        except ValueError:
+            get_version(pk)
+
+    transaction.on_commit(bump)
+
+
+def make_etag(pk, version, kind='api'):
+    return f'"course-{pk}-{kind}-v{version}"'
+
+
+def get_entry(pk, version, kind='api'):
+    return cache.get(ENTRY_KEY.format(pk=pk, kind=kind, version=version))
+
+
+def set_entry(pk, version, entry, kind='api'):
+    cache.set(ENTRY_KEY.format(pk=pk, kind=kind, version=version), entry, ENTRY_TIMEOUT)
+
+
+def get_total_durations(course_ids):
+    """{course id: total duration_seconds of its videos}, aggregating only cache misses"""
+    course_ids = set(course_ids)
+    keys = {DURATION_KEY.format(pk=pk): pk for pk in course_ids}
+    totals = {keys[key]: value for key, value in cache.get_many(keys).items()}
+
+    missing = course_ids - totals.keys()
+    if missing:
+        from .models import Video
+
+        computed = dict(
+            Video.objects.filter(course_id__in=missing)
+            .order_by()
+            .values_list('course_id')
+            .annotate(total=Sum('duration_seconds'))
+        )
+        computed = {pk: computed.get(pk) or 0 for pk in missing}
+        cache.set_many({DURATION_KEY.format(pk=pk): total for pk, total in computed.items()}, None)
+        totals.update(computed)
+    return totals
+
+
+def invalidate_total_duration(pk):
+    key = DURATION_KEY.format(pk=pk)
+    # Now, for progress written later in the same transaction, and again
+    # after commit, for totals other requests cached in between
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
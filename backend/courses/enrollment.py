@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from accounts import cache as dashboard_cache
+
+from . import cache as course_cache
+from .models import Course, Enrollment
+
+User = get_user_model()
+
+
+def resolve_students(user_ids=(), usernames=()):
+    """
+    Look up users by id and username in one query each.
+
+    Returns (users, not_found) where users keeps the order the
+    identifiers were given in and not_found lists unknown identifiers.
+    """
+    by_id = User.objects.in_bulk(list(user_ids)) if user_ids else {}
+    by_name = User.objects.in_bulk(list(usernames), field_name='username') if usernames else {}
+
+    users, seen, not_found = [], set(), []
+    for key, lookup in [(i, by_id) for i in user_ids] + [(n, by_name) for n in usernames]:
+        user = lookup.get(key)
+        if user is None:
+            not_found.append(key)
+        elif user.pk not in seen:
+            seen.add(user.pk)
+            users.append(user)
+    return users, not_found
+
+
+def bulk_enroll(course, users, batch_size=1000):
+    """
+    Enroll `users` into `course` with one INSERT per batch.
+
+    Rows that already exist are skipped through the (student, course)
+    unique constraint, and total_students is recounted once per batch
+    that added rows. Returns {user id: 'created' | 'already_enrolled'}.
+    """
+    enrolled = Enrollment.objects.filter(course=OuterRef('pk')).order_by().values('course')
+    student_count = Coalesce(Subquery(enrolled.annotate(n=Count('pk')).values('n')), 0)
+    report = {}
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        ids = [user.pk for user in batch]
+
+        with transaction.atomic():
+            before = set(
+                Enrollment.objects.filter(course=course, student_id__in=ids)
+                .values_list('student_id', flat=True)
+            )
+            created = [pk for pk in ids if pk not in before]
+            # ignore_conflicts covers a student enrolling on their own between
+            # the two statements. Adding len(created) would then count them
+            # twice, so the counter is recounted instead, an index range count
+            Enrollment.objects.bulk_create(
+                [Enrollment(student_id=pk, course=course) for pk in created],
+                ignore_conflicts=True
+            )
+            if created:
+                Course.objects.filter(pk=course.pk).update(total_students=student_count)
+                course_cache.bump_version(course.pk)
+                # bulk_create sends no post_save for accounts.signals to see
+                dashboard_cache.bump_versions(created)
+            created = set(created)
+
+        for pk in ids:
+            report[pk] = 'created' if pk in created else 'already_enrolled'
+    return report
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from courses.models import Course, CourseTag, Tag, normalize_tags
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the normalized tag table and facet counts from Course.tags'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        courses = list(Course.objects.values_list('id', 'tags'))
+        names = {name for _, tags in courses for name in normalize_tags(tags)}
+
+        with transaction.atomic():
+            Tag.objects.bulk_create(
+                [Tag(name=name) for name in names],
+                ignore_conflicts=True,
+                batch_size=batch_size
+            )
+            tag_ids = dict(Tag.objects.values_list('name', 'id'))
+
+            CourseTag.objects.all().delete()
+            CourseTag.objects.bulk_create(
+                [
+                    CourseTag(course_id=course_id, tag_id=tag_ids[name])
+                    for course_id, tags in courses
+                    for name in normalize_tags(tags)
+                ],
+                batch_size=batch_size
+            )
+
+            counts = dict(
+                CourseTag.objects.filter(course__status='published')
+                .values_list('tag')
+                .annotate(n=Count('id'))
+            )
+            tags = list(Tag.objects.all())
+            for tag in tags:
+                tag.published_course_count = counts.get(tag.id, 0)
+            Tag.objects.bulk_update(tags, ['published_course_count'], batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {len(names)} tags across {len(courses)} courses'
+        ))
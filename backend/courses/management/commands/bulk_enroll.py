@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.enrollment import bulk_enroll, resolve_students
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Enroll a cohort of students, given by username and/or user id, into a course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument(
+            '--username', action='append', default=[], dest='usernames',
+            help='Username of a student to enroll; may be repeated'
+        )
+        parser.add_argument(
+            '--user-id', action='append', type=int, default=[], dest='user_ids',
+            help='User id of a student to enroll; may be repeated'
+        )
+        parser.add_argument('--file', help='File with one username per line')
+        parser.add_argument('--id-file', help='File with one user id per line')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def read_lines(self, path):
+        with open(path) as fh:
+            return [line.strip() for line in fh if line.strip()]
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(pk=options['course_id'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course {options['course_id']} does not exist")
+
+        # Usernames and ids are given apart, so a username made of digits
+        # is never mistaken for somebody else's id
+        usernames = list(options['usernames'])
+        user_ids = list(options['user_ids'])
+        if options['file']:
+            usernames += self.read_lines(options['file'])
+        if options['id_file']:
+            try:
+                user_ids += [int(line) for line in self.read_lines(options['id_file'])]
+            except ValueError as e:
+                raise CommandError(f'Bad user id in {options["id_file"]}: {e}')
+        if not usernames and not user_ids:
+            raise CommandError('No students given')
+
+        users, not_found = resolve_students(user_ids, usernames)
+        report = bulk_enroll(course, users, batch_size=options['batch_size'])
+
+        created = sum(1 for result in report.values() if result == 'created')
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} enrolled, {len(report) - created} already enrolled, '
+            f'{len(not_found)} not found'
+        ))
+        for identifier in not_found:
+            self.stdout.write(self.style.WARNING(f'Not found: {identifier}'))
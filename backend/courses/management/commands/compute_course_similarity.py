@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.recommendations import rebuild_similar_courses
+
+
+class Command(BaseCommand):
+    help = 'Recompute the top-K co-enrollment similar courses of every course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, help='Similar courses kept per course')
+        parser.add_argument('--min-co-enrollments', type=int, help='Shared students a pair needs')
+        parser.add_argument('--batch-size', type=int, default=1024, help='Courses scored per sparse product')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        courses, rows = rebuild_similar_courses(
+            top_k=options['top_k'],
+            min_co_enrollments=options['min_co_enrollments'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} similar courses for {courses} courses '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
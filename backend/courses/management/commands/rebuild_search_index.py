@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.models import Course
+from courses.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the course full-text search index from the course table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = get_backend()
+        total = 0
+
+        with transaction.atomic():
+            backend.clear()
+            batch = []
+            for course in Course.objects.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append(course)
+                if len(batch) >= batch_size:
+                    backend.index(batch)
+                    total += len(batch)
+                    batch = []
+            backend.index(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} courses'))
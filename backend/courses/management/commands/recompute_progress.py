@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.models import Enrollment
+from courses.progress import recount_enrollments
+
+
+class Command(BaseCommand):
+    help = 'Recompute enrollment watched time, progress percentage and completion from CourseProgress'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help='Only recompute enrollments in this course')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        enrollments = Enrollment.objects.order_by('pk')
+        if options['course']:
+            enrollments = enrollments.filter(course_id=options['course'])
+
+        changed = 0
+        with transaction.atomic():
+            batch = []
+            for pk in enrollments.values_list('pk', flat=True).iterator(chunk_size=batch_size):
+                batch.append(pk)
+                if len(batch) >= batch_size:
+                    changed += recount_enrollments(batch)
+                    batch = []
+            changed += recount_enrollments(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Repaired {changed} enrollments'))
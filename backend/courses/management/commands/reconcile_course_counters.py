@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from courses import cache as course_cache
+from courses.models import Course, Enrollment
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Course.total_students from the enrollment table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            students = dict(
+                Enrollment.objects.order_by().values_list('course').annotate(n=Count('pk'))
+            )
+            courses = []
+            for course in Course.objects.only('id', 'total_students'):
+                actual = students.get(course.id, 0)
+                if course.total_students != actual:
+                    course.total_students = actual
+                    courses.append(course)
+            Course.objects.bulk_update(courses, ['total_students'], batch_size=batch_size)
+            for course in courses:
+                course_cache.bump_version(course.pk)
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(courses)} courses'))
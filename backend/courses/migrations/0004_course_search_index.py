@@ -0,0 +1,55 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE courses_course_fts USING fts5("
+            "title, short_description, description, tags, "
+            "tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO courses_course_fts (rowid, title, short_description, description, tags) "
+            "SELECT id, title, short_description, description, replace(tags, ',', ' ') "
+            "FROM courses_course"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE courses_course_search ("
+            "course_id bigint PRIMARY KEY REFERENCES courses_course (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX courses_course_search_document_idx "
+            "ON courses_course_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO courses_course_search (course_id, document) "
+            "SELECT id, "
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', short_description), 'B') || "
+            "setweight(to_tsvector('english', description), 'D') || "
+            "setweight(to_tsvector('english', replace(tags, ',', ' ')), 'B') "
+            "FROM courses_course"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS courses_course_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS courses_course_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_remove_course_average_rating_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_course_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('published_course_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_tags', to='courses.course')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_tags', to='courses.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, related_name='courses', through='courses.CourseTag', to='courses.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='coursetag',
+            index=models.Index(fields=['tag', 'course'], name='courses_cou_tag_id_3ef733_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='coursetag',
+            unique_together={('course', 'tag')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_tag_coursetag_course_tag_set'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='watched_seconds',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_enrollment_watched_seconds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarCourse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('co_enrollments', models.PositiveIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_courses', to='courses.course')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.course')),
+            ],
+            options={
+                'ordering': ['course', 'rank'],
+                'indexes': [models.Index(fields=['course', 'rank'], name='courses_sim_course__5cc46b_idx')],
+                'unique_together': {('course', 'similar')},
+            },
+        ),
+    ]
@@ -1,11 +1,24 @@
 from django.db import models
+from django.db.models import F
 from django.conf import settings
-from django.utils.text import slugify
 from django.utils import timezone
 
+from . import cache as course_cache
+from .utils import save_with_unique_slug
+
 User = settings.AUTH_USER_MODEL
 
 
+def normalize_tags(raw):
+    """Split a comma-separated tag string into unique lower-case names"""
+    names = []
+    for tag in raw.split(',') if raw else []:
+        name = tag.strip().lower()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
 # =========================
 # COURSE
 # =========================
@@ -39,6 +52,12 @@ class Course(models.Model):
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES, default='beginner')
     category = models.CharField(max_length=100, blank=True)
     tags = models.CharField(max_length=200, blank=True)
+    tag_set = models.ManyToManyField(
+        'Tag',
+        through='CourseTag',
+        related_name='courses',
+        blank=True
+    )
 
     # Pricing
     is_paid = models.BooleanField(default=False)
@@ -59,16 +78,34 @@ class Course(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What is stored, so save() can tell whether the tags need syncing
+        if 'tags' in field_names and 'status' in field_names:
+            instance._stored_tags = (instance.tags, instance.status)
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            counter = 1
-            while Course.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        sync_tags = update_fields is None or {'tags', 'status'} & set(update_fields)
+        was_published = False
+        if sync_tags and self.pk:
+            stored = getattr(self, '_stored_tags', None) or Course.objects.filter(
+                pk=self.pk
+            ).values_list('tags', 'status').first()
+            if stored is not None:
+                stored_tags, stored_status = stored
+                was_published = stored_status == 'published'
+                if (
+                    set(normalize_tags(stored_tags)) == set(normalize_tags(self.tags))
+                    and was_published == self.is_published
+                ):
+                    sync_tags = False
+        save_with_unique_slug(self, self.title, super().save, *args, **kwargs)
+        if sync_tags:
+            self.sync_tags(was_published)
+        self._stored_tags = (self.tags, self.status)
 
     def __str__(self):
         return self.title
@@ -77,6 +114,89 @@ class Course(models.Model):
     def tag_list(self):
         return [t.strip() for t in self.tags.split(',')] if self.tags else []
 
+    @property
+    def is_published(self):
+        return self.status == 'published'
+
+    def sync_tags(self, was_published):
+        """
+        Mirror `tags` into the normalized tag table and apply the change
+        to the per-tag published course counts.
+        """
+        old_names = set(
+            CourseTag.objects.filter(course=self).values_list('tag__name', flat=True)
+        )
+        new_names = set(normalize_tags(self.tags))
+
+        if new_names - old_names:
+            Tag.objects.bulk_create(
+                [Tag(name=name) for name in new_names - old_names],
+                ignore_conflicts=True
+            )
+            tag_ids = Tag.objects.filter(
+                name__in=new_names - old_names
+            ).values_list('id', flat=True)
+            CourseTag.objects.bulk_create(
+                [CourseTag(course=self, tag_id=tag_id) for tag_id in tag_ids],
+                ignore_conflicts=True
+            )
+        if old_names - new_names:
+            CourseTag.objects.filter(
+                course=self, tag__name__in=old_names - new_names
+            ).delete()
+
+        counted_before = old_names if was_published else set()
+        counted_now = new_names if self.is_published else set()
+        Tag.adjust_counts(counted_now - counted_before, 1)
+        Tag.adjust_counts(counted_before - counted_now, -1)
+
+
+# =========================
+# TAGS
+# =========================
+class Tag(models.Model):
+    name = models.CharField(max_length=200, unique=True)
+
+    # Maintained incrementally by Course.sync_tags
+    published_course_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def adjust_counts(cls, names, delta):
+        if not names:
+            return
+        tags = cls.objects.filter(name__in=names)
+        if delta < 0:
+            tags = tags.filter(published_course_count__gte=-delta)
+        tags.update(published_course_count=F('published_course_count') + delta)
+
+
+class CourseTag(models.Model):
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='course_tags'
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='course_tags'
+    )
+
+    class Meta:
+        unique_together = ('course', 'tag')
+        indexes = [
+            models.Index(fields=['tag', 'course']),
+        ]
+
+    def __str__(self):
+        return f"{self.course} #{self.tag}"
+
 
 # =========================
 # VIDEO (LECTURES)
@@ -133,6 +253,8 @@ class Enrollment(models.Model):
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed = models.BooleanField(default=False)
     progress_percentage = models.FloatField(default=0.0)
+    # Sum of credited seconds over CourseProgress, maintained incrementally
+    watched_seconds = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = ('student', 'course')
@@ -142,11 +264,14 @@ class Enrollment(models.Model):
         return f"{self.student} → {self.course}"
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
+        is_new = self._state.adding
         super().save(*args, **kwargs)
         if is_new:
-            self.course.total_students = self.course.enrollments.count()
-            self.course.save(update_fields=['total_students'])
+            # Decremented by the post_delete handler in courses.signals
+            Course.objects.filter(pk=self.course_id).update(
+                total_students=F('total_students') + 1
+            )
+            course_cache.bump_version(self.course_id)
 
 
 # =========================
@@ -174,3 +299,54 @@ class CourseProgress(models.Model):
     def __str__(self):
         return f"{self.enrollment.student} - {self.video.title}"
 
+    def save(self, *args, **kwargs):
+        from .progress import apply_progress_deltas, credited_seconds
+
+        old_seconds, old_completed = 0, False
+        if not self._state.adding:
+            old_seconds, old_completed = CourseProgress.objects.filter(
+                pk=self.pk
+            ).values_list('watched_seconds', 'completed').first() or (0, False)
+        super().save(*args, **kwargs)
+
+        duration = self.video.duration_seconds
+        delta = (
+            credited_seconds(self.watched_seconds, self.completed, duration)
+            - credited_seconds(old_seconds, old_completed, duration)
+        )
+        apply_progress_deltas({self.enrollment_id: delta})
+
+
+
+# =========================
+# RECOMMENDATIONS
+# =========================
+class SimilarCourse(models.Model):
+    """
+    One of a course's top-K most co-enrolled courses, by cosine similarity
+    of their enrollment vectors. Rebuilt offline by
+    `manage.py compute_course_similarity` (see courses.recommendations).
+    """
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='similar_courses'
+    )
+    similar = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+    co_enrollments = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()  # 1 is the most similar
+
+    class Meta:
+        ordering = ['course', 'rank']
+        unique_together = ('course', 'similar')
+        indexes = [
+            models.Index(fields=['course', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.course} ~ {self.similar} ({self.score:.3f})"
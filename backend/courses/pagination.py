@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CourseCursorPagination(CursorPagination):
+    """Keyset pagination over the catalog, newest courses first"""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CourseSearchPagination(PageNumberPagination):
+    """Page-numbered ranked search results"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class TagFacetPagination(PageNumberPagination):
+    """Pages of tags, most used first"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,210 @@
+"""
+Write-behind buffer for video watch-progress heartbeats (see courses.writebehind).
+
+Players report progress every few seconds. Instead of one UPDATE per
+heartbeat, heartbeats are merged in memory per (enrollment, video), keeping
+the furthest position seen, and written with one bulk upsert when the
+buffer is old or large enough, and once more when the process exits.
+
+PROGRESS_FLUSH_INTERVAL (seconds) and PROGRESS_FLUSH_SIZE (pending pairs)
+tune how often that happens; an interval of 0 writes every batch through
+immediately.
+
+Every progress write also moves Enrollment.watched_seconds,
+progress_percentage and completed by the change in credited seconds, so
+those stay O(1) reads. Deleted progress (on its own or with its video)
+has no delta to apply, so its enrollments are recounted from their
+remaining rows once the deletion commits. `manage.py recompute_progress`
+repairs any drift.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from accounts import cache as dashboard_cache
+
+from . import cache as course_cache
+from .models import CourseProgress, Enrollment, Video
+from .writebehind import WriteBehindBuffer
+
+
+def credited_seconds(watched_seconds, completed, duration):
+    """Seconds of a video that count towards course progress"""
+    return duration if completed else min(watched_seconds, duration)
+
+
+def credited_expression():
+    """credited_seconds() of a CourseProgress row, as a query expression"""
+    return Case(
+        When(completed=True, then=F('video__duration_seconds')),
+        default=Least(F('watched_seconds'), F('video__duration_seconds')),
+    )
+
+
+def recount_enrollments(enrollment_ids):
+    """
+    Recompute the enrollments' watched time, percentage and completion
+    from their CourseProgress rows; returns the number changed. Unlike
+    apply_progress_deltas, completion follows the recount.
+    """
+    enrollments = list(
+        Enrollment.objects.filter(pk__in=enrollment_ids).only(
+            'id', 'student_id', 'course_id', 'watched_seconds', 'progress_percentage', 'completed'
+        )
+    )
+    if not enrollments:
+        return 0
+    watched = dict(
+        CourseProgress.objects.filter(enrollment__in=enrollments)
+        .order_by().values_list('enrollment_id').annotate(total=Sum(credited_expression()))
+    )
+    totals = dict(
+        Video.objects.filter(course_id__in={e.course_id for e in enrollments})
+        .order_by().values_list('course_id').annotate(total=Sum('duration_seconds'))
+    )
+
+    changed = []
+    for enrollment in enrollments:
+        seconds = watched.get(enrollment.id) or 0
+        total = totals.get(enrollment.course_id) or 0
+        percentage = min(100.0, seconds * 100.0 / total) if total else 0.0
+        values = (seconds, percentage, percentage >= 100)
+        if (enrollment.watched_seconds, enrollment.progress_percentage, enrollment.completed) != values:
+            enrollment.watched_seconds, enrollment.progress_percentage, enrollment.completed = values
+            changed.append(enrollment)
+    Enrollment.objects.bulk_update(changed, ['watched_seconds', 'progress_percentage', 'completed'])
+    dashboard_cache.bump_versions(enrollment.student_id for enrollment in changed)
+    return len(changed)
+
+
+_recounts = threading.local()
+
+
+def recount_after_commit(enrollment_id):
+    """
+    Recount the enrollment once the current transaction commits, together
+    with every other one scheduled in it, so deleting a video recounts its
+    viewers in one batch.
+    """
+    if not hasattr(_recounts, 'pending'):
+        _recounts.pending = set()
+    _recounts.pending.add(enrollment_id)
+    # Every call registers the flush, so a rolled back transaction cannot
+    # strand later ones; after the first, flushes find nothing to do
+    transaction.on_commit(_flush_recounts)
+
+
+def _flush_recounts():
+    pending, _recounts.pending = getattr(_recounts, 'pending', set()), set()
+    if pending:
+        recount_enrollments(pending)
+
+
+def apply_progress_deltas(deltas):
+    """
+    Add {enrollment id: credited seconds} to the enrollments' watched time
+    and recompute their percentage against the cached course duration, in
+    one UPDATE plus one to flag newly completed enrollments.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    courses = dict(
+        Enrollment.objects.filter(pk__in=deltas).values_list('id', 'course_id')
+    )
+    totals = course_cache.get_total_durations(courses.values())
+
+    watched = Greatest(Value(0), F('watched_seconds') + Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0)
+    ))
+    total = Case(
+        *[When(course_id=course_id, then=Value(float(total)))
+          for course_id, total in totals.items() if total],
+        default=Value(None),
+        output_field=FloatField()
+    )
+    enrollments = Enrollment.objects.filter(pk__in=courses)
+    enrollments.update(
+        watched_seconds=watched,
+        progress_percentage=Coalesce(
+            Least(Value(100.0), watched * Value(100.0) / total), Value(0.0)
+        ),
+    )
+    # Completion is sticky: adding videos later lowers the percentage but
+    # does not take a finished course away
+    enrollments.filter(progress_percentage__gte=100, completed=False).update(completed=True)
+
+
+class ProgressBuffer(WriteBehindBuffer):
+    """Heartbeats merged per (enrollment, video), keeping the furthest position"""
+    thread_name = 'progress-flush'
+
+    def __init__(self, interval=None, max_size=None):
+        super().__init__(
+            interval if interval is not None else getattr(settings, 'PROGRESS_FLUSH_INTERVAL', 5),
+            max_size if max_size is not None else getattr(settings, 'PROGRESS_FLUSH_SIZE', 500),
+        )
+
+    def add(self, enrollment_id, video_id, watched_seconds, completed=False):
+        super().add((enrollment_id, video_id), (watched_seconds, completed))
+
+    def merge(self, old, new):
+        return max(old[0], new[0]), old[1] or new[1]
+
+    def write(self, pending):
+        """Write everything pending with one upsert; returns the number of rows"""
+        with transaction.atomic():
+            return len(self._write(pending))
+
+    def _write(self, pending):
+        enrollment_ids = {enrollment_id for enrollment_id, _ in pending}
+        video_ids = {video_id for _, video_id in pending}
+        existing = {
+            (enrollment_id, video_id): (seconds, completed)
+            for enrollment_id, video_id, seconds, completed in CourseProgress.objects.filter(
+                enrollment_id__in=enrollment_ids, video_id__in=video_ids
+            ).values_list('enrollment_id', 'video_id', 'watched_seconds', 'completed')
+        }
+        durations = dict(
+            Video.objects.filter(pk__in=video_ids).values_list('id', 'duration_seconds')
+        )
+
+        rows, deltas = [], {}
+        for (enrollment_id, video_id), (seconds, completed) in pending.items():
+            old_seconds, old_completed = existing.get((enrollment_id, video_id), (0, False))
+            # Never move a viewer backwards, even if another process wrote
+            # a further position since this buffer last flushed
+            seconds = max(seconds, old_seconds)
+            completed = completed or old_completed
+            rows.append(CourseProgress(
+                enrollment_id=enrollment_id,
+                video_id=video_id,
+                watched_seconds=seconds,
+                completed=completed,
+            ))
+            duration = durations.get(video_id, 0)
+            delta = (
+                credited_seconds(seconds, completed, duration)
+                - credited_seconds(old_seconds, old_completed, duration)
+            )
+            deltas[enrollment_id] = deltas.get(enrollment_id, 0) + max(delta, 0)
+
+        CourseProgress.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['enrollment', 'video'],
+            update_fields=['watched_seconds', 'completed', 'last_watched_at'],
+        )
+        apply_progress_deltas(deltas)
+        # Continue-watching and progress figures on these students' dashboards moved
+        dashboard_cache.bump_versions(
+            Enrollment.objects.filter(pk__in=enrollment_ids).values_list('student_id', flat=True)
+        )
+        return rows
+
+
+progress_buffer = ProgressBuffer().register_shutdown()
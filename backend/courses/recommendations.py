@@ -0,0 +1,171 @@
+"""
+Co-enrollment course recommendations.
+
+`manage.py compute_course_similarity` builds a sparse student x course
+matrix from Enrollment and scores every pair of courses by the cosine
+similarity of their enrollment columns, co_enrollments / sqrt(n_i * n_j).
+The course x course co-enrollment counts come from sparse products of a
+block of columns at a time, so memory stays bounded by the batch size,
+and each course's top COURSE_SIMILARITY_TOP_K published courses are
+stored in SimilarCourse.
+
+Requests only read that table: a course's similar courses are one range
+scan on (course, rank), and a student's recommendations sum the scores of
+the courses similar to the ones they took, over at most
+COURSE_RECOMMENDATION_SEEDS x top-K rows.
+"""
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Sum
+from scipy import sparse
+
+from .models import Course, Enrollment, SimilarCourse
+
+WRITE_BATCH_SIZE = 5000
+
+
+def enrollment_matrix(chunk_size=20000):
+    """
+    (matrix, course_ids): a CSR student x course matrix of 1s and the
+    course id of each column.
+    """
+    pairs = Enrollment.objects.order_by().values_list('student_id', 'course_id')
+    flat = np.fromiter(
+        chain.from_iterable(pairs.iterator(chunk_size=chunk_size)), dtype=np.int64
+    ).reshape(-1, 2)
+    student_ids, rows = np.unique(flat[:, 0], return_inverse=True)
+    course_ids, columns = np.unique(flat[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(flat), dtype=np.int32), (rows, columns)),
+        shape=(len(student_ids), len(course_ids)),
+    )
+    return matrix, course_ids
+
+
+def top_similar(matrix, top_k, candidates=None, min_co_enrollments=1, batch_size=1024):
+    """
+    Yield (column, similar columns, scores, co-enrollments) for every column
+    of a student x course matrix, keeping the `top_k` best scored columns
+    that are in the boolean `candidates` mask, best first.
+    """
+    n_courses = matrix.shape[1]
+    norms = np.sqrt(np.asarray(matrix.sum(axis=0), dtype=np.float64).ravel())
+    if candidates is None:
+        candidates = np.ones(n_courses, dtype=bool)
+    by_course = matrix.T.tocsr()
+    columns = matrix.tocsc()
+
+    for start in range(0, n_courses, batch_size):
+        stop = min(start + batch_size, n_courses)
+        # Co-enrollment counts of every course with this block of courses
+        shared = (by_course @ columns[:, start:stop]).tocsc()
+        for offset, column in enumerate(range(start, stop)):
+            lo, hi = shared.indptr[offset], shared.indptr[offset + 1]
+            others, counts = shared.indices[lo:hi], shared.data[lo:hi]
+            keep = (others != column) & (counts >= min_co_enrollments) & candidates[others]
+            others, counts = others[keep], counts[keep]
+            if not len(others):
+                continue
+            scores = counts / (norms[others] * norms[column])
+            if len(others) > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+                others, counts, scores = others[best], counts[best], scores[best]
+            # Best score first, ties by the lower course id
+            order = np.lexsort((others, -scores))
+            yield column, others[order], scores[order], counts[order]
+
+
+def rebuild_similar_courses(top_k=None, min_co_enrollments=None, batch_size=1024):
+    """Recompute the whole SimilarCourse table; returns (courses given neighbours, rows)"""
+    top_k = top_k or settings.COURSE_SIMILARITY_TOP_K
+    if min_co_enrollments is None:
+        min_co_enrollments = settings.COURSE_SIMILARITY_MIN_CO_ENROLLMENTS
+
+    matrix, course_ids = enrollment_matrix()
+    published = np.fromiter(
+        Course.objects.filter(status='published').values_list('id', flat=True).iterator(),
+        dtype=np.int64,
+    )
+    candidates = np.isin(course_ids, published)
+
+    courses = 0
+    rows = []
+    with transaction.atomic():
+        SimilarCourse.objects.all().delete()
+        for column, others, scores, counts in top_similar(
+            matrix, top_k, candidates, min_co_enrollments, batch_size
+        ):
+            courses += 1
+            course_id = int(course_ids[column])
+            rows.extend(
+                SimilarCourse(
+                    course_id=course_id,
+                    similar_id=int(course_ids[other]),
+                    score=float(score),
+                    co_enrollments=int(count),
+                    rank=rank,
+                )
+                for rank, (other, score, count) in enumerate(zip(others, scores, counts), 1)
+            )
+            if len(rows) >= WRITE_BATCH_SIZE:
+                SimilarCourse.objects.bulk_create(rows)
+                rows = []
+        SimilarCourse.objects.bulk_create(rows)
+    return courses, SimilarCourse.objects.count()
+
+
+def similar_to(course_id, limit=None):
+    """A course's stored similar courses that are still published, best first"""
+    limit = limit or settings.COURSE_SIMILARITY_TOP_K
+    return (
+        SimilarCourse.objects.filter(course_id=course_id, similar__status='published')
+        .select_related('similar__creator')
+        .order_by('rank')[:limit]
+    )
+
+
+def recommended_for(user, limit=None):
+    """
+    Published courses the user is not enrolled in, scored by their summed
+    similarity to the user's most recent enrollments, best first, each with
+    a `score`. Falls back to the most enrolled courses when the user's
+    courses have no stored neighbours.
+    """
+    limit = limit or settings.COURSE_RECOMMENDATION_LIMIT
+    seeds = list(
+        Enrollment.objects.filter(student=user)
+        .order_by('-enrolled_at')
+        .values_list('course_id', flat=True)[:settings.COURSE_RECOMMENDATION_SEEDS]
+    )
+    enrolled = Enrollment.objects.filter(student=user, course=OuterRef('similar_id'))
+    scored = list(
+        SimilarCourse.objects.filter(course_id__in=seeds, similar__status='published')
+        .filter(~Exists(enrolled))
+        .values_list('similar_id')
+        .annotate(total=Sum('score'))
+        .order_by('-total', 'similar_id')[:limit]
+    ) if seeds else []
+
+    if not scored:
+        popular = (
+            Course.objects.filter(status='published')
+            .exclude(enrollments__student=user)
+            .select_related('creator')
+            .order_by('-total_students', 'id')[:limit]
+        )
+        courses = list(popular)
+        for course in courses:
+            course.score = None
+        return courses
+
+    courses = Course.objects.select_related('creator').in_bulk([pk for pk, _ in scored])
+    result = []
+    for pk, total in scored:
+        course = courses.get(pk)
+        if course is not None:
+            course.score = total
+            result.append(course)
+    return result
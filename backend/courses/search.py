@@ -0,0 +1,241 @@
+"""
+Full-text search over courses.
+
+The index is a side table keyed by course id: an FTS5 virtual table on
+SQLite and a weighted tsvector table with a GIN index on PostgreSQL. It is
+kept in sync by the signal handlers in courses.signals and can be rebuilt
+with `manage.py rebuild_search_index`.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection as default_connection
+
+from .models import Course
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Columns accepted as exact-match filters alongside the text query
+FILTER_COLUMNS = ('level', 'category', 'is_paid')
+
+
+def _document(course):
+    """Indexed text for a course, in index column order"""
+    return [
+        course.title,
+        course.short_description,
+        course.description,
+        ' '.join(course.tag_list),
+    ]
+
+
+def _filter_sql(filters):
+    clauses, params = [], []
+    for column in FILTER_COLUMNS:
+        if column in filters:
+            clauses.append(f'c.{column} = %s')
+            params.append(filters[column])
+    return clauses, params
+
+
+class SQLiteSearchBackend:
+    """FTS5 index ranked with bm25; rowid is the course id"""
+    table = 'courses_course_fts'
+    # bm25 column weights: title, short_description, description, tags
+    weights = (10.0, 4.0, 1.0, 6.0)
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, courses):
+        rows = [[course.pk] + _document(course) for course in courses]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [[row[0]] for row in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, short_description, description, tags) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                rows
+            )
+
+    def remove(self, course_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [course_id])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def _match(self, query):
+        # Quote every token so user input can never be parsed as FTS5 syntax;
+        # the last token is a prefix match to support search-as-you-type.
+        tokens = ['"%s"' % token for token in TOKEN_RE.findall(query)]
+        if tokens:
+            tokens[-1] += '*'
+        return ' '.join(tokens)
+
+    def _where(self, query, filters):
+        clauses, params = _filter_sql(filters)
+        clauses.insert(0, f'{self.table} MATCH %s')
+        params.insert(0, self._match(query))
+        return ' AND '.join(clauses), params
+
+    def count(self, query, filters):
+        where, params = self._where(query, filters)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.table} '
+                f'JOIN {Course._meta.db_table} c ON c.id = {self.table}.rowid '
+                f'WHERE {where}',
+                params
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, filters, offset, limit):
+        where, params = self._where(query, filters)
+        weights = ', '.join(str(w) for w in self.weights)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {self.table}.rowid FROM {self.table} '
+                f'JOIN {Course._meta.db_table} c ON c.id = {self.table}.rowid '
+                f'WHERE {where} '
+                f'ORDER BY bm25({self.table}, {weights}), c.id DESC '
+                'LIMIT %s OFFSET %s',
+                params + [limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector per course in a GIN-indexed side table"""
+    table = 'courses_course_search'
+    config = 'english'
+    document_sql = (
+        "setweight(to_tsvector('english', %s), 'A') || "
+        "setweight(to_tsvector('english', %s), 'B') || "
+        "setweight(to_tsvector('english', %s), 'D') || "
+        "setweight(to_tsvector('english', %s), 'B')"
+    )
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, courses):
+        rows = [[course.pk] + _document(course) for course in courses]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (course_id, document) '
+                f'VALUES (%s, {self.document_sql}) '
+                'ON CONFLICT (course_id) DO UPDATE SET document = EXCLUDED.document',
+                rows
+            )
+
+    def remove(self, course_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE course_id = %s', [course_id])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+
+    def _where(self, query, filters):
+        clauses, params = _filter_sql(filters)
+        clauses.insert(0, f"s.document @@ plainto_tsquery('{self.config}', %s)")
+        params.insert(0, query)
+        return ' AND '.join(clauses), params
+
+    def count(self, query, filters):
+        where, params = self._where(query, filters)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.table} s '
+                f'JOIN {Course._meta.db_table} c ON c.id = s.course_id '
+                f'WHERE {where}',
+                params
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, filters, offset, limit):
+        where, params = self._where(query, filters)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT s.course_id FROM {self.table} s "
+                f"JOIN {Course._meta.db_table} c ON c.id = s.course_id "
+                f"WHERE {where} "
+                f"ORDER BY ts_rank(s.document, plainto_tsquery('{self.config}', %s)) DESC, c.id DESC "
+                "LIMIT %s OFFSET %s",
+                params + [query, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(connection=None):
+    connection = connection or default_connection
+    try:
+        return BACKENDS[connection.vendor](connection)
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Course search is not supported on the '{connection.vendor}' database backend"
+        )
+
+
+class SearchResults:
+    """
+    Ranked search hits that evaluate lazily.
+
+    Supports count() and slicing like a queryset, so the standard DRF
+    paginators can page through it; each page runs one ranked id lookup
+    plus one query to load the matching courses.
+    """
+
+    def __init__(self, query, filters=None, queryset=None, backend=None):
+        self.query = query
+        self.filters = filters or {}
+        self.queryset = queryset if queryset is not None else Course.objects.all()
+        self.backend = backend or get_backend()
+        self._count = None
+        if not TOKEN_RE.search(query or ''):
+            self._count = 0
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query, self.filters)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if stop <= start or self.count() == 0:
+            return []
+        ids = self.backend.ranked_ids(self.query, self.filters, start, stop - start)
+        courses = self.queryset.in_bulk(ids)
+        return [courses[pk] for pk in ids if pk in courses]
+
+
+def search_courses(query, filters=None, queryset=None):
+    return SearchResults(query, filters, queryset)
+
+
+def index_courses(courses):
+    get_backend().index(courses)
+
+
+def remove_course(course_id):
+    get_backend().remove(course_id)
@@ -1,29 +1,17 @@
 from rest_framework import serializers
-from .models import Course, Video
+from .models import Course, SimilarCourse, Tag, Video
 
 class VideoSerializer(serializers.ModelSerializer):
-    duration_formatted = serializers.CharField(read_only=True)
-    file_size_formatted = serializers.CharField(read_only=True)
-    
     class Meta:
         model = Video
         fields = [
             'id', 'course', 'title', 'description',
-            'video_file', 'video_url', 'thumbnail',
-            'duration_seconds', 'duration_formatted',
-            'file_size', 'file_size_formatted',
-            'order', 'is_preview', 'is_published',
-            'created_at', 'updated_at'
+            'video_file', 'video_url', 'duration_seconds',
+            'order', 'is_preview', 'uploaded_at'
         ]
-        read_only_fields = ['course', 'file_size', 'created_at', 'updated_at']
-    
-    def create(self, validated_data):
-        # Calculate file size if video file is uploaded
-        video_file = validated_data.get('video_file')
-        if video_file:
-            validated_data['file_size'] = video_file.size
-        
-        return super().create(validated_data)
+        read_only_fields = ['course', 'uploaded_at']
+
+
 class CourseSerializer(serializers.ModelSerializer):
     videos = VideoSerializer(many=True, read_only=True)
     creator_name = serializers.CharField(source='creator.username', read_only=True)
@@ -37,7 +25,80 @@ class CourseSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['creator']
 
+class CourseSummarySerializer(serializers.ModelSerializer):
+    """Compact course representation for lists and nested usages"""
+    creator_name = serializers.CharField(source='creator.username', read_only=True)
+    
+    class Meta:
+        model = Course
+        fields = [
+            'id', 'slug', 'title', 'short_description', 'level',
+            'category', 'is_paid', 'price', 'total_students', 'creator_name'
+        ]
+        read_only_fields = fields
+
+
+class SimilarCourseSerializer(serializers.ModelSerializer):
+    course = CourseSummarySerializer(source='similar', read_only=True)
+    
+    class Meta:
+        model = SimilarCourse
+        fields = ['course', 'score', 'co_enrollments', 'rank']
+        read_only_fields = fields
+
+
+class RecommendedCourseSerializer(CourseSummarySerializer):
+    """A course from courses.recommendations.recommended_for, with its score"""
+    score = serializers.FloatField(read_only=True, allow_null=True)
+    
+    class Meta(CourseSummarySerializer.Meta):
+        fields = CourseSummarySerializer.Meta.fields + ['score']
+        read_only_fields = fields
+
+
+class TagFacetSerializer(serializers.ModelSerializer):
+    count = serializers.IntegerField(source='published_course_count', read_only=True)
+    
+    class Meta:
+        model = Tag
+        fields = ['name', 'count']
+
+
+def wants_full_detail(request):
+    """True when the client opted into the full course form with ?detail=full"""
+    return request is not None and request.query_params.get('detail') == 'full'
+
+
 class CourseCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ['title', 'description', 'is_paid', 'price']
+
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    """Students to enroll, by id and/or username"""
+    student_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list
+    )
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=150), required=False, default=list
+    )
+    
+    def validate(self, attrs):
+        total = len(attrs['student_ids']) + len(attrs['usernames'])
+        if total == 0:
+            raise serializers.ValidationError("Provide student_ids or usernames")
+        if total > 10000:
+            raise serializers.ValidationError("At most 10000 students per request")
+        return attrs
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    enrollment = serializers.IntegerField(min_value=1)
+    video = serializers.IntegerField(min_value=1)
+    watched_seconds = serializers.IntegerField(min_value=0)
+    completed = serializers.BooleanField(default=False)
+
+
+class HeartbeatBatchSerializer(serializers.Serializer):
+    heartbeats = HeartbeatSerializer(many=True, allow_empty=False, max_length=500)
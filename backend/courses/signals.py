@@ -0,0 +1,64 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Course, CourseProgress, Enrollment, Tag, Video
+from . import cache as course_cache
+from . import progress, search
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_courses([instance])
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    search.remove_course(instance.pk)
+
+
+@receiver(pre_delete, sender=Course)
+def release_tag_counts(sender, instance, **kwargs):
+    # Tag links cascade away with the course; take it out of the facet counts first
+    if instance.is_published:
+        Tag.adjust_counts(
+            set(instance.course_tags.values_list('tag__name', flat=True)), -1
+        )
+
+
+@receiver(post_save, sender=Course)
+def bump_course_version(sender, instance, **kwargs):
+    course_cache.bump_version(instance.pk)
+
+
+@receiver(post_delete, sender=Course)
+def drop_course_version(sender, instance, **kwargs):
+    course_cache.bump_version(instance.pk)
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def touch_course_for_video(sender, instance, **kwargs):
+    # Video writes change the course representation, so move its
+    # Last-Modified forward and invalidate the cached detail and duration
+    Course.objects.filter(pk=instance.course_id).update(updated_at=timezone.now())
+    course_cache.bump_version(instance.course_id)
+    course_cache.invalidate_total_duration(instance.course_id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def decrement_total_students(sender, instance, **kwargs):
+    Course.objects.filter(pk=instance.course_id, total_students__gt=0).update(
+        total_students=F('total_students') - 1
+    )
+    # The detail page shows the student count
+    course_cache.bump_version(instance.course_id)
+
+
+@receiver(post_delete, sender=CourseProgress)
+def recount_progress(sender, instance, **kwargs):
+    # Also reached through the cascade when a video is deleted
+    progress.recount_after_commit(instance.enrollment_id)
@@ -1,3 +1,764 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import cache as dashboard_cache
+
+from . import cache as course_cache
+from .enrollment import bulk_enroll
+from .models import Course, CourseProgress, CourseTag, Enrollment, Tag, Video
+from .progress import ProgressBuffer
+from .recommendations import rebuild_similar_courses, recommended_for
+from .search import get_backend
+from .serializers import CourseSerializer
+from .utils import save_with_unique_slug, unique_slug
+
+User = get_user_model()
+
+
+class UniqueSlugTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('instructor', 'i@example.com', 'pass12345')
+
+    def create_course(self, title='Python Study Circle'):
+        return Course.objects.create(title=title, description='d', creator=self.user)
+
+    def test_collisions_get_increasing_suffixes(self):
+        slugs = [self.create_course().slug for _ in range(3)]
+        self.assertEqual(slugs, ['python-study-circle', 'python-study-circle-1', 'python-study-circle-2'])
+
+    def test_suffix_follows_highest_taken(self):
+        self.create_course()
+        Course.objects.create(title='x', slug='python-study-circle-7', description='d', creator=self.user)
+        self.assertEqual(self.create_course().slug, 'python-study-circle-8')
+
+    def test_similar_prefixes_are_not_suffixes(self):
+        self.create_course()
+        self.create_course('Python Study Circle Advanced')
+        self.assertEqual(self.create_course().slug, 'python-study-circle-1')
+
+    def test_creation_cost_is_constant(self):
+        # Benchmark: creating a course, slug allocation and insert included,
+        # takes as many queries with a few colliding slugs as with many
+        query_counts = []
+        for collisions in (1, 50):
+            title = f'Course {collisions}'
+            for _ in range(collisions):
+                self.create_course(title)
+            with CaptureQueriesContext(connection) as queries:
+                self.create_course(title)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+        with CaptureQueriesContext(connection) as queries:
+            unique_slug(Course, 'Course 50', 300)
+        self.assertEqual(len(queries), 1)
+
+    def test_retries_when_the_slug_was_taken(self):
+        course = Course(title='Python Study Circle', description='d', creator=self.user)
+        taken = self.create_course()
+        slugs = iter([taken.slug, 'python-study-circle-1'])
+        with mock.patch('courses.utils.unique_slug', side_effect=lambda *args: next(slugs)):
+            course.save()
+        self.assertEqual(course.slug, 'python-study-circle-1')
+
+    def test_other_integrity_errors_are_not_retried(self):
+        course = Course(title='Python Study Circle', description='d', creator=self.user)
+        save = mock.Mock(side_effect=IntegrityError('NOT NULL constraint failed'))
+        with self.assertRaises(IntegrityError):
+            save_with_unique_slug(course, course.title, save)
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(course.slug, '')
+
+
+class CourseListPaginationTests(TestCase):
+    def setUp(self):
+        creators = [User.objects.create_user(f'instructor{i}') for i in range(5)]
+        for i in range(30):
+            Course.objects.create(title=f'Course {i}', description='d', creator=creators[i % 5])
+        self.client = APIClient()
+
+    def test_pages_cost_the_same_queries(self):
+        # One query for the page, creators joined in; no COUNT(*)
+        with self.assertNumQueries(1):
+            first = self.client.get(reverse('course-list'), {'page_size': 10})
+        self.assertEqual(len(first.data['results']), 10)
+        with self.assertNumQueries(1):
+            later = self.client.get(first.data['next'])
+        self.assertEqual(len(later.data['results']), 10)
+        ids = [c['id'] for c in first.data['results'] + later.data['results']]
+        self.assertEqual(ids, sorted(set(ids), reverse=True))
+
+    def test_full_detail_adds_one_prefetch(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('course-list'), {'page_size': 10, 'detail': 'full'})
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class CourseShapeTests(TestCase):
+    summary_fields = {
+        'id', 'slug', 'title', 'short_description', 'level',
+        'category', 'is_paid', 'price', 'total_students', 'creator_name',
+    }
+
+    def setUp(self):
+        creator = User.objects.create_user('instructor')
+        course = Course.objects.create(
+            title='Python', description='d', creator=creator, status='published'
+        )
+        Video.objects.create(course=course, title='Intro', duration_seconds=60)
+        self.client = APIClient()
+
+    def listed(self, name, params):
+        data = self.client.get(reverse(name), params).data
+        # The plain course list is unpaginated unless asked for a cursor page
+        course, = data['results'] if isinstance(data, dict) else data
+        return course
+
+    def test_lists_are_summaries_by_default(self):
+        for name, params in (('course-list', {}), ('course-search', {'q': 'python'})):
+            self.assertEqual(set(self.listed(name, params)), self.summary_fields)
+
+    def test_full_detail_includes_videos(self):
+        for name, params in (('course-list', {}), ('course-search', {'q': 'python'})):
+            course = self.listed(name, {**params, 'detail': 'full'})
+            self.assertIn('description', course)
+            self.assertEqual([video['title'] for video in course['videos']], ['Intro'])
+
+
+class CourseSearchTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('instructor')
+        self.client = APIClient()
+
+    def create_course(self, title, description='Course', **fields):
+        return Course.objects.create(
+            title=title, description=description, creator=self.creator, status='published', **fields
+        )
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('course-search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [course['title'] for course in response.data['results']]
+
+    def test_title_matches_rank_first(self):
+        self.create_course('Cooking', description='Recipes and some django for the kitchen website')
+        self.create_course('Django basics')
+        self.create_course('Painting')
+        self.assertEqual(self.search('django'), ['Django basics', 'Cooking'])
+
+    def test_last_token_is_a_prefix(self):
+        self.create_course('Python for data')
+        self.assertEqual(self.search('python da'), ['Python for data'])
+        self.assertEqual(self.search('pyth'), ['Python for data'])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.create_course('Python')
+        self.assertEqual(self.search('python OR NOT "*'), [])
+        self.assertEqual(self.search('***'), [])
+
+    def test_filters(self):
+        self.create_course('Python intro', level='beginner', category='code')
+        self.create_course('Python deep dive', level='advanced', category='code', is_paid=True)
+        self.create_course('Python for art', level='beginner', category='art')
+        self.assertEqual(self.search('python', level='advanced'), ['Python deep dive'])
+        self.assertEqual(self.search('python', category='art'), ['Python for art'])
+        self.assertCountEqual(
+            self.search('python', is_paid='false'), ['Python intro', 'Python for art']
+        )
+
+    def test_index_follows_saves_and_deletes(self):
+        course = self.create_course('Rust', tags='systems')
+        self.assertEqual(self.search('systems'), ['Rust'])
+
+        course.title = 'Go'
+        course.tags = 'concurrency'
+        course.save()
+        self.assertEqual(self.search('rust'), [])
+        self.assertEqual(self.search('systems'), [])
+        self.assertEqual(self.search('concurrency'), ['Go'])
+
+        course.delete()
+        self.assertEqual(self.search('go'), [])
+
+    def test_rebuild_command_repairs_the_index(self):
+        kept = self.create_course('Haskell')
+        lost = self.create_course('Erlang')
+        renamed = self.create_course('Scala')
+        backend = get_backend()
+        backend.remove(lost.pk)
+        # Renamed behind the signals' back, so the index still says Scala
+        Course.objects.filter(pk=renamed.pk).update(title='Kotlin')
+        self.assertEqual(self.search('erlang'), [])
+        self.assertEqual(self.search('kotlin'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn('Indexed 3 courses', out.getvalue())
+        self.assertEqual(self.search('erlang'), ['Erlang'])
+        self.assertEqual(self.search('kotlin'), ['Kotlin'])
+        self.assertEqual(self.search('scala'), [])
+        self.assertEqual(self.search('haskell'), [kept.title])
+
+
+class TagCountTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('instructor')
+
+    def create_course(self, tags, status='published'):
+        return Course.objects.create(
+            title='Course', description='d', creator=self.creator, tags=tags, status=status
+        )
+
+    def counts(self):
+        return dict(Tag.objects.filter(published_course_count__gt=0).values_list('name', 'published_course_count'))
+
+    def test_counts_follow_saves_and_deletes(self):
+        first = self.create_course('Python, Web')
+        second = self.create_course('python')
+        self.create_course('python, drafts', status='draft')
+        self.assertEqual(self.counts(), {'python': 2, 'web': 1})
+
+        first.tags = 'python, data'
+        first.save()
+        self.assertEqual(self.counts(), {'python': 2, 'data': 1})
+
+        second.status = 'archived'
+        second.save(update_fields=['status'])
+        self.assertEqual(self.counts(), {'python': 1, 'data': 1})
+
+        first.delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_unchanged_tags_are_not_synced(self):
+        self.create_course('python, web')
+        course = Course.objects.get()
+        course.title = 'Renamed'
+        course.tags = 'Web,python'
+        with CaptureQueriesContext(connection) as queries:
+            course.save()
+        self.assertFalse([q for q in queries if 'courses_tag' in q['sql'] or 'courses_coursetag' in q['sql']])
+        self.assertEqual(self.counts(), {'python': 1, 'web': 1})
+
+    def listed(self, **params):
+        response = APIClient().get(reverse('course-list'), params)
+        return sorted(course['title'] for course in response.data)
+
+    def test_tag_filter_ignores_case_and_spaces(self):
+        for title, tags in (('Django', 'Python, Web'), ('Art', 'art')):
+            Course.objects.create(
+                title=title, description='d', creator=self.creator, tags=tags, status='published'
+            )
+        self.assertEqual(self.listed(tag='  PYTHON '), ['Django'])
+        self.assertEqual(self.listed(tag='web'), ['Django'])
+        self.assertEqual(self.listed(tag='py'), [])
+
+    def test_backfill_command_rebuilds_links_and_counts(self):
+        self.create_course('python, web')
+        self.create_course('Python')
+        self.create_course('python', status='draft')
+        CourseTag.objects.all().delete()
+        Tag.objects.update(published_course_count=0)
+        self.assertEqual(self.listed(tag='python'), [])
+
+        out = StringIO()
+        call_command('backfill_course_tags', batch_size=1, stdout=out)
+        self.assertIn('Backfilled 2 tags across 3 courses', out.getvalue())
+        self.assertEqual(self.counts(), {'python': 2, 'web': 1})
+        self.assertEqual(self.listed(tag='python'), ['Course', 'Course', 'Course'])
+
+    def test_facets_are_paginated(self):
+        self.create_course(', '.join(f'tag{i}' for i in range(30)))
+        response = APIClient().get(reverse('course-tags'), {'page_size': 20})
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+
+
+class CourseDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user('instructor', 'i@example.com')
+        self.student = User.objects.create_user('student', 's@example.com')
+        self.course = Course.objects.create(title='Python', description='d', creator=self.creator)
+        self.url = reverse('course-detail-html', args=[self.course.pk])
+
+    def test_creator_controls_are_not_shared(self):
+        self.client.force_login(self.creator)
+        self.assertContains(self.client.get(self.url), 'Upload First Video')
+        self.client.force_login(self.student)
+        self.assertNotContains(self.client.get(self.url), 'Upload First Video')
+        self.client.logout()
+        self.assertNotContains(self.client.get(self.url), 'Upload First Video')
+        self.client.force_login(self.creator)
+        self.assertContains(self.client.get(self.url), 'Upload First Video')
+
+    def test_response_varies_on_cookie(self):
+        response = self.client.get(self.url)
+        self.assertIn('Cookie', response['Vary'])
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIn('Cookie', not_modified['Vary'])
+
+    def test_enrollment_invalidates_cached_page(self):
+        self.assertContains(self.client.get(self.url), '0 students')
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertContains(self.client.get(self.url), '1 students')
+        with self.captureOnCommitCallbacks(execute=True):
+            enrollment.delete()
+        self.assertContains(self.client.get(self.url), '0 students')
+
+    def test_course_edit_invalidates_cached_page(self):
+        etag = self.client.get(self.url)['ETag']
+        self.course.title = 'Python Basics'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Python Basics')
+
+    def test_version_is_bumped_only_on_commit(self):
+        self.client.get(self.url)
+        version = course_cache.get_version(self.course.pk)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertEqual(course_cache.get_version(self.course.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(course_cache.get_version(self.course.pk), version)
+
+
+class CourseDetailConditionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user('instructor')
+        self.course = Course.objects.create(title='Python', description='d', creator=self.creator)
+        self.url = reverse('course-detail', args=[self.course.pk])
+        self.client = APIClient()
+
+    def test_etag_is_answered_without_serializing(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        with mock.patch.object(CourseSerializer, 'to_representation') as serialize:
+            with self.assertNumQueries(0):
+                not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, 304)
+            # A cached body is served for a stale ETag without serializing either
+            fresh = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+            self.assertEqual(fresh.status_code, 200)
+        serialize.assert_not_called()
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.url)
+        not_modified = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_edits_and_videos_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.creator)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, {'title': 'Python Basics'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.data['title']), (200, 'Python Basics'))
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Video.objects.create(course=self.course, title='Intro', duration_seconds=60)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([video['title'] for video in response.data['videos']], ['Intro'])
+
+
+class StudentCounterTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('instructor', 'i@example.com')
+        self.students = [User.objects.create_user(f'student{i}') for i in range(3)]
+        self.course = Course.objects.create(title='Python', description='d', creator=self.creator)
+
+    def total_students(self):
+        self.course.refresh_from_db(fields=['total_students'])
+        return self.course.total_students
+
+    def test_enrolling_and_unenrolling_move_the_counter(self):
+        enrollments = [
+            Enrollment.objects.create(student=student, course=self.course) for student in self.students
+        ]
+        self.assertEqual(self.total_students(), 3)
+        enrollments[0].delete()
+        Enrollment.objects.filter(pk=enrollments[1].pk).delete()
+        self.assertEqual(self.total_students(), 1)
+
+    def test_counter_never_goes_negative(self):
+        enrollment = Enrollment.objects.create(student=self.students[0], course=self.course)
+        Course.objects.filter(pk=self.course.pk).update(total_students=0)
+        enrollment.delete()
+        self.assertEqual(self.total_students(), 0)
+
+    def test_reconcile_repairs_drift(self):
+        for student in self.students[:2]:
+            Enrollment.objects.create(student=student, course=self.course)
+        Course.objects.filter(pk=self.course.pk).update(total_students=7)
+        out = StringIO()
+        call_command('reconcile_course_counters', stdout=out)
+        self.assertEqual(self.total_students(), 2)
+        self.assertIn('Reconciled 1 courses', out.getvalue())
+
+
+class BulkEnrollTests(TestCase):
+    cohort = 5000
+
+    def setUp(self):
+        self.creator = User.objects.create_user('instructor', 'i@example.com')
+        self.course = Course.objects.create(title='Python', description='d', creator=self.creator)
+        User.objects.bulk_create([User(username=f'cohort{i}') for i in range(self.cohort)])
+        self.students = list(User.objects.filter(username__startswith='cohort').order_by('pk'))
+
+    def test_cohort_is_enrolled_in_a_few_queries_per_batch(self):
+        # Benchmark: 5,000 students take a few queries per batch of 1,000
+        # rather than a few per student (SQLite splits each INSERT by its
+        # bound-variable limit, so those are counted apart)
+        with CaptureQueriesContext(connection) as queries:
+            report = bulk_enroll(self.course, self.students)
+        self.assertEqual(len(report), self.cohort)
+        self.assertEqual(set(report.values()), {'created'})
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        self.assertLessEqual(len(queries) - len(inserts), 5 * 4)
+        self.assertLess(len(inserts), self.cohort // 20)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.total_students, self.cohort)
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), self.cohort)
+
+    def test_existing_enrollments_are_skipped_and_counter_recounted(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        # A counter that drifted, e.g. a student enrolling on their own
+        # while a batch was being inserted
+        Course.objects.filter(pk=self.course.pk).update(total_students=3)
+        report = bulk_enroll(self.course, self.students[:10], batch_size=4)
+        self.assertEqual(report[self.students[0].pk], 'already_enrolled')
+        self.assertEqual(list(report.values()).count('created'), 9)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.total_students, 10)
+
+
+class BulkEnrollmentEndpointTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('instructor')
+        self.course = Course.objects.create(title='Python', description='d', creator=self.creator)
+        self.students = [User.objects.create_user(f'student{i}') for i in range(3)]
+        # A username that looks like somebody's id
+        self.numeric = User.objects.create_user(str(self.students[0].pk))
+        self.url = reverse('course-bulk-enroll', args=[self.course.pk])
+        self.client = APIClient()
+
+    def test_only_the_creator_may_enroll(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post(self.url, {'usernames': ['student1']}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_report_lists_unknown_students(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        self.client.force_authenticate(self.creator)
+        response = self.client.post(self.url, {
+            'student_ids': [self.students[0].pk, 999999],
+            'usernames': ['student1', 'nobody'],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['already_enrolled']), (1, 1))
+        self.assertEqual(response.data['not_found'], [999999, 'nobody'])
+        self.assertEqual(
+            [(r['username'], r['status']) for r in response.data['results']],
+            [('student0', 'already_enrolled'), ('student1', 'created')],
+        )
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'bulk_enroll', self.course.pk,
+            '--username', self.numeric.username, '--username', 'nobody',
+            '--user-id', str(self.students[2].pk), stdout=out,
+        )
+        self.assertIn('2 enrolled, 0 already enrolled, 1 not found', out.getvalue())
+        self.assertIn('Not found: nobody', out.getvalue())
+        # The digits-only username enrolled its owner, not the user with that id
+        self.assertCountEqual(
+            Enrollment.objects.values_list('student_id', flat=True),
+            [self.numeric.pk, self.students[2].pk],
+        )
+
+        with self.assertRaisesMessage(CommandError, 'No students given'):
+            call_command('bulk_enroll', self.course.pk, stdout=StringIO())
+
+
+class ProgressCreditTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user('instructor', 'i@example.com')
+        self.student = User.objects.create_user('student', 's@example.com')
+        self.course = Course.objects.create(title='Python', description='d', creator=self.creator)
+        self.first, self.second = [
+            Video.objects.create(course=self.course, title=title, duration_seconds=100)
+            for title in ('Intro', 'Types')
+        ]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.buffer = ProgressBuffer(interval=0)
+
+    def watch(self, video, seconds, completed=False):
+        self.buffer.add(self.enrollment.pk, video.pk, seconds, completed)
+        self.enrollment.refresh_from_db()
+        return (
+            self.enrollment.watched_seconds,
+            self.enrollment.progress_percentage,
+            self.enrollment.completed,
+        )
+
+    def test_deltas_are_applied(self):
+        self.assertEqual(self.watch(self.first, 30), (30, 15.0, False))
+        self.assertEqual(self.watch(self.first, 80), (80, 40.0, False))
+        # Positions never move back and are credited up to the duration
+        self.assertEqual(self.watch(self.first, 10), (80, 40.0, False))
+        self.assertEqual(self.watch(self.first, 500), (100, 50.0, False))
+        self.assertEqual(self.watch(self.second, 20, completed=True), (200, 100.0, True))
+
+    def test_completion_is_sticky_when_videos_are_added(self):
+        self.watch(self.first, 100)
+        self.watch(self.second, 100)
+        Video.objects.create(course=self.course, title='Bonus', duration_seconds=100)
+        self.assertEqual(self.watch(self.first, 100), (200, 100.0, True))
+
+    def test_deleted_video_takes_its_credit_along(self):
+        self.watch(self.first, 10)
+        self.watch(self.second, 100)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(
+            (self.enrollment.watched_seconds, self.enrollment.progress_percentage), (10, 10.0)
+        )
+        # The remaining video's progress is not mistaken for a finished course
+        self.assertEqual(self.watch(self.first, 50), (50, 50.0, False))
+
+    def test_deleted_progress_is_recounted(self):
+        self.watch(self.first, 100)
+        self.watch(self.second, 100)
+        with self.captureOnCommitCallbacks(execute=True):
+            CourseProgress.objects.filter(video=self.second).delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(
+            (self.enrollment.watched_seconds, self.enrollment.progress_percentage, self.enrollment.completed),
+            (100, 50.0, False),
+        )
+
+    def test_recompute_command_repairs_drift(self):
+        self.watch(self.first, 30)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(
+            watched_seconds=170, progress_percentage=85.0, completed=True
+        )
+        version = dashboard_cache.get_version(self.student.pk)
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recompute_progress', batch_size=1, stdout=out)
+        self.assertIn('Repaired 1 enrollments', out.getvalue())
+        self.enrollment.refresh_from_db()
+        # A stale completed flag is cleared along with the drifted counts
+        self.assertEqual(
+            (self.enrollment.watched_seconds, self.enrollment.progress_percentage, self.enrollment.completed),
+            (30, 15.0, False),
+        )
+        self.assertNotEqual(dashboard_cache.get_version(self.student.pk), version)
+
+        out = StringIO()
+        call_command('recompute_progress', course=self.course.pk, stdout=out)
+        self.assertIn('Repaired 0 enrollments', out.getvalue())
+
+
+class ProgressBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        creator = User.objects.create_user('instructor')
+        self.student = User.objects.create_user('student')
+        self.course = Course.objects.create(title='Python', description='d', creator=creator)
+        self.video = Video.objects.create(course=self.course, title='Intro', duration_seconds=100)
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        # Flushed by hand, no background thread
+        patcher = mock.patch.object(ProgressBuffer, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buffer = ProgressBuffer(interval=60, max_size=3)
+
+    def progress(self):
+        return list(CourseProgress.objects.values_list('video_id', 'watched_seconds', 'completed'))
+
+    def test_heartbeats_are_merged_until_flushed(self):
+        self.buffer.add(self.enrollment.pk, self.video.pk, 30)
+        self.buffer.add(self.enrollment.pk, self.video.pk, 50, completed=True)
+        self.buffer.add(self.enrollment.pk, self.video.pk, 40)
+        self.assertEqual(len(self.buffer), 1)
+        self.assertEqual(self.progress(), [])
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(self.progress(), [(self.video.pk, 50, True)])
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_max_size_flushes(self):
+        videos = [self.video] + [
+            Video.objects.create(course=self.course, title=f'Part {i}', duration_seconds=100)
+            for i in range(2)
+        ]
+        for video in videos[:2]:
+            self.buffer.add(self.enrollment.pk, video.pk, 10)
+        self.assertEqual(self.progress(), [])
+        self.buffer.add(self.enrollment.pk, videos[2].pk, 10)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(CourseProgress.objects.count(), 3)
+
+    def test_flush_upserts_without_moving_back(self):
+        CourseProgress.objects.create(enrollment=self.enrollment, video=self.video, watched_seconds=70)
+        other = Video.objects.create(course=self.course, title='Types', duration_seconds=100)
+        self.buffer.add(self.enrollment.pk, self.video.pk, 20)
+        self.buffer.add(self.enrollment.pk, other.pk, 20)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 2)
+        writes = [q['sql'] for q in queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('ON CONFLICT', writes[0])
+        self.assertCountEqual(self.progress(), [(self.video.pk, 70, False), (other.pk, 20, False)])
+
+    def test_failed_flush_is_merged_back(self):
+        self.buffer.add(self.enrollment.pk, self.video.pk, 30)
+        with mock.patch('courses.progress.apply_progress_deltas', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+        # The batch's upsert was rolled back along with it
+        self.assertEqual(self.progress(), [])
+        self.assertEqual(len(self.buffer), 1)
+
+        self.buffer.add(self.enrollment.pk, self.video.pk, 20, completed=True)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.progress(), [(self.video.pk, 30, True)])
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.watched_seconds, 100)
+
+
+class ProgressHeartbeatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        creator = User.objects.create_user('instructor')
+        self.student = User.objects.create_user('student')
+        other = User.objects.create_user('other')
+        self.course, other_course = [
+            Course.objects.create(title=title, description='d', creator=creator)
+            for title in ('Python', 'Art')
+        ]
+        self.video = Video.objects.create(course=self.course, title='Intro', duration_seconds=100)
+        self.foreign_video = Video.objects.create(course=other_course, title='Colour', duration_seconds=100)
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.others = Enrollment.objects.create(student=other, course=self.course)
+        # Written through, no background thread
+        patcher = mock.patch('courses.views.progress_buffer', ProgressBuffer(interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def post(self, *heartbeats):
+        return self.client.post(reverse('progress-heartbeats'), {'heartbeats': [
+            {'enrollment': enrollment.pk, 'video': video.pk, 'watched_seconds': seconds}
+            for enrollment, video, seconds in heartbeats
+        ]}, format='json')
+
+    def test_only_own_enrollments_and_their_course_videos_are_accepted(self):
+        response = self.post(
+            (self.enrollment, self.video, 40),
+            (self.others, self.video, 90),
+            (self.enrollment, self.foreign_video, 90),
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {'accepted': 1, 'rejected': 2})
+        self.assertEqual(
+            list(CourseProgress.objects.values_list('enrollment_id', 'video_id', 'watched_seconds')),
+            [(self.enrollment.pk, self.video.pk, 40)],
+        )
+
+    def test_invalid_batches_are_refused(self):
+        self.assertEqual(self.post().status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.post((self.enrollment, self.video, 40)).status_code, 401)
+        self.assertFalse(CourseProgress.objects.exists())
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.instructor = User.objects.create_user('instructor', 'i@example.com')
+        self.python, self.django, self.sql, self.art = [
+            Course.objects.create(title=title, description='d', creator=self.instructor, status='published')
+            for title in ('Python', 'Django', 'SQL', 'Drawing')
+        ]
+        # Django is taken with Python far more often than SQL is; nobody
+        # who draws takes the others
+        enrollments = {
+            self.python: range(10),
+            self.django: range(8),
+            self.sql: range(5, 10),
+            self.art: range(10, 14),
+        }
+        self.students = [User.objects.create_user(f'student{i}') for i in range(14)]
+        for course, students in enrollments.items():
+            for i in students:
+                Enrollment.objects.create(student=self.students[i], course=course)
+
+    def test_similar_courses_are_ranked_by_cosine_similarity(self):
+        courses, rows = rebuild_similar_courses(top_k=5, min_co_enrollments=1)
+        self.assertEqual((courses, rows), (3, 6))
+
+        response = self.client.get(f'/api/v1/courses/{self.python.pk}/similar/')
+        similar = [(row['course']['id'], round(row['score'], 3)) for row in response.json()]
+        # 8 / sqrt(10 * 8) and 5 / sqrt(10 * 5)
+        self.assertEqual(similar, [(self.django.pk, 0.894), (self.sql.pk, 0.707)])
+        self.assertFalse(self.client.get(f'/api/v1/courses/{self.art.pk}/similar/').json())
+
+    def test_recommendations_skip_enrolled_courses(self):
+        rebuild_similar_courses(top_k=5, min_co_enrollments=1)
+        student = User.objects.create_user('newcomer')
+        Enrollment.objects.create(student=student, course=self.python)
+        Enrollment.objects.create(student=student, course=self.django)
+
+        with CaptureQueriesContext(connection) as queries:
+            recommended = recommended_for(student)
+        self.assertEqual([course.pk for course in recommended], [self.sql.pk])
+        self.assertEqual(len(queries), 3)
+
+    def test_recommended_endpoint(self):
+        rebuild_similar_courses(top_k=5, min_co_enrollments=1)
+        url = reverse('course-recommended')
+        client = APIClient()
+        self.assertEqual(client.get(url).status_code, 401)
+
+        student = User.objects.create_user('newcomer')
+        Enrollment.objects.create(student=student, course=self.python)
+        client.force_authenticate(student)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        courses = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([c['id'] for c in courses], [self.django.pk, self.sql.pk])
+        self.assertEqual([round(c['score'], 3) for c in courses], [0.894, 0.707])
 
-# Create your tests here.
+        # No neighbours to go on: the most enrolled courses they are not
+        # in, unscored
+        client.force_authenticate(self.students[10])
+        courses = client.get(url).data
+        courses = courses['results'] if isinstance(courses, dict) else courses
+        self.assertEqual(
+            [c['id'] for c in courses], [self.python.pk, self.django.pk, self.sql.pk]
+        )
+        self.assertEqual({c['score'] for c in courses}, {None})
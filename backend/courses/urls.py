@@ -3,6 +3,12 @@ from . import views
 
 urlpatterns = [
     path('courses/', views.CourseListView.as_view(), name='course-list'),
+    path('courses/tags/', views.TagFacetView.as_view(), name='course-tags'),
+    path('courses/search/', views.CourseSearchView.as_view(), name='course-search'),
+    path('courses/recommended/', views.RecommendedCoursesView.as_view(), name='course-recommended'),
     path('courses/<int:pk>/', views.CourseDetailView.as_view(), name='course-detail'),
+    path('courses/<int:pk>/similar/', views.SimilarCoursesView.as_view(), name='course-similar'),
+    path('courses/<int:pk>/enrollments/bulk/', views.BulkEnrollmentView.as_view(), name='course-bulk-enroll'),
     path('courses/<int:course_id>/videos/', views.VideoListView.as_view(), name='video-list'),
+    path('progress/heartbeats/', views.ProgressHeartbeatView.as_view(), name='progress-heartbeats'),
 ]
@@ -0,0 +1,55 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+# Characters kept free at the end of a slug for a "-<n>" suffix
+SUFFIX_ROOM = 10
+
+
+def unique_slug(model, value, max_length, field='slug'):
+    """
+    Return the first free slug for `value` using a single prefix query:
+    the base slug if nobody has it, otherwise one past the highest
+    numeric suffix already taken.
+    """
+    base = slugify(value)[:max_length - SUFFIX_ROOM].strip('-') or model._meta.model_name
+    taken = set(
+        model._default_manager
+        .filter(**{f'{field}__startswith': base})
+        .values_list(field, flat=True)
+    )
+    if base not in taken:
+        return base
+
+    suffix_re = re.compile(rf'^{re.escape(base)}-(\d+)$')
+    highest = 0
+    for slug in taken:
+        match = suffix_re.match(slug)
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return f'{base}-{highest + 1}'
+
+
+def save_with_unique_slug(instance, value, save, *args, attempts=5, **kwargs):
+    """
+    Run `save(*args, **kwargs)` after allocating a slug for `instance` if it
+    has none. A concurrent insert can still claim the same slug first, so the
+    save runs in a savepoint and is retried with a fresh slug when it fails
+    with an IntegrityError and the slug turns out to be taken; any other
+    IntegrityError is raised as is.
+    """
+    if instance.slug:
+        return save(*args, **kwargs)
+
+    max_length = instance._meta.get_field('slug').max_length
+    for attempt in range(attempts):
+        instance.slug = unique_slug(type(instance), value, max_length)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            slug_taken = type(instance)._default_manager.filter(slug=instance.slug).exists()
+            instance.slug = ''
+            if not slug_taken or attempt == attempts - 1:
+                raise
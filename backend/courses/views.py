@@ -1,11 +1,26 @@
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.http import HttpResponse
 from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 from django.views.generic import TemplateView
 
-from .models import Course
-from .serializers import CourseSerializer, CourseCreateSerializer
+from . import cache as course_cache
+
+from .enrollment import bulk_enroll, resolve_students
+from .models import Course, Enrollment, Tag
+from .pagination import CourseCursorPagination, CourseSearchPagination, TagFacetPagination
+from .progress import progress_buffer
+from .recommendations import recommended_for, similar_to
+from .search import search_courses
+from .serializers import (
+    CourseSerializer, CourseSummarySerializer, CourseCreateSerializer,
+    TagFacetSerializer, BulkEnrollmentSerializer, HeartbeatBatchSerializer,
+    SimilarCourseSerializer, RecommendedCourseSerializer, wants_full_detail
+)
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -16,11 +31,33 @@ from .serializers import VideoSerializer
 class CourseListView(generics.ListCreateAPIView):
     """List all courses or create new course"""
     queryset = Course.objects.all()
+    pagination_class = CourseCursorPagination
+    
+    def get_queryset(self):
+        queryset = Course.objects.select_related('creator')
+        if wants_full_detail(self.request):
+            queryset = queryset.prefetch_related('videos')
+        
+        # Filter by tag through the normalized (tag, course) index
+        tag = self.request.query_params.get('tag')
+        if tag:
+            queryset = queryset.filter(course_tags__tag__name=tag.strip().lower())
+        
+        return queryset
+    
+    def paginate_queryset(self, queryset):
+        # Cursor mode is opt-in so existing clients keep getting a plain list
+        params = self.request.query_params
+        if 'cursor' not in params and 'page_size' not in params:
+            return None
+        return super().paginate_queryset(queryset)
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return CourseCreateSerializer
-        return CourseSerializer
+        if wants_full_detail(self.request):
+            return CourseSerializer
+        return CourseSummarySerializer
     
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -36,17 +73,181 @@ class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     
+    def get_queryset(self):
+        return Course.objects.select_related('creator').prefetch_related('videos')
+    
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
+    
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs['pk']
+        version = course_cache.get_version(pk)
+        etag = course_cache.make_etag(pk, version)
+        
+        # A matching If-None-Match is answered before anything is loaded
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        
+        entry = course_cache.get_entry(pk, version)
+        if entry is None:
+            course = self.get_object()
+            entry = {
+                'data': dict(self.get_serializer(course).data),
+                'last_modified': int(course.updated_at.timestamp()),
+            }
+            course_cache.set_entry(pk, version, entry)
+        
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=entry['last_modified']
+        )
+        if not_modified is not None:
+            return not_modified
+        
+        return Response(entry['data'], headers={
+            'ETag': etag,
+            'Last-Modified': http_date(entry['last_modified']),
+        })
+
+
+class CourseSearchView(generics.ListAPIView):
+    """Ranked full-text search over course title, descriptions and tags"""
+    permission_classes = [permissions.AllowAny]
+    pagination_class = CourseSearchPagination
+    
+    def get_serializer_class(self):
+        if wants_full_detail(self.request):
+            return CourseSerializer
+        return CourseSummarySerializer
+    
+    def get_queryset(self):
+        params = self.request.query_params
+        filters = {}
+        for field in ('level', 'category'):
+            if params.get(field):
+                filters[field] = params[field]
+        is_paid = params.get('is_paid')
+        if is_paid in ('true', 'false'):
+            filters['is_paid'] = is_paid == 'true'
+        
+        queryset = Course.objects.select_related('creator')
+        if wants_full_detail(self.request):
+            queryset = queryset.prefetch_related('videos')
+        return search_courses(params.get('q', ''), filters, queryset)
+
+
+class TagFacetView(generics.ListAPIView):
+    """Tags with their published course counts, most used first"""
+    serializer_class = TagFacetSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = TagFacetPagination
+    
+    def get_queryset(self):
+        return Tag.objects.filter(published_course_count__gt=0).order_by(
+            '-published_course_count', 'name'
+        )
+
+
+class SimilarCoursesView(generics.ListAPIView):
+    """Courses most often taken together with this one, precomputed offline"""
+    serializer_class = SimilarCourseSerializer
+    permission_classes = [permissions.AllowAny]
+    
+    def get_queryset(self):
+        return similar_to(self.kwargs['pk'])
+
+
+class RecommendedCoursesView(generics.ListAPIView):
+    """Courses recommended to the user from what they are enrolled in"""
+    serializer_class = RecommendedCourseSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return recommended_for(self.request.user)
+
+
+class BulkEnrollmentView(APIView):
+    """Enroll a cohort of students into a course in one request"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, pk):
+        course = get_object_or_404(Course, pk=pk)
+        if course.creator_id != request.user.id and not request.user.is_staff:
+            return Response(
+                {'error': 'Only the course creator can enroll students'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = BulkEnrollmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        users, not_found = resolve_students(
+            serializer.validated_data['student_ids'],
+            serializer.validated_data['usernames']
+        )
+        report = bulk_enroll(course, users)
+        
+        results = [
+            {'id': user.pk, 'username': user.username, 'status': report[user.pk]}
+            for user in users
+        ]
+        return Response({
+            'created': sum(1 for r in results if r['status'] == 'created'),
+            'already_enrolled': sum(1 for r in results if r['status'] == 'already_enrolled'),
+            'not_found': not_found,
+            'results': results,
+        })
+
+
+class ProgressHeartbeatView(APIView):
+    """Accept a batch of watch-progress heartbeats for the current user"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = HeartbeatBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        heartbeats = serializer.validated_data['heartbeats']
+        
+        # Only keep heartbeats for the user's own enrollments and for videos
+        # that belong to the enrolled course
+        enrollments = dict(
+            Enrollment.objects.filter(
+                student=request.user,
+                pk__in={hb['enrollment'] for hb in heartbeats}
+            ).values_list('id', 'course_id')
+        )
+        videos = dict(
+            Video.objects.filter(
+                pk__in={hb['video'] for hb in heartbeats}
+            ).values_list('id', 'course_id')
+        )
+        
+        accepted = 0
+        for hb in heartbeats:
+            course_id = enrollments.get(hb['enrollment'])
+            if course_id is None or videos.get(hb['video']) != course_id:
+                continue
+            progress_buffer.add(
+                hb['enrollment'], hb['video'], hb['watched_seconds'], hb['completed']
+            )
+            accepted += 1
+        
+        return Response(
+            {'accepted': accepted, 'rejected': len(heartbeats) - accepted},
+            status=status.HTTP_202_ACCEPTED
+        )
 
 
 @api_view(['GET'])
 def course_list_api(request):
     """Legacy API endpoint"""
-    courses = Course.objects.all()
-    serializer = CourseSerializer(courses, many=True)
+    courses = Course.objects.select_related('creator')
+    if wants_full_detail(request):
+        courses = courses.prefetch_related('videos')
+        serializer = CourseSerializer(courses, many=True)
+    else:
+        serializer = CourseSummarySerializer(courses, many=True)
     return Response(serializer.data)
 
 
@@ -63,8 +264,28 @@ def course_list_html(request):
 
 def course_detail_html(request, pk):
     """HTML view for single course"""
-    course = get_object_or_404(Course, pk=pk)
-    return render(request, 'courses/detail.html', {'course': course})
+    # The page differs only for the course's creator, so there are two
+    # cached variants rather than one per viewer
+    is_creator = request.user.is_authenticated and (
+        Course.objects.filter(pk=pk).values_list('creator_id', flat=True).first()
+        == request.user.pk
+    )
+    kind = 'html-creator' if is_creator else 'html'
+    version = course_cache.get_version(pk)
+    etag = course_cache.make_etag(pk, version, kind=kind)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content = course_cache.get_entry(pk, version, kind=kind)
+        if content is None:
+            course = get_object_or_404(Course.objects.select_related('creator').prefetch_related('videos'), pk=pk)
+            # Flash messages belong to one session and must not be cached
+            context = {'course': course, 'is_creator': is_creator, 'messages': ()}
+            content = render_to_string('courses/detail.html', context, request)
+            course_cache.set_entry(pk, version, content, kind=kind)
+        response = HttpResponse(content)
+        response['ETag'] = etag
+    patch_vary_headers(response, ['Cookie'])
+    return response
 
 
 def create_course_html(request):
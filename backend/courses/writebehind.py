@@ -0,0 +1,98 @@
+"""
+Write-behind buffering shared by courses.progress and groups.downloads.
+
+Values added under the same key are merged in memory and a subclass writes
+everything pending in one batch: from a background thread every `interval`
+seconds, as soon as `max_size` keys are pending, and once more when the
+process exits. An interval of 0 writes every add through immediately. A
+failed write puts its batch back, merged with anything added since, so the
+next flush retries it.
+"""
+import atexit
+import logging
+import threading
+
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    thread_name = 'write-behind-flush'
+
+    def __init__(self, interval, max_size=None):
+        self.interval = interval
+        self.max_size = max_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def merge(self, old, new):
+        """The value pending for a key after `new` is added to `old`"""
+        raise NotImplementedError
+
+    def write(self, pending):
+        """Write {key: value}; returns the number of rows written"""
+        raise NotImplementedError
+
+    def add(self, key, value):
+        size = self._merge(key, value)
+        if self.interval <= 0 or (self.max_size is not None and size >= self.max_size):
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def _merge(self, key, value):
+        with self._lock:
+            if key in self._pending:
+                value = self.merge(self._pending[key], value)
+            self._pending[key] = value
+            return len(self._pending)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Write everything pending; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                return self.write(pending)
+            except Exception:
+                # Put the batch back so the next flush retries it
+                for key, value in pending.items():
+                    self._merge(key, value)
+                raise
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('%s failed', self.thread_name)
+            finally:
+                connection.close()
+
+    def shutdown(self):
+        self._stop.set()
+        self.flush()
+
+    def register_shutdown(self):
+        """Flush at interpreter exit; returns the buffer"""
+        atexit.register(self.shutdown)
+        return self
@@ -0,0 +1,177 @@
+"""
+Cold storage for group chat history.
+
+`manage.py archive_messages` moves messages older than
+GROUP_MESSAGE_ARCHIVE_AFTER_DAYS out of GroupMessage into gzip-compressed
+NDJSON segment files under <group id>/ in the private 'group_archive'
+storage (settings.STORAGES), which nothing serves over HTTP. Each run
+appends new files of at most GROUP_MESSAGE_SEGMENT_SIZE messages per
+group and never rewrites old ones; a MessageArchiveSegment row records
+every file's id and time bounds.
+
+The chat history API reads on into the archive once a page runs past the
+hot table. Archived messages are no longer in the message search index.
+"""
+import gzip
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import GroupMessage, MessageArchiveSegment
+
+STORAGE_ALIAS = 'group_archive'
+
+# GroupMessage fields kept in a segment; the group is implied by the file
+FIELDS = (
+    'id', 'sender_id', 'content', 'is_system_message', 'is_pinned',
+    'attachment', 'attachment_name', 'created_at', 'updated_at',
+)
+
+# Decoded segments kept in memory; segment files never change
+SEGMENT_CACHE_SIZE = 8
+
+
+def archive_storage():
+    return storages[STORAGE_ALIAS]
+
+
+def _record(message):
+    record = {field: getattr(message, field) for field in FIELDS}
+    record['attachment'] = message.attachment.name or ''
+    record['created_at'] = message.created_at.isoformat()
+    record['updated_at'] = message.updated_at.isoformat()
+    return record
+
+
+def _position(record):
+    return record['created_at'], record['id']
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def _read(path):
+    """Records of a segment file in (created_at, id) order"""
+    with archive_storage().open(path, 'rb') as f:
+        lines = gzip.decompress(f.read()).splitlines()
+    records = []
+    for line in lines:
+        record = json.loads(line)
+        record['created_at'] = parse_datetime(record['created_at'])
+        record['updated_at'] = parse_datetime(record['updated_at'])
+        records.append(record)
+    return tuple(records)
+
+
+def write_segment(group_id, messages):
+    """Store `messages` (in position order) as a new segment file; returns the unsaved row"""
+    body = ''.join(
+        json.dumps(_record(message), separators=(',', ':')) + '\n' for message in messages
+    )
+    ids = [message.pk for message in messages]
+    path = archive_storage().save(
+        f'{group_id}/{min(ids)}-{max(ids)}.ndjson.gz',
+        ContentFile(gzip.compress(body.encode('utf-8')))
+    )
+    return MessageArchiveSegment(
+        group_id=group_id,
+        path=path,
+        first_message_id=min(ids),
+        last_message_id=max(ids),
+        first_created_at=messages[0].created_at,
+        last_created_at=messages[-1].created_at,
+        message_count=len(messages),
+        system_message_count=sum(message.is_system_message for message in messages),
+    )
+
+
+def archive_group(group_id, cutoff, segment_size=None):
+    """Move one group's messages created before `cutoff` into segments; returns how many"""
+    segment_size = segment_size or settings.GROUP_MESSAGE_SEGMENT_SIZE
+    moved = 0
+    while True:
+        batch = list(
+            GroupMessage.objects.filter(group_id=group_id, created_at__lt=cutoff)
+            .order_by('created_at', 'pk')[:segment_size]
+        )
+        if not batch:
+            return moved
+        segment = write_segment(group_id, batch)
+        try:
+            with transaction.atomic():
+                segment.save()
+                GroupMessage.objects.filter(pk__in=[message.pk for message in batch]).delete()
+        except Exception:
+            archive_storage().delete(segment.path)
+            raise
+        moved += len(batch)
+
+
+def archive_messages(cutoff, segment_size=None):
+    """Archive every group's messages created before `cutoff`; {group id: messages moved}"""
+    group_ids = (
+        GroupMessage.objects.filter(created_at__lt=cutoff)
+        .order_by().values_list('group_id', flat=True).distinct()
+    )
+    return {group_id: archive_group(group_id, cutoff, segment_size) for group_id in list(group_ids)}
+
+
+def archived_position(group_id, pk):
+    """created_at of archived message `pk` in the group, or None"""
+    segments = MessageArchiveSegment.objects.filter(
+        group_id=group_id, first_message_id__lte=pk, last_message_id__gte=pk
+    )
+    for segment in segments:
+        for record in _read(segment.path):
+            if record['id'] == pk:
+                return record['created_at']
+    return None
+
+
+def archived_messages(group_id, limit, before=None, after=None):
+    """
+    Up to `limit` archived messages of a group as unsaved GroupMessage
+    instances. With `before` (a (created_at, id) position, or neither
+    argument) they are the newest ones before it, newest first; with
+    `after`, the oldest ones after it, oldest first.
+    """
+    segments = MessageArchiveSegment.objects.filter(group_id=group_id)
+    if after is not None:
+        segments = segments.filter(last_created_at__gte=after[0]).order_by(
+            'first_created_at', 'first_message_id'
+        )
+    else:
+        if before is not None:
+            segments = segments.filter(first_created_at__lte=before[0])
+        segments = segments.order_by('-last_created_at', '-last_message_id')
+
+    found = []
+    for segment in segments.only('path'):
+        records = _read(segment.path)
+        if after is not None:
+            records = [r for r in records if _position(r) > after]
+        else:
+            records = [r for r in reversed(records) if before is None or _position(r) < before]
+        found.extend(records[:limit - len(found)])
+        if len(found) >= limit:
+            break
+
+    # Messages of deleted users are dropped, as the cascade does for hot rows
+    senders = get_user_model().objects.in_bulk({record['sender_id'] for record in found})
+    messages = []
+    for record in found:
+        sender = senders.get(record['sender_id'])
+        if sender is None:
+            continue
+        message = GroupMessage(
+            group_id=group_id,
+            **{field: record[field] for field in FIELDS if field != 'attachment'},
+            attachment=record['attachment'] or None,
+        )
+        message.sender = sender
+        messages.append(message)
+    return messages
@@ -0,0 +1,223 @@
+"""
+Bulk session check-in/check-out and the attendance summaries they maintain.
+
+Check-in inserts SessionAttendance rows with one bulk_create and check-out
+closes them with one bulk_update; both move the session's and the group's
+AttendanceTotals with F() updates in the same transaction. Seats are
+counted on the session summary row, which is locked while a check-in
+decides who gets in, so max_participants holds under concurrent requests.
+`manage.py reconcile_group_counters` rebuilds the summaries from the rows.
+"""
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    GroupAttendanceSummary, GroupMembership, SessionAttendance,
+    SessionAttendanceSummary, StudySession,
+)
+
+
+def _session_summary(session):
+    """The session's summary row, locked, created with the group's counts on first use"""
+    summary = SessionAttendanceSummary.objects.select_for_update().filter(session=session).first()
+    if summary is not None:
+        return summary
+
+    expected = GroupMembership.objects.filter(group_id=session.group_id, is_banned=False).count()
+    summary, created = SessionAttendanceSummary.objects.select_for_update().get_or_create(
+        session=session, defaults={'expected_count': expected}
+    )
+    if not created:
+        # A concurrent check-in opened it first
+        return summary
+    GroupAttendanceSummary.objects.get_or_create(group_id=session.group_id)
+    GroupAttendanceSummary.objects.filter(group_id=session.group_id).update(
+        session_count=F('session_count') + 1,
+        expected_count=F('expected_count') + expected,
+        updated_at=timezone.now(),
+    )
+    return summary
+
+
+def _add_totals(session, **deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if updates:
+        updates['updated_at'] = timezone.now()
+        SessionAttendanceSummary.objects.filter(session=session).update(**updates)
+        GroupAttendanceSummary.objects.filter(group_id=session.group_id).update(**updates)
+
+
+def check_in(session, user_ids):
+    """
+    Check users in to a session. Returns {user id: status}, status being
+    'checked_in', 'already_checked_in', 'not_member' or 'full'.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    members = set(
+        GroupMembership.objects.filter(
+            group_id=session.group_id, user_id__in=user_ids, is_banned=False
+        ).values_list('user_id', flat=True)
+    )
+
+    with transaction.atomic():
+        summary = _session_summary(session)
+        present = set(
+            SessionAttendance.objects.filter(
+                session=session, user_id__in=members
+            ).values_list('user_id', flat=True)
+        )
+        newcomers = [pk for pk in user_ids if pk in members and pk not in present]
+        if session.max_participants:
+            newcomers = newcomers[:max(0, session.max_participants - summary.attendee_count)]
+
+        SessionAttendance.objects.bulk_create(
+            [SessionAttendance(session=session, user_id=pk) for pk in newcomers],
+            ignore_conflicts=True,
+        )
+        _add_totals(session, attendee_count=len(newcomers))
+
+    checked_in = set(newcomers)
+    report = {}
+    for pk in user_ids:
+        if pk not in members:
+            report[pk] = 'not_member'
+        elif pk in present:
+            report[pk] = 'already_checked_in'
+        else:
+            report[pk] = 'checked_in' if pk in checked_in else 'full'
+    return report
+
+
+def check_out(session, user_ids=None, at=None):
+    """
+    Check users (everyone still present when None) out of a session.
+    Returns {user id: status}, status being 'checked_out' or 'not_checked_in'.
+    """
+    at = at or timezone.now()
+    with transaction.atomic():
+        open_rows = SessionAttendance.objects.select_for_update().filter(
+            session=session, left_at__isnull=True
+        )
+        if user_ids is not None:
+            open_rows = open_rows.filter(user_id__in=user_ids)
+        rows = list(open_rows.only('id', 'user_id', 'joined_at'))
+
+        seconds = 0
+        for row in rows:
+            row.left_at = max(at, row.joined_at)
+            seconds += int((row.left_at - row.joined_at).total_seconds())
+        SessionAttendance.objects.bulk_update(rows, ['left_at'], batch_size=500)
+        _add_totals(session, checked_out_count=len(rows), attended_seconds=seconds)
+
+    report = {row.user_id: 'checked_out' for row in rows}
+    for pk in user_ids or ():
+        report.setdefault(pk, 'not_checked_in')
+    return report
+
+
+def release_session(session):
+    """Take a session's totals out of its group's summary before it is deleted"""
+    summary = SessionAttendanceSummary.objects.filter(session=session).first()
+    if summary is None:
+        return
+    GroupAttendanceSummary.objects.filter(group_id=session.group_id).update(
+        session_count=F('session_count') - 1,
+        expected_count=F('expected_count') - summary.expected_count,
+        attendee_count=F('attendee_count') - summary.attendee_count,
+        checked_out_count=F('checked_out_count') - summary.checked_out_count,
+        attended_seconds=F('attended_seconds') - summary.attended_seconds,
+        updated_at=timezone.now(),
+    )
+
+
+def _create_missing_summaries(session_ids, batch_size):
+    """
+    Summary rows for sessions with attendance but no summary, and for
+    their groups, with the counts left for rebuild_summaries to fill in
+    """
+    missing = set(session_ids) - set(
+        SessionAttendanceSummary.objects.filter(session_id__in=session_ids)
+        .values_list('session_id', flat=True)
+    )
+    groups = dict(StudySession.objects.filter(pk__in=missing).values_list('id', 'group_id'))
+    expected = dict(
+        GroupMembership.objects.filter(group_id__in=set(groups.values()), is_banned=False)
+        .order_by().values_list('group_id').annotate(n=Count('pk'))
+    )
+    SessionAttendanceSummary.objects.bulk_create(
+        [
+            SessionAttendanceSummary(session_id=session_id, expected_count=expected.get(group_id, 0))
+            for session_id, group_id in groups.items()
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+    group_ids = set(
+        SessionAttendanceSummary.objects.order_by()
+        .values_list('session__group_id', flat=True).distinct()
+    )
+    group_ids -= set(GroupAttendanceSummary.objects.values_list('group_id', flat=True))
+    GroupAttendanceSummary.objects.bulk_create(
+        [GroupAttendanceSummary(group_id=group_id) for group_id in group_ids],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_summaries(batch_size=500):
+    """
+    Recompute every summary's counts from SessionAttendance, creating the
+    summaries missing for sessions with attendance; returns how many changed
+    """
+    duration = ExpressionWrapper(F('left_at') - F('joined_at'), output_field=DurationField())
+    totals = {
+        session_id: (attendees, checked_out, int(attended.total_seconds()) if attended else 0)
+        for session_id, attendees, checked_out, attended in
+        SessionAttendance.objects.order_by().values_list('session_id').annotate(
+            attendees=Count('pk'),
+            checked_out=Count('pk', filter=Q(left_at__isnull=False)),
+            attended=Sum(duration, filter=Q(left_at__isnull=False)),
+        )
+    }
+    _create_missing_summaries(totals, batch_size)
+
+    changed = []
+    summaries = SessionAttendanceSummary.objects.select_related('session')
+    for summary in summaries:
+        actual = totals.get(summary.session_id, (0, 0, 0))
+        current = (summary.attendee_count, summary.checked_out_count, summary.attended_seconds)
+        if current != actual:
+            summary.attendee_count, summary.checked_out_count, summary.attended_seconds = actual
+            changed.append(summary)
+    SessionAttendanceSummary.objects.bulk_update(
+        changed, ['attendee_count', 'checked_out_count', 'attended_seconds'], batch_size=batch_size
+    )
+
+    # Group summaries are the sums of their sessions'
+    by_group = {}
+    for summary in summaries:
+        group = by_group.setdefault(summary.session.group_id, [0, 0, 0, 0, 0])
+        group[0] += 1
+        group[1] += summary.expected_count
+        group[2] += summary.attendee_count
+        group[3] += summary.checked_out_count
+        group[4] += summary.attended_seconds
+    groups = []
+    for group in GroupAttendanceSummary.objects.all():
+        actual = by_group.get(group.group_id, [0, 0, 0, 0, 0])
+        current = [
+            group.session_count, group.expected_count, group.attendee_count,
+            group.checked_out_count, group.attended_seconds,
+        ]
+        if current != actual:
+            (group.session_count, group.expected_count, group.attendee_count,
+             group.checked_out_count, group.attended_seconds) = actual
+            groups.append(group)
+    GroupAttendanceSummary.objects.bulk_update(
+        groups,
+        ['session_count', 'expected_count', 'attendee_count', 'checked_out_count', 'attended_seconds'],
+        batch_size=batch_size,
+    )
+    return len(changed) + len(groups)
@@ -0,0 +1,99 @@
+"""
+A user's study sessions across all of their groups, with overlaps flagged.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GroupMembership, StudySession
+from .recurrence import expand, horizon, occurrences_between
+
+
+def lookback():
+    """
+    How far before a window an occurrence may start and still overlap it:
+    the longest a session may run, which its serializers enforce
+    """
+    return timedelta(hours=settings.SESSION_MAX_DURATION_HOURS)
+
+
+def overlapping_pairs(intervals):
+    """
+    Yield (i, j) for every pair of half-open (start, end) intervals that
+    overlap, sweeping them in start order with a heap of those still open.
+    """
+    order = sorted(range(len(intervals)), key=lambda i: intervals[i][0])
+    open_ends = []  # (end, index) of intervals that may still overlap
+    for j in order:
+        start, end = intervals[j]
+        while open_ends and open_ends[0][0] <= start:
+            heapq.heappop(open_ends)
+        for _, i in open_ends:
+            yield i, j
+        heapq.heappush(open_ends, (end, j))
+
+
+def member_group_ids(user):
+    return GroupMembership.objects.filter(user=user, is_banned=False).values('group_id')
+
+
+def user_calendar(user, start, end):
+    """
+    Occurrences in [start, end) of sessions in all of the user's groups,
+    each with `conflicts_with`: the ids of other sessions it overlaps.
+    """
+    occurrences = occurrences_between(start, end, group_id__in=member_group_ids(user))
+    for occurrence in occurrences:
+        occurrence.conflicts_with = []
+    intervals = [(o.start_time, o.end_time) for o in occurrences]
+    for i, j in overlapping_pairs(intervals):
+        occurrences[i].conflicts_with.append(occurrences[j].session_id)
+        occurrences[j].conflicts_with.append(occurrences[i].session_id)
+    return occurrences
+
+
+def find_conflicts(user, start_time, end_time, is_recurring=False, recurrence_pattern=''):
+    """
+    Occurrences in the user's groups that a proposed session would overlap,
+    checking a recurring proposal up to the materialization horizon.
+    Each carries `conflicts_at`, the proposed start times it collides with.
+    """
+    proposed = StudySession(
+        start_time=start_time,
+        end_time=end_time,
+        is_recurring=is_recurring,
+        recurrence_pattern=recurrence_pattern,
+    )
+    window_end = max(horizon(), end_time) if is_recurring else end_time
+    window_start = max(start_time, timezone.now()) if is_recurring else start_time
+    proposed_intervals = list(expand(proposed, window_start, window_end))
+    if not proposed_intervals:
+        return []
+
+    existing = occurrences_between(
+        proposed_intervals[0][0] - lookback(),
+        proposed_intervals[-1][1],
+        group_id__in=member_group_ids(user),
+    )
+    intervals = proposed_intervals + [(o.start_time, o.end_time) for o in existing]
+    split = len(proposed_intervals)
+
+    conflicts = {}
+    for i, j in overlapping_pairs(intervals):
+        # Only pairs of one proposed and one existing occurrence matter
+        if (i < split) == (j < split):
+            continue
+        proposed_index, existing_index = (i, j) if i < split else (j, i)
+        occurrence = existing[existing_index - split]
+        conflicts.setdefault(id(occurrence), (occurrence, []))[1].append(
+            proposed_intervals[proposed_index][0]
+        )
+
+    result = []
+    for occurrence, starts in conflicts.values():
+        occurrence.conflicts_at = sorted(starts)
+        result.append(occurrence)
+    result.sort(key=lambda occurrence: (occurrence.start_time, occurrence.session_id))
+    return result
@@ -0,0 +1,162 @@
+"""
+Serving GroupResource files.
+
+Downloads honour conditional requests (an ETag built from the file's size
+and mtime) and single byte ranges. When GROUP_RESOURCE_SENDFILE names a
+front-end server header ('X-Sendfile' or 'X-Accel-Redirect'), Django only
+authorizes the request and the web server streams the file itself.
+
+Download counts are added up in memory and written with one UPDATE every
+DOWNLOAD_COUNT_FLUSH_INTERVAL seconds, and once more at exit (see
+courses.writebehind).
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.db.models import Case, F, Value, When
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+from courses.writebehind import WriteBehindBuffer
+
+from .models import GroupResource
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def resource_etag(size, mtime):
+    return f'"{size:x}-{int(mtime * 1000000):x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range Range header, None to serve
+    the whole file, or False if the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        # Multiple ranges and malformed headers get the full file
+        return None
+    first, last = match.groups()
+    if first == '':
+        # A suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class RangeFile:
+    """Read-only view of bytes start..end of an open file"""
+
+    def __init__(self, file, start, end):
+        file.seek(start)
+        self.file = file
+        self.remaining = end - start + 1
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def serve_resource(request, resource):
+    """Response for a download of `resource`, counting it when it starts"""
+    name = resource.file.name
+    storage = resource.file.storage
+    try:
+        size = storage.size(name)
+        mtime = storage.get_modified_time(name).timestamp()
+    except FileNotFoundError:
+        raise Http404('Resource file is missing')
+    etag = resource_etag(size, mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if not_modified is not None:
+        return not_modified
+
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    # Follow-up range requests of a download already counted are not new downloads
+    if byte_range is None or byte_range[0] == 0:
+        download_counter.add(resource.pk)
+
+    # Stored files are named by content hash; offer the resource's own name
+    extension = os.path.splitext(name)[1]
+    filename = resource.name
+    if not filename.lower().endswith(extension.lower()):
+        filename += extension
+    sendfile = getattr(settings, 'GROUP_RESOURCE_SENDFILE', None)
+    if sendfile:
+        # The front-end server handles ranges itself
+        response = HttpResponse()
+        if sendfile.lower() == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.GROUP_RESOURCE_ACCEL_PREFIX + name
+        else:
+            response[sendfile] = resource.file.path
+        response['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    elif byte_range is None:
+        response = FileResponse(storage.open(name, 'rb'), as_attachment=True, filename=filename)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(storage.open(name, 'rb'), start, end),
+            as_attachment=True,
+            filename=filename,
+            status=206,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    return response
+
+
+class DownloadCounter(WriteBehindBuffer):
+    """Download counts per resource, written with one UPDATE"""
+    thread_name = 'download-count-flush'
+
+    def __init__(self, interval=None):
+        super().__init__(
+            interval if interval is not None else getattr(settings, 'DOWNLOAD_COUNT_FLUSH_INTERVAL', 10)
+        )
+
+    def add(self, resource_id, count=1):
+        super().add(resource_id, count)
+
+    def merge(self, old, new):
+        return old + new
+
+    def write(self, pending):
+        GroupResource.objects.filter(pk__in=pending).update(
+            download_count=F('download_count') + Case(
+                *[When(pk=pk, then=Value(count)) for pk, count in pending.items()],
+                default=Value(0)
+            )
+        )
+        return len(pending)
+
+
+download_counter = DownloadCounter().register_shutdown()
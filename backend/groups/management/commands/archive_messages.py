@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from groups.archive import archive_messages
+
+
+class Command(BaseCommand):
+    help = (
+        'Move group messages older than --days out of the message table into '
+        'compressed archive segments. Meant to run on a schedule, e.g. nightly from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.GROUP_MESSAGE_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--segment-size', type=int, default=settings.GROUP_MESSAGE_SEGMENT_SIZE)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        moved = archive_messages(cutoff, options['segment_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {sum(moved.values())} messages from {len(moved)} study groups'
+        ))
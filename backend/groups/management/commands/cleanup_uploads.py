@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from groups.uploads import discard_stale_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove chunked resource uploads idle for more than --hours, with their '
+        'part files. Meant to run on a schedule, e.g. hourly from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.RESOURCE_UPLOAD_EXPIRE_HOURS)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        uploads, files = discard_stale_uploads(cutoff)
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {uploads} stale uploads and {files} orphaned part files'
+        ))
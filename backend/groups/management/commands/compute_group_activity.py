@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from groups.suggestions import refresh_activity_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute study group activity scores from recent messages, used to rank '
+        'suggested groups. Run periodically (e.g. hourly from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        changed = refresh_activity_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated activity scores of {changed} study groups'))
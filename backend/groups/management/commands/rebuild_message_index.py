@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from groups.models import GroupMessage
+from groups.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the group message full-text search index from the message table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = get_backend()
+        total = 0
+
+        messages = GroupMessage.objects.only('group_id', 'content', 'is_system_message')
+        with transaction.atomic():
+            backend.clear()
+            batch = []
+            for message in messages.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append(message)
+                if len(batch) >= batch_size:
+                    backend.index(batch)
+                    total += len(batch)
+                    batch = []
+            backend.index(batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} messages'))
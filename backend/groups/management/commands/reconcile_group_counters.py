@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from groups.attendance import rebuild_summaries
+from groups.models import GroupMembership, GroupMessage, MessageArchiveSegment, StudyGroup
+
+
+def grouped_counts(queryset, field):
+    """{field value: row count} from a single GROUP BY query"""
+    return dict(queryset.order_by().values_list(field).annotate(n=Count('pk')))
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized study group counters and attendance summaries from their source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            members = grouped_counts(GroupMembership.objects.all(), 'group')
+            # System join/leave notices are not counted as messages
+            messages = grouped_counts(GroupMessage.objects.filter(is_system_message=False), 'group')
+            # Archived messages still count
+            archived = (
+                MessageArchiveSegment.objects.order_by().values_list('group')
+                .annotate(n=Sum(F('message_count') - F('system_message_count')))
+            )
+            for group_id, count in archived:
+                messages[group_id] = messages.get(group_id, 0) + count
+            groups = []
+            for group in StudyGroup.objects.only('id', 'member_count', 'message_count'):
+                member_count = members.get(group.id, 0)
+                message_count = messages.get(group.id, 0)
+                if (group.member_count, group.message_count) != (member_count, message_count):
+                    group.member_count = member_count
+                    group.message_count = message_count
+                    groups.append(group)
+            StudyGroup.objects.bulk_update(
+                groups, ['member_count', 'message_count'], batch_size=batch_size
+            )
+
+            summaries = rebuild_summaries(batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {len(groups)} study groups and {summaries} attendance summaries'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from groups.recurrence import extend_occurrences
+
+
+class Command(BaseCommand):
+    help = (
+        'Materialize study session occurrences up to SESSION_OCCURRENCE_WEEKS ahead. '
+        'Run daily (e.g. from cron) to keep the horizon moving, and once after '
+        'migrating to backfill existing sessions.'
+    )
+
+    def handle(self, *args, **options):
+        updated = extend_occurrences()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed occurrences of {updated} study sessions'))
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE groups_groupmessage_fts USING fts5("
+            "content, scope, content='', tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO groups_groupmessage_fts (rowid, content, scope) "
+            "SELECT id, content, "
+            "'g' || group_id || CASE WHEN is_system_message THEN ' system' ELSE '' END "
+            "FROM groups_groupmessage"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE groups_groupmessage_search ("
+            "message_id bigint PRIMARY KEY REFERENCES groups_groupmessage (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "group_id bigint NOT NULL, "
+            "is_system boolean NOT NULL, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX groups_groupmessage_search_document_idx "
+            "ON groups_groupmessage_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX groups_groupmessage_search_group_idx "
+            "ON groups_groupmessage_search (group_id)"
+        )
+        schema_editor.execute(
+            "INSERT INTO groups_groupmessage_search (message_id, group_id, is_system, document) "
+            "SELECT id, group_id, is_system_message, to_tsvector('english', content) "
+            "FROM groups_groupmessage"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS groups_groupmessage_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS groups_groupmessage_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
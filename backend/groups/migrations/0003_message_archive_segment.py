@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0002_message_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255)),
+                ('first_message_id', models.BigIntegerField()),
+                ('last_message_id', models.BigIntegerField()),
+                ('first_created_at', models.DateTimeField()),
+                ('last_created_at', models.DateTimeField()),
+                ('message_count', models.PositiveIntegerField()),
+                ('system_message_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_segments', to='groups.studygroup')),
+            ],
+            options={
+                'ordering': ['group', 'first_created_at'],
+                'indexes': [models.Index(fields=['group', 'last_created_at'], name='groups_mess_group_i_5bd416_idx'), models.Index(fields=['group', 'first_message_id', 'last_message_id'], name='groups_mess_group_i_de28fd_idx')],
+            },
+        ),
+    ]
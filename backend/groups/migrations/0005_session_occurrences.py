@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0004_resourceupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='occurrences_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='SessionOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_occurrences', to='groups.studygroup')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='groups.studysession')),
+            ],
+            options={
+                'ordering': ['start_time'],
+                'indexes': [models.Index(fields=['group', 'start_time'], name='groups_sess_group_i_e02329_idx')],
+                'unique_together': {('session', 'start_time')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0005_session_occurrences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupAttendanceSummary',
+            fields=[
+                ('expected_count', models.PositiveIntegerField(default=0)),
+                ('attendee_count', models.PositiveIntegerField(default=0)),
+                ('checked_out_count', models.PositiveIntegerField(default=0)),
+                ('attended_seconds', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance_summary', serialize=False, to='groups.studygroup')),
+                ('session_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SessionAttendanceSummary',
+            fields=[
+                ('expected_count', models.PositiveIntegerField(default=0)),
+                ('attendee_count', models.PositiveIntegerField(default=0)),
+                ('checked_out_count', models.PositiveIntegerField(default=0)),
+                ('attended_seconds', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance_summary', serialize=False, to='groups.studysession')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:52
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def mark_existing_history_read(apps, schema_editor):
+    # Existing members start caught up rather than with their whole history unread
+    GroupMembership = apps.get_model('groups', 'GroupMembership')
+    GroupMessage = apps.get_model('groups', 'GroupMessage')
+    latest = GroupMessage.objects.filter(group=OuterRef('group')).order_by('-created_at', '-pk')
+    GroupMembership.objects.update(
+        last_read_message_id=Subquery(latest.values('pk')[:1]),
+        last_read_at=Subquery(latest.values('created_at')[:1]),
+    )
+    GroupMembership.objects.filter(last_read_message_id__isnull=True).update(last_read_message_id=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0006_attendance_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupmembership',
+            name='last_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='groupmembership',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0, null=True),
+        ),
+        migrations.RunPython(mark_existing_history_read, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='groupmembership',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
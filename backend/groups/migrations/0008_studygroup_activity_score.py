@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0007_membership_read_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studygroup',
+            name='activity_score',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from dateutil.rrule import rrulestr
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+# Frozen copies of groups.recurrence as of this migration, so later changes
+# to the live code do not change what it did
+HORIZON = timedelta(weeks=12)
+SHORTHANDS = {
+    'daily': 'FREQ=DAILY',
+    'weekly': 'FREQ=WEEKLY',
+    'biweekly': 'FREQ=WEEKLY;INTERVAL=2',
+    'monthly': 'FREQ=MONTHLY',
+}
+
+
+def session_rule(session):
+    """The session's rrule in local time, or None for a one-off session"""
+    if not session.is_recurring:
+        return None
+    text = (session.recurrence_pattern or '').strip()
+    text = SHORTHANDS.get(text.lower(), text)
+    if text.upper().startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    if not text:
+        return None
+    try:
+        return rrulestr(text, dtstart=timezone.localtime(session.start_time))
+    except ValueError:
+        return None
+
+
+def occurrences(session, until):
+    rule = session_rule(session)
+    if rule is None:
+        # A one-off session is stored however far ahead it is
+        yield session.start_time, session.end_time
+        return
+    duration = session.end_time - session.start_time
+    for start_time in rule.xafter(timezone.localtime(session.start_time), inc=True):
+        if start_time >= until:
+            return
+        yield start_time, start_time + duration
+
+
+def backfill_occurrences(apps, schema_editor):
+    """Materialize the sessions created before SessionOccurrence existed"""
+    StudySession = apps.get_model('groups', 'StudySession')
+    SessionOccurrence = apps.get_model('groups', 'SessionOccurrence')
+    until = timezone.now() + HORIZON
+
+    rows = []
+    sessions = StudySession.objects.filter(occurrences_until__isnull=True)
+    for session in sessions.iterator(chunk_size=BATCH_SIZE):
+        if session.is_cancelled:
+            continue
+        for start_time, end_time in occurrences(session, until):
+            rows.append(SessionOccurrence(
+                session_id=session.pk, group_id=session.group_id,
+                start_time=start_time, end_time=end_time,
+            ))
+            if len(rows) >= BATCH_SIZE:
+                SessionOccurrence.objects.bulk_create(rows, ignore_conflicts=True)
+                rows = []
+    SessionOccurrence.objects.bulk_create(rows, ignore_conflicts=True)
+    sessions.update(occurrences_until=until)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0008_studygroup_activity_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_occurrences, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
+import uuid
+
 from django.db import models
+from django.db.models import F
 from django.conf import settings
-from django.utils.text import slugify
+from courses.utils import save_with_unique_slug
 
 User = settings.AUTH_USER_MODEL
 
@@ -40,6 +43,8 @@ class StudyGroup(models.Model):
     # Stats
     member_count = models.PositiveIntegerField(default=0)
     message_count = models.PositiveIntegerField(default=0)
+    # Recency-weighted message count, refreshed by `manage.py compute_group_activity`
+    activity_score = models.FloatField(default=0)
     
     # Resources
     featured_image = models.ImageField(upload_to='study_groups/', null=True, blank=True)
@@ -57,16 +62,8 @@ class StudyGroup(models.Model):
         ]
     
     def save(self, *args, **kwargs):
-        """Auto-generate slug from name"""
-        if not self.slug:
-            self.slug = slugify(self.name)
-            # Make slug unique
-            original_slug = self.slug
-            counter = 1
-            while StudyGroup.objects.filter(slug=self.slug).exists():
-                self.slug = f'{original_slug}-{counter}'
-                counter += 1
-        super().save(*args, **kwargs)
+        """Auto-generate a unique slug from name"""
+        save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
     
     def __str__(self):
         return self.name
@@ -75,21 +72,47 @@ class StudyGroup(models.Model):
     def is_full(self):
         return self.member_count >= self.max_members
     
-    def can_join(self, user):
-        """Check if user can join this group"""
+    def claim_seat(self):
+        """
+        Atomically add one to member_count if the group still has room.
+        Returns False when concurrent joins filled it first.
+        """
+        return bool(
+            StudyGroup.objects
+            .filter(pk=self.pk, member_count__lt=F('max_members'))
+            .update(member_count=F('member_count') + 1)
+        )
+    
+    def release_seat(self):
+        """Atomically subtract one from member_count"""
+        StudyGroup.objects.filter(pk=self.pk, member_count__gt=0).update(
+            member_count=F('member_count') - 1
+        )
+    
+    def can_join(self, user, is_member=None, is_enrolled=None):
+        """
+        Check if user can join this group.
+        
+        List views pass is_member/is_enrolled preloaded for the whole page;
+        when they are None the membership and enrollment are queried here.
+        """
         if not self.is_active:
             return False, "Group is not active"
         
         if self.is_full:
             return False, "Group is full"
         
-        if self.privacy == 'course' and self.course:
+        if self.privacy == 'course' and self.course_id:
             # Check if user is enrolled in the course
-            from courses.models import Enrollment
-            if not Enrollment.objects.filter(student=user, course=self.course).exists():
+            if is_enrolled is None:
+                from courses.models import Enrollment
+                is_enrolled = Enrollment.objects.filter(student=user, course_id=self.course_id).exists()
+            if not is_enrolled:
                 return False, "You must be enrolled in the course to join"
         
-        if self.members.filter(id=user.id).exists():
+        if is_member is None:
+            is_member = self.members.filter(id=user.id).exists()
+        if is_member:
             return False, "You are already a member"
         
         return True, "Can join"
@@ -108,6 +131,11 @@ class GroupMembership(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     is_banned = models.BooleanField(default=False)
     
+    # Read watermark: the newest message the member has seen, by id and by
+    # its created_at (its position on the message index). See groups.unread
+    last_read_message_id = models.BigIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         unique_together = ['user', 'group']
     
@@ -150,6 +178,37 @@ class GroupMessage(models.Model):
         return f"{self.sender.username}: {self.content[:50]}"
 
 
+class MessageArchiveSegment(models.Model):
+    """
+    A compressed, append-only file of messages moved out of GroupMessage
+    by `manage.py archive_messages` (see groups.archive). The id and time
+    bounds let history reads open only the segments they need.
+    """
+    group = models.ForeignKey(
+        StudyGroup,
+        on_delete=models.CASCADE,
+        related_name='archive_segments'
+    )
+    path = models.CharField(max_length=255)  # In the group_archive storage
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    message_count = models.PositiveIntegerField()
+    system_message_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['group', 'first_created_at']
+        indexes = [
+            models.Index(fields=['group', 'last_created_at']),
+            models.Index(fields=['group', 'first_message_id', 'last_message_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.group.name}: messages {self.first_message_id}-{self.last_message_id}"
+
+
 class GroupResource(models.Model):
     group = models.ForeignKey(
         StudyGroup,
@@ -172,6 +231,30 @@ class GroupResource(models.Model):
         return self.name
 
 
+class ResourceUpload(models.Model):
+    """
+    A chunked upload in progress; becomes a GroupResource once complete
+    (see groups.uploads). The id is part of the upload URLs.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    group = models.ForeignKey(
+        StudyGroup,
+        on_delete=models.CASCADE,
+        related_name='resource_uploads'
+    )
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()  # In bytes
+    received_size = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+
 class StudySession(models.Model):
     SESSION_TYPES = (
         ('lecture', 'Lecture Review'),
@@ -195,6 +278,8 @@ class StudySession(models.Model):
     end_time = models.DateTimeField()
     is_recurring = models.BooleanField(default=False)
     recurrence_pattern = models.CharField(max_length=100, blank=True)
+    # End of the window materialized in SessionOccurrence (see groups.recurrence)
+    occurrences_until = models.DateTimeField(null=True, blank=True, editable=False)
     
     # Virtual meeting
     meeting_link = models.URLField(blank=True)
@@ -218,6 +303,36 @@ class StudySession(models.Model):
         return f"{self.title} - {self.group.name}"
 
 
+class SessionOccurrence(models.Model):
+    """
+    One occurrence of a StudySession, materialized for calendar range
+    queries; the group is copied from the session so those queries stay on
+    the (group, start_time) index.
+    """
+    session = models.ForeignKey(
+        StudySession,
+        on_delete=models.CASCADE,
+        related_name='occurrences'
+    )
+    group = models.ForeignKey(
+        StudyGroup,
+        on_delete=models.CASCADE,
+        related_name='session_occurrences'
+    )
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['start_time']
+        unique_together = ['session', 'start_time']
+        indexes = [
+            models.Index(fields=['group', 'start_time']),
+        ]
+    
+    def __str__(self):
+        return f"{self.session.title} at {self.start_time}"
+
+
 class SessionAttendance(models.Model):
     session = models.ForeignKey(StudySession, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -229,3 +344,55 @@ class SessionAttendance(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.session.title}"
+
+
+class AttendanceTotals(models.Model):
+    """
+    Running attendance totals, moved by groups.attendance as people check
+    in and out so dashboards never scan SessionAttendance.
+    """
+    expected_count = models.PositiveIntegerField(default=0)  # Group members when attendance opened
+    attendee_count = models.PositiveIntegerField(default=0)
+    checked_out_count = models.PositiveIntegerField(default=0)
+    attended_seconds = models.PositiveBigIntegerField(default=0)  # Of checked-out attendees
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+    
+    @property
+    def average_minutes(self):
+        if not self.checked_out_count:
+            return None
+        return round(self.attended_seconds / self.checked_out_count / 60, 1)
+    
+    @property
+    def no_show_rate(self):
+        if not self.expected_count:
+            return None
+        return round(max(0, self.expected_count - self.attendee_count) / self.expected_count, 3)
+
+
+class SessionAttendanceSummary(AttendanceTotals):
+    session = models.OneToOneField(
+        StudySession,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='attendance_summary'
+    )
+    
+    def __str__(self):
+        return f"Attendance of {self.session.title}"
+
+
+class GroupAttendanceSummary(AttendanceTotals):
+    group = models.OneToOneField(
+        StudyGroup,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='attendance_summary'
+    )
+    session_count = models.PositiveIntegerField(default=0)  # Sessions with attendance
+    
+    def __str__(self):
+        return f"Attendance in {self.group.name}"
@@ -0,0 +1,270 @@
+"""
+Real-time push for group chat.
+
+Messages posted through the REST API (and the join/leave notices) are
+published to a per-group channel on a pub/sub broker. Clients subscribe
+over a WebSocket at /ws/groups/<id>/ or, as a fallback, over Server-Sent
+Events at /api/v1/groups/<id>/stream/. Both need a GroupMembership and
+authenticate with either the API token in an Authorization header or,
+for browsers, which cannot set headers on either transport, a ?ticket=
+from POST /api/v1/groups/<id>/stream/ticket/. A ticket is good for one
+connection to one group within GROUP_CHAT_TICKET_TIMEOUT seconds, so the
+URLs that end up in access logs carry nothing reusable.
+
+A subscription ends when its member leaves or is banned (a 'revoked'
+event on the channel), and membership is re-checked every
+GROUP_CHAT_KEEPALIVE seconds for changes that send no event.
+
+Both transports need the ASGI application in config.asgi. Under WSGI
+(runserver without an ASGI server, or the Vercel deployment) there are no
+WebSockets, and the stream view answers 501 rather than buffering an
+endless response.
+
+The broker is pluggable through GROUP_CHAT_BROKER. The default
+InProcessBroker fans out to subscribers in the same process, which is
+enough for a single ASGI server; a multi-process deployment needs a
+broker backed by shared infrastructure with the same publish/subscribe
+interface, and a shared cache for tickets.
+"""
+import asyncio
+import json
+import re
+import secrets
+import threading
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from .models import GroupMembership
+from .serializers import GroupMessageSerializer
+
+WEBSOCKET_PATH = re.compile(r'^/ws/groups/(?P<group_id>\d+)/$')
+TICKET_KEY = 'chat-ticket:{ticket}'
+
+
+def channel_name(group_id):
+    return f'group:{group_id}'
+
+
+class Subscription:
+    """Messages for one subscriber, delivered onto its event loop"""
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        # Called from any thread; a subscriber that stops reading loses
+        # messages rather than growing without bound
+        def put():
+            if not self.queue.full():
+                self.queue.put_nowait(message)
+        self.loop.call_soon_threadsafe(put)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fans messages out to subscribers living in this process"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.channel, None)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.GROUP_CHAT_BROKER)()
+    return _broker
+
+
+def publish_message(message):
+    """Push a GroupMessage to the group's subscribers once it is committed"""
+    event = {'type': 'message', 'message': GroupMessageSerializer(message).data}
+    channel = channel_name(message.group_id)
+    transaction.on_commit(lambda: get_broker().publish(channel, event))
+
+
+def publish_revoke(group_id, user_id):
+    """End the user's subscriptions to the group once the current transaction commits"""
+    event = {'type': 'revoked', 'user_id': user_id}
+    channel = channel_name(group_id)
+    transaction.on_commit(lambda: get_broker().publish(channel, event))
+
+
+# Authentication
+
+def issue_ticket(user_id, group_id):
+    """A single-use ticket letting the user subscribe to the group once"""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(
+        TICKET_KEY.format(ticket=ticket), (user_id, group_id), settings.GROUP_CHAT_TICKET_TIMEOUT
+    )
+    return ticket
+
+
+async def _redeem_ticket(ticket, group_id):
+    """The user id the ticket was issued to for this group; None if unknown or used"""
+    key = TICKET_KEY.format(ticket=ticket)
+    entry = await cache.aget(key)
+    # Only the connection that deletes the ticket gets to use it
+    if entry is None or not await cache.adelete(key):
+        return None
+    user_id, ticket_group_id = entry
+    return user_id if ticket_group_id == group_id else None
+
+
+async def is_member(user, group_id):
+    return await GroupMembership.objects.filter(
+        user=user, group_id=group_id, is_banned=False
+    ).aexists()
+
+
+async def authorize(headers, query_string, group_id):
+    """Return the member user the request authenticates as, or None if it may not subscribe"""
+    from rest_framework.authtoken.models import Token
+
+    ticket = parse_qs(query_string).get('ticket', [None])[0]
+    auth = headers.get('authorization', '')
+    if ticket:
+        user_id = await _redeem_ticket(ticket, group_id)
+        user = await get_user_model().objects.filter(pk=user_id).afirst() if user_id else None
+    elif auth.lower().startswith('token '):
+        token = await Token.objects.select_related('user').filter(
+            key=auth.split(' ', 1)[1].strip()
+        ).afirst()
+        user = token.user if token else None
+    else:
+        user = None
+    if user is None or not user.is_active or not await is_member(user, group_id):
+        return None
+    return user
+
+
+async def member_events(subscription, user, group_id, interval):
+    """
+    Yield the subscription's messages for `user`, and None after `interval`
+    seconds without one; ends when the user stops being a member.
+    """
+    loop = asyncio.get_running_loop()
+    checked = loop.time()
+    while True:
+        try:
+            message = await asyncio.wait_for(subscription.get(), interval)
+        except asyncio.TimeoutError:
+            message = None
+        if message is not None and message['type'] == 'revoked':
+            if message['user_id'] == user.pk:
+                return
+            continue
+        if loop.time() - checked >= interval:
+            if not await is_member(user, group_id):
+                return
+            checked = loop.time()
+        yield message
+
+
+# WebSocket transport (raw ASGI, mounted in config.asgi)
+
+async def websocket_application(scope, receive, send):
+    match = WEBSOCKET_PATH.match(scope['path'])
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    if not match:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    group_id = int(match.group('group_id'))
+    headers = {k.decode('latin1').lower(): v.decode('latin1') for k, v in scope.get('headers', [])}
+    query_string = scope.get('query_string', b'').decode('latin1')
+    user = await authorize(headers, query_string, group_id)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    await send({'type': 'websocket.accept'})
+    subscription = get_broker().subscribe(channel_name(group_id))
+
+    async def forward():
+        async for message in member_events(subscription, user, group_id, settings.GROUP_CHAT_KEEPALIVE):
+            if message is not None:
+                await send({'type': 'websocket.send', 'text': json.dumps(message)})
+        await send({'type': 'websocket.close', 'code': 4403})
+
+    forwarder = asyncio.ensure_future(forward())
+    try:
+        # Messages are posted through the REST API; incoming frames are ignored
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+    finally:
+        forwarder.cancel()
+        subscription.close()
+
+
+# Server-Sent Events fallback
+
+async def group_message_stream(request, group_id):
+    """Stream a group's new messages as Server-Sent Events"""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI server would buffer the endless stream instead of sending it
+        return JsonResponse({'error': 'Streaming needs the ASGI server'}, status=501)
+    headers = {name.lower(): value for name, value in request.headers.items()}
+    user = await authorize(headers, request.META.get('QUERY_STRING', ''), group_id)
+    if user is None:
+        return JsonResponse({'error': 'Group membership required'}, status=403)
+
+    subscription = get_broker().subscribe(channel_name(group_id))
+    keepalive = settings.GROUP_CHAT_KEEPALIVE
+
+    async def events():
+        try:
+            yield ': connected\n\n'
+            async for message in member_events(subscription, user, group_id, keepalive):
+                if message is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
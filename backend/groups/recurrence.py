@@ -0,0 +1,183 @@
+"""
+Recurring study sessions.
+
+A recurring session's recurrence_pattern is an RFC 5545 RRULE such as
+"FREQ=WEEKLY;BYDAY=TU,TH;COUNT=10" (a leading "RRULE:" is optional) or one
+of the shorthands in SHORTHANDS. Rules are anchored at the session's start
+time in the site's local time, so a weekly 18:00 session stays at 18:00
+across DST changes, and `expand` walks them lazily within a window.
+
+Occurrences up to SESSION_OCCURRENCE_WEEKS ahead are materialized in
+SessionOccurrence so calendar queries are index range scans:
+`refresh_occurrences` redoes one session when its SCHEDULE_FIELDS change
+(groups.signals) and `extend_occurrences` (`manage.py refresh_session_occurrences`, run
+daily) moves every session's horizon forward. Windows reaching past a
+session's horizon are expanded on the fly by `occurrences_between`.
+"""
+from datetime import timedelta
+
+from dateutil.rrule import rrulestr
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SessionOccurrence, StudySession
+
+SHORTHANDS = {
+    'daily': 'FREQ=DAILY',
+    'weekly': 'FREQ=WEEKLY',
+    'biweekly': 'FREQ=WEEKLY;INTERVAL=2',
+    'monthly': 'FREQ=MONTHLY',
+}
+
+# Fields the materialized occurrences are derived from
+SCHEDULE_FIELDS = (
+    'group', 'start_time', 'end_time', 'is_recurring', 'recurrence_pattern', 'is_cancelled',
+)
+
+
+def schedule(session):
+    """The session's values of SCHEDULE_FIELDS, as values_list(*SCHEDULE_FIELDS) gives them"""
+    return tuple(
+        getattr(session, StudySession._meta.get_field(name).attname) for name in SCHEDULE_FIELDS
+    )
+
+
+def parse_rule(pattern, start_time):
+    """A dateutil rrule for `pattern` starting at `start_time`; ValueError if invalid"""
+    text = (pattern or '').strip()
+    text = SHORTHANDS.get(text.lower(), text)
+    if text.upper().startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    if not text:
+        raise ValueError('Empty recurrence pattern')
+    return rrulestr(text, dtstart=timezone.localtime(start_time))
+
+
+def session_rule(session):
+    """The session's rrule, or None if it does not recur"""
+    if not session.is_recurring:
+        return None
+    try:
+        return parse_rule(session.recurrence_pattern, session.start_time)
+    except ValueError:
+        # Patterns stored before they were validated count as one-off sessions
+        return None
+
+
+def expand(session, start, end):
+    """Lazily yield (start, end) of the session's occurrences starting in [start, end)"""
+    rule = session_rule(session)
+    if rule is None:
+        if start <= session.start_time < end:
+            yield session.start_time, session.end_time
+        return
+
+    duration = session.end_time - session.start_time
+    for occurrence in rule.xafter(timezone.localtime(start), inc=True):
+        if occurrence >= end:
+            return
+        yield occurrence, occurrence + duration
+
+
+def horizon(now=None):
+    return (now or timezone.now()) + timedelta(weeks=settings.SESSION_OCCURRENCE_WEEKS)
+
+
+def _materialize(session, occurrences):
+    SessionOccurrence.objects.bulk_create(
+        [
+            SessionOccurrence(
+                session=session, group_id=session.group_id,
+                start_time=occurrence_start, end_time=occurrence_end,
+            )
+            for occurrence_start, occurrence_end in occurrences
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def refresh_occurrences(session, now=None):
+    """
+    Re-materialize a session's occurrences after it changed. Past
+    occurrences of a recurring session are kept as history.
+    """
+    now = now or timezone.now()
+    until = horizon(now)
+    rule = session_rule(session)
+    with transaction.atomic():
+        occurrences = SessionOccurrence.objects.filter(session=session)
+        start = session.start_time
+        if rule is not None and session.occurrences_until is not None:
+            occurrences = occurrences.filter(start_time__gte=now)
+            start = now
+        occurrences.delete()
+        if not session.is_cancelled:
+            if rule is None:
+                # A one-off session is stored however far ahead it is
+                _materialize(session, [(session.start_time, session.end_time)])
+            else:
+                _materialize(session, expand(session, start, until))
+        StudySession.objects.filter(pk=session.pk).update(occurrences_until=until)
+    session.occurrences_until = until
+
+
+def extend_occurrences(now=None):
+    """
+    Materialize every session up to the current horizon: sessions never
+    materialized from their start, recurring ones from where they stopped.
+    Returns the number of sessions updated.
+    """
+    until = horizon(now)
+    sessions = StudySession.objects.filter(
+        Q(occurrences_until__isnull=True)
+        | Q(is_recurring=True, is_cancelled=False, occurrences_until__lt=until)
+    )
+    updated = 0
+    for session in sessions.iterator():
+        if session.occurrences_until is None:
+            refresh_occurrences(session, now)
+        else:
+            with transaction.atomic():
+                _materialize(session, expand(session, session.occurrences_until, until))
+                StudySession.objects.filter(pk=session.pk).update(occurrences_until=until)
+        updated += 1
+    return updated
+
+
+def occurrences_between(start, end, **filters):
+    """
+    Occurrences starting in [start, end) of the sessions matching `filters`
+    (lookups valid on both StudySession and SessionOccurrence, such as
+    group=... or group_id__in=...), in start order. Materialized rows come
+    from one index range query; sessions whose horizon ends inside the
+    window are expanded past it in memory.
+    """
+    occurrences = list(
+        SessionOccurrence.objects
+        .filter(start_time__gte=start, start_time__lt=end, session__is_cancelled=False, **filters)
+        .select_related('session__facilitator', 'session__group')
+    )
+
+    beyond = StudySession.objects.filter(
+        Q(occurrences_until__isnull=True)
+        | Q(is_recurring=True, occurrences_until__lt=end),
+        is_cancelled=False,
+        **filters
+    ).select_related('facilitator', 'group')
+    for session in beyond:
+        window_start = start
+        if session.occurrences_until is not None:
+            if session_rule(session) is None:
+                # Materialized whole already
+                continue
+            window_start = max(start, session.occurrences_until)
+        for occurrence_start, occurrence_end in expand(session, window_start, end):
+            occurrences.append(SessionOccurrence(
+                session=session, group_id=session.group_id,
+                start_time=occurrence_start, end_time=occurrence_end,
+            ))
+
+    occurrences.sort(key=lambda occurrence: (occurrence.start_time, occurrence.session_id))
+    return occurrences
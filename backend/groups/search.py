@@ -0,0 +1,225 @@
+"""
+Full-text search over group messages.
+
+On SQLite the index is a contentless FTS5 table: rowid is the message id
+and a `scope` column holds the group token (and "system" for system
+messages), so the group filter is resolved inside the index rather than by
+scanning the messages table. Being contentless, rows can only be removed
+by replaying the text they were indexed with, which the signal handlers
+in groups.signals take care of. On PostgreSQL the index is a tsvector side
+table. `manage.py rebuild_message_index` rebuilds either from scratch.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection as default_connection
+from django.utils.html import escape
+
+from courses.search import TOKEN_RE, SearchResults
+
+from .models import GroupMessage
+
+# Words of context shown around the first hit in a snippet
+SNIPPET_WORDS = 24
+SNIPPET_LEAD = 6
+
+WORD_RE = re.compile(r'\S+')
+
+
+def _scope(message):
+    scope = f'g{message.group_id}'
+    if message.is_system_message:
+        scope += ' system'
+    return scope
+
+
+class SQLiteMessageSearchBackend:
+    """Contentless FTS5 index ranked with bm25; rowid is the message id"""
+    table = 'groups_groupmessage_fts'
+    # bm25 column weights: content, scope
+    weights = (1.0, 0.0)
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, messages):
+        rows = [[message.pk, message.content, _scope(message)] for message in messages]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, content, scope) VALUES (%s, %s, %s)',
+                rows
+            )
+
+    def remove(self, messages):
+        # A contentless table deletes a row by being told what it contained
+        rows = [[message.pk, message.content, _scope(message)] for message in messages]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} ({self.table}, rowid, content, scope) "
+                "VALUES ('delete', %s, %s, %s)",
+                rows
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('delete-all')")
+
+    def _match(self, query, filters):
+        # Quote every token so user input can never be parsed as FTS5 syntax;
+        # the last token is a prefix match to support search-as-you-type.
+        tokens = ['"%s"' % token for token in TOKEN_RE.findall(query)]
+        tokens[-1] += '*'
+        match = 'scope : "g%d" AND content : (%s)' % (filters['group_id'], ' '.join(tokens))
+        if not filters.get('include_system'):
+            match += ' NOT scope : "system"'
+        return match
+
+    def count(self, query, filters):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.table} WHERE {self.table} MATCH %s',
+                [self._match(query, filters)]
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, filters, offset, limit):
+        weights = ', '.join(str(w) for w in self.weights)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, {weights}), rowid DESC '
+                'LIMIT %s OFFSET %s',
+                [self._match(query, filters), limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresMessageSearchBackend:
+    """tsvector per message in a GIN-indexed side table"""
+    table = 'groups_groupmessage_search'
+    config = 'english'
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, messages):
+        rows = [
+            [message.pk, message.group_id, message.is_system_message, message.content]
+            for message in messages
+        ]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (message_id, group_id, is_system, document) '
+                f"VALUES (%s, %s, %s, to_tsvector('{self.config}', %s)) "
+                'ON CONFLICT (message_id) DO UPDATE SET '
+                'group_id = EXCLUDED.group_id, is_system = EXCLUDED.is_system, '
+                'document = EXCLUDED.document',
+                rows
+            )
+
+    def remove(self, messages):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE message_id = ANY(%s)',
+                [[message.pk for message in messages]]
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+
+    def _where(self, query, filters):
+        clauses = ['group_id = %s', f"document @@ plainto_tsquery('{self.config}', %s)"]
+        params = [filters['group_id'], query]
+        if not filters.get('include_system'):
+            clauses.append('NOT is_system')
+        return ' AND '.join(clauses), params
+
+    def count(self, query, filters):
+        where, params = self._where(query, filters)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table} WHERE {where}', params)
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, filters, offset, limit):
+        where, params = self._where(query, filters)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT message_id FROM {self.table} WHERE {where} '
+                f"ORDER BY ts_rank(document, plainto_tsquery('{self.config}', %s)) DESC, "
+                'message_id DESC LIMIT %s OFFSET %s',
+                params + [query, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteMessageSearchBackend,
+    'postgresql': PostgresMessageSearchBackend,
+}
+
+
+def get_backend(connection=None):
+    connection = connection or default_connection
+    try:
+        return BACKENDS[connection.vendor](connection)
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Message search is not supported on the '{connection.vendor}' database backend"
+        )
+
+
+def search_messages(group_id, query, include_system=False, queryset=None):
+    """Ranked hits for `query` among one group's messages"""
+    if queryset is None:
+        queryset = GroupMessage.objects.all()
+    return SearchResults(
+        query,
+        {'group_id': group_id, 'include_system': include_system},
+        queryset,
+        get_backend(),
+    )
+
+
+def index_messages(messages):
+    get_backend().index(messages)
+
+
+def remove_messages(messages):
+    get_backend().remove(messages)
+
+
+def snippet(text, query):
+    """
+    HTML-escaped excerpt of `text` around the first word matching `query`,
+    with matching words wrapped in <mark>.
+    """
+    terms = [term.lower() for term in TOKEN_RE.findall(query or '')]
+    words = WORD_RE.findall(text)
+
+    def matches(word):
+        # Highlight the word when any of its tokens matched, as the index
+        # tokenizes "<b>calculator</b>" to "b" and "calculator"
+        return any(
+            token.lower().startswith(term)
+            for token in TOKEN_RE.findall(word) for term in terms
+        )
+
+    first = next((i for i, word in enumerate(words) if matches(word)), 0)
+    start = max(0, first - SNIPPET_LEAD)
+    stop = start + SNIPPET_WORDS
+    excerpt = [
+        f'<mark>{escape(word)}</mark>' if matches(word) else escape(word)
+        for word in words[start:stop]
+    ]
+    return (
+        ('… ' if start > 0 else '')
+        + ' '.join(excerpt)
+        + (' …' if stop < len(words) else '')
+    )
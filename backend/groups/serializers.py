@@ -1,7 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
 from rest_framework import serializers
-from .models import StudyGroup, GroupMembership, GroupMessage, GroupResource, StudySession
-from courses.serializers import CourseSerializer
+from .models import (
+    StudyGroup, GroupMembership, GroupMessage, GroupResource, ResourceUpload, SessionOccurrence,
+    StudySession, SessionAttendanceSummary, GroupAttendanceSummary,
+)
+from courses.serializers import CourseSerializer, CourseSummarySerializer, wants_full_detail
 from accounts.serializers import UserSerializer
+from .recurrence import parse_rule
+from .search import snippet
+from .unread import unread_display
 
 class GroupMembershipSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -12,9 +21,50 @@ class GroupMembershipSerializer(serializers.ModelSerializer):
         read_only_fields = ['joined_at']
 
 
+class GroupUnreadSerializer(serializers.ModelSerializer):
+    """A membership annotated by groups.unread.unread_counts"""
+    unread_count = serializers.IntegerField(read_only=True)
+    unread_display = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = GroupMembership
+        fields = ['group', 'last_read_message_id', 'unread_count', 'unread_display']
+    
+    def get_unread_display(self, obj):
+        return unread_display(obj.unread_count)
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """The newest message read; the group's latest when left out"""
+    message_id = serializers.IntegerField(min_value=1, required=False)
+
+
+class StudyGroupListSerializer(serializers.ListSerializer):
+    """Preloads the requesting user's memberships and enrollments for a whole page"""
+    
+    def to_representation(self, data):
+        groups = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            from courses.models import Enrollment
+            
+            self.context['member_group_ids'] = set(
+                GroupMembership.objects.filter(
+                    user=request.user, group_id__in=[g.id for g in groups]
+                ).values_list('group_id', flat=True)
+            )
+            self.context['enrolled_course_ids'] = set(
+                Enrollment.objects.filter(
+                    student=request.user,
+                    course_id__in={g.course_id for g in groups if g.privacy == 'course' and g.course_id}
+                ).values_list('course_id', flat=True)
+            )
+        return super().to_representation(groups)
+
+
 class StudyGroupSerializer(serializers.ModelSerializer):
     creator = UserSerializer(read_only=True)
-    course = CourseSerializer(read_only=True)
+    course = CourseSummarySerializer(read_only=True)
     member_count = serializers.IntegerField(read_only=True)
     message_count = serializers.IntegerField(read_only=True)
     is_member = serializers.SerializerMethodField()
@@ -29,21 +79,48 @@ class StudyGroupSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'is_member', 'can_join'
         ]
         read_only_fields = ['slug', 'creator', 'member_count', 'message_count', 'created_at', 'updated_at']
+        list_serializer_class = StudyGroupListSerializer
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        if wants_full_detail(self.context.get('request')):
+            fields['course'] = CourseSerializer(read_only=True)
+        return fields
+    
+    def _is_member(self, obj, user):
+        member_group_ids = self.context.get('member_group_ids')
+        if member_group_ids is not None:
+            return obj.id in member_group_ids
+        return obj.members.filter(id=user.id).exists()
     
     def get_is_member(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.members.filter(id=request.user.id).exists()
+            return self._is_member(obj, request.user)
         return False
     
     def get_can_join(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            can_join, message = obj.can_join(request.user)
+            enrolled_course_ids = self.context.get('enrolled_course_ids')
+            can_join, message = obj.can_join(
+                request.user,
+                is_member=self._is_member(obj, request.user),
+                is_enrolled=None if enrolled_course_ids is None else obj.course_id in enrolled_course_ids
+            )
             return {'can_join': can_join, 'message': message}
         return {'can_join': False, 'message': 'Login required'}
 
 
+class SuggestedStudyGroupSerializer(StudyGroupSerializer):
+    """A group from groups.suggestions.suggested_groups"""
+    activity_score = serializers.FloatField(read_only=True)
+    free_seats = serializers.IntegerField(read_only=True)
+    
+    class Meta(StudyGroupSerializer.Meta):
+        fields = StudyGroupSerializer.Meta.fields + ['activity_score', 'free_seats']
+
+
 class GroupMessageSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
     
@@ -53,7 +130,18 @@ class GroupMessageSerializer(serializers.ModelSerializer):
             'id', 'group', 'sender', 'content', 'is_system_message',
             'is_pinned', 'attachment', 'attachment_name', 'created_at'
         ]
-        read_only_fields = ['sender', 'created_at']
+        # The group comes from the URL
+        read_only_fields = ['group', 'sender', 'created_at']
+
+
+class GroupMessageSearchSerializer(GroupMessageSerializer):
+    snippet = serializers.SerializerMethodField()
+    
+    class Meta(GroupMessageSerializer.Meta):
+        fields = GroupMessageSerializer.Meta.fields + ['snippet']
+    
+    def get_snippet(self, obj):
+        return snippet(obj.content, self.context.get('search_query'))
 
 
 class GroupResourceSerializer(serializers.ModelSerializer):
@@ -66,23 +154,154 @@ class GroupResourceSerializer(serializers.ModelSerializer):
             'file_type', 'file_size', 'download_count',
             'uploaded_by', 'uploaded_at'
         ]
-        read_only_fields = ['uploaded_by', 'download_count', 'uploaded_at']
+        # The group comes from the URL; size and type from the stored file
+        read_only_fields = [
+            'group', 'file_type', 'file_size', 'uploaded_by', 'download_count', 'uploaded_at'
+        ]
+
+
+class ResourceUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ResourceUpload
+        fields = [
+            'id', 'name', 'description', 'filename',
+            'total_size', 'received_size', 'created_at'
+        ]
+        read_only_fields = ['id', 'received_size', 'created_at']
+    
+    def validate_total_size(self, value):
+        if not 0 < value <= settings.RESOURCE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Must be between 1 and {settings.RESOURCE_UPLOAD_MAX_SIZE} bytes'
+            )
+        return value
+
+
+def validate_schedule(start_time, end_time, is_recurring, recurrence_pattern):
+    if start_time and end_time and end_time <= start_time:
+        raise serializers.ValidationError({'end_time': 'Must be after start_time'})
+    max_hours = settings.SESSION_MAX_DURATION_HOURS
+    if start_time and end_time and end_time - start_time > timedelta(hours=max_hours):
+        raise serializers.ValidationError(
+            {'end_time': f'Sessions can last at most {max_hours} hours'}
+        )
+    if is_recurring:
+        try:
+            parse_rule(recurrence_pattern, start_time)
+        except ValueError:
+            raise serializers.ValidationError({'recurrence_pattern': (
+                'Expected an RRULE such as "FREQ=WEEKLY;BYDAY=MO,WE" (UNTIL in UTC) '
+                'or one of daily, weekly, biweekly, monthly'
+            )})
 
 
 class StudySessionSerializer(serializers.ModelSerializer):
     facilitator = UserSerializer(read_only=True)
     group_name = serializers.CharField(source='group.name', read_only=True)
+    next_start = serializers.DateTimeField(read_only=True, required=False)
     
     class Meta:
         model = StudySession
         fields = [
             'id', 'group', 'group_name', 'title', 'description',
             'session_type', 'facilitator', 'start_time', 'end_time',
-            'is_recurring', 'recurrence_pattern', 'meeting_link',
+            'is_recurring', 'recurrence_pattern', 'next_start', 'meeting_link',
             'meeting_platform', 'max_participants', 'is_cancelled',
             'created_at'
         ]
-        read_only_fields = ['facilitator', 'created_at']
+        # The group comes from the URL
+        read_only_fields = ['group', 'facilitator', 'created_at']
+    
+    def validate(self, attrs):
+        def value(name):
+            if name in attrs:
+                return attrs[name]
+            return getattr(self.instance, name, None)
+        
+        validate_schedule(
+            value('start_time'), value('end_time'),
+            value('is_recurring'), value('recurrence_pattern')
+        )
+        return attrs
+
+
+class SessionOccurrenceSerializer(serializers.ModelSerializer):
+    session = StudySessionSerializer(read_only=True)
+    
+    class Meta:
+        model = SessionOccurrence
+        fields = ['session', 'start_time', 'end_time']
+
+
+class CalendarOccurrenceSerializer(SessionOccurrenceSerializer):
+    conflicts_with = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+    
+    class Meta(SessionOccurrenceSerializer.Meta):
+        fields = SessionOccurrenceSerializer.Meta.fields + ['conflicts_with']
+
+
+class ConflictingOccurrenceSerializer(SessionOccurrenceSerializer):
+    conflicts_at = serializers.ListField(child=serializers.DateTimeField(), read_only=True)
+    
+    class Meta(SessionOccurrenceSerializer.Meta):
+        fields = SessionOccurrenceSerializer.Meta.fields + ['conflicts_at']
+
+
+class SessionConflictCheckSerializer(serializers.Serializer):
+    """A proposed session schedule to check against the user's calendar"""
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    recurrence_pattern = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate(self, attrs):
+        attrs['is_recurring'] = bool(attrs['recurrence_pattern'].strip())
+        validate_schedule(
+            attrs['start_time'], attrs['end_time'],
+            attrs['is_recurring'], attrs['recurrence_pattern']
+        )
+        return attrs
+
+
+class BulkAttendanceSerializer(serializers.Serializer):
+    """The users a check-in or check-out applies to"""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=settings.SESSION_ATTENDANCE_BATCH_SIZE,
+    )
+
+
+class BulkCheckOutSerializer(BulkAttendanceSerializer):
+    """Everyone still checked in when user_ids is left out"""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        max_length=settings.SESSION_ATTENDANCE_BATCH_SIZE,
+    )
+
+
+ATTENDANCE_SUMMARY_FIELDS = [
+    'expected_count', 'attendee_count', 'checked_out_count',
+    'average_minutes', 'no_show_rate', 'updated_at',
+]
+
+
+class SessionAttendanceSummarySerializer(serializers.ModelSerializer):
+    average_minutes = serializers.FloatField(read_only=True)
+    no_show_rate = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = SessionAttendanceSummary
+        fields = ['session'] + ATTENDANCE_SUMMARY_FIELDS
+
+
+class GroupAttendanceSummarySerializer(serializers.ModelSerializer):
+    average_minutes = serializers.FloatField(read_only=True)
+    no_show_rate = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = GroupAttendanceSummary
+        fields = ['group', 'session_count'] + ATTENDANCE_SUMMARY_FIELDS
 
 
 class CreateStudyGroupSerializer(serializers.ModelSerializer):
@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import GroupMembership, GroupMessage, MessageArchiveSegment, StudySession
+from . import archive, attendance, realtime, recurrence, search
+
+
+@receiver(pre_save, sender=GroupMessage)
+def remember_indexed_message(sender, instance, raw=False, **kwargs):
+    # The message index can only drop a row given the text it was indexed
+    # with, so load what is stored before an edit overwrites it
+    if raw or instance.pk is None:
+        return
+    instance._indexed = (
+        GroupMessage.objects.filter(pk=instance.pk)
+        .only('group_id', 'content', 'is_system_message')
+        .first()
+    )
+
+
+@receiver(post_save, sender=GroupMessage)
+def index_message(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_indexed', None)
+    if previous is not None:
+        search.remove_messages([previous])
+        del instance._indexed
+    search.index_messages([instance])
+
+
+@receiver(post_delete, sender=GroupMessage)
+def unindex_message(sender, instance, **kwargs):
+    search.remove_messages([instance])
+
+
+@receiver(post_delete, sender=MessageArchiveSegment)
+def delete_segment_file(sender, instance, **kwargs):
+    path = instance.path
+    transaction.on_commit(lambda: archive.archive_storage().delete(path))
+
+
+def _touches_schedule(update_fields):
+    return update_fields is None or not set(recurrence.SCHEDULE_FIELDS).isdisjoint(update_fields)
+
+
+@receiver(pre_save, sender=StudySession)
+def remember_session_schedule(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Occurrences are only redone when the schedule actually changes, so
+    # load what is stored before the save overwrites it
+    if raw or instance.pk is None or not _touches_schedule(update_fields):
+        return
+    instance._schedule = (
+        StudySession.objects.filter(pk=instance.pk)
+        .values_list(*recurrence.SCHEDULE_FIELDS)
+        .first()
+    )
+
+
+@receiver(post_save, sender=StudySession)
+def refresh_session_occurrences(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches_schedule(update_fields):
+        return
+    previous = getattr(instance, '_schedule', None)
+    if previous is not None:
+        del instance._schedule
+    if (
+        previous is None
+        or previous != recurrence.schedule(instance)
+        or instance.occurrences_until is None
+    ):
+        recurrence.refresh_occurrences(instance)
+
+
+@receiver(pre_delete, sender=StudySession)
+def release_session_attendance(sender, instance, **kwargs):
+    attendance.release_session(instance)
+
+
+@receiver(post_delete, sender=GroupMembership)
+def end_subscriptions_on_leave(sender, instance, **kwargs):
+    realtime.publish_revoke(instance.group_id, instance.user_id)
+
+
+@receiver(post_save, sender=GroupMembership)
+def end_subscriptions_on_ban(sender, instance, raw=False, **kwargs):
+    if not raw and instance.is_banned:
+        realtime.publish_revoke(instance.group_id, instance.user_id)
@@ -0,0 +1,71 @@
+"""
+Study groups suggested to a user from the courses they are enrolled in.
+
+Suggestions are the joinable groups of those courses, found through the
+(course, created_at) index, ranked by each group's activity_score and then
+its free seats. activity_score is a recency-weighted count of the group's
+recent chat messages, each day's messages counting half as much every
+GROUP_ACTIVITY_HALF_LIFE_DAYS. `manage.py compute_group_activity`
+(run hourly or daily) refreshes it, so requests never touch GroupMessage.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from courses.models import Enrollment
+
+from .models import GroupMembership, GroupMessage, StudyGroup
+
+
+def activity_scores(now=None):
+    """{group id: score} from one grouped query over the window's messages"""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    since = now - timedelta(days=settings.GROUP_ACTIVITY_WINDOW_DAYS)
+    daily = (
+        GroupMessage.objects.filter(created_at__gte=since, is_system_message=False)
+        .order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values_list('group_id', 'day')
+        .annotate(n=Count('pk'))
+    )
+    scores = {}
+    for group_id, day, count in daily:
+        weight = 0.5 ** ((today - day).days / settings.GROUP_ACTIVITY_HALF_LIFE_DAYS)
+        scores[group_id] = scores.get(group_id, 0) + count * weight
+    return {group_id: round(score, 3) for group_id, score in scores.items()}
+
+
+def refresh_activity_scores(now=None, batch_size=1000):
+    """Store fresh activity scores; returns the number of groups changed"""
+    scores = activity_scores(now)
+    changed = []
+    for group in StudyGroup.objects.only('id', 'activity_score').iterator(chunk_size=batch_size):
+        score = scores.get(group.id, 0)
+        if group.activity_score != score:
+            group.activity_score = score
+            changed.append(group)
+    StudyGroup.objects.bulk_update(changed, ['activity_score'], batch_size=batch_size)
+    return len(changed)
+
+
+def suggested_groups(user):
+    """
+    Active, non-private groups of the user's enrolled courses that have a
+    free seat and that the user is not in, most active first, each with
+    `free_seats`.
+    """
+    return (
+        StudyGroup.objects.filter(
+            course_id__in=Enrollment.objects.filter(student=user).values('course_id'),
+            is_active=True,
+            member_count__lt=F('max_members'),
+        )
+        .exclude(privacy='private')
+        .filter(~Exists(GroupMembership.objects.filter(group=OuterRef('pk'), user=user)))
+        .annotate(free_seats=F('max_members') - F('member_count'))
+        .order_by('-activity_score', '-free_seats', '-created_at')
+    )
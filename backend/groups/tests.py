@@ -1,3 +1,1243 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import importlib
+import os
+import shutil
+import tempfile
+import json
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import archive, downloads, realtime
+from courses.models import Course, Enrollment
+
+from .models import (
+    GroupAttendanceSummary, GroupMembership, GroupMessage, GroupResource, MessageArchiveSegment,
+    ResourceUpload, SessionAttendance, SessionAttendanceSummary, SessionOccurrence,
+    StudyGroup, StudySession,
+)
+from .attendance import rebuild_summaries
+from .calendar import find_conflicts, overlapping_pairs
+from .recurrence import expand
+from .search import search_messages
+from .suggestions import refresh_activity_scores, suggested_groups
+from .unread import advance_watermark, unread_counts
+from .uploads import UploadError, blob_name, complete_upload, part_path, write_chunk
+
+User = get_user_model()
+
+
+class ConcurrencyTestCase(TransactionTestCase):
+    """A busy group and helpers to send many requests at it at once"""
+
+    seats = 50
+    threads = 80
+
+    def setUp(self):
+        self.creator = User.objects.create_user(username='creator')
+        self.group = StudyGroup.objects.create(
+            name='Busy group',
+            description='Everybody wants in',
+            creator=self.creator,
+            max_members=self.seats,
+        )
+        self.users = [
+            User.objects.create_user(username=f'student{i}')
+            for i in range(self.threads)
+        ]
+
+    def hammer(self, target, args_list):
+        barrier = threading.Barrier(len(args_list))
+        results = []
+
+        def run(*args):
+            try:
+                barrier.wait()
+                results.append(target(*args))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=run, args=args) for args in args_list]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    def post(self, user, path, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(path, data, format='json').status_code
+
+
+class ConcurrentJoinTests(ConcurrencyTestCase):
+    """Counters stay exact when many requests hit one group at once"""
+
+    def test_joins_never_overshoot_max_members(self):
+        path = f'/api/v1/groups/{self.group.pk}/join/'
+        codes = self.hammer(self.post, [(user, path) for user in self.users])
+
+        self.group.refresh_from_db()
+        self.assertEqual(codes.count(201), self.seats)
+        self.assertEqual(codes.count(400), self.threads - self.seats)
+        self.assertEqual(self.group.member_count, self.seats)
+        self.assertEqual(GroupMembership.objects.filter(group=self.group).count(), self.seats)
+        self.assertEqual(
+            GroupMessage.objects.filter(group=self.group, is_system_message=True).count(),
+            self.seats
+        )
+
+    def test_concurrent_joins_and_leaves_keep_member_count(self):
+        leavers = self.users[:20]
+        for user in leavers:
+            GroupMembership.objects.create(user=user, group=self.group)
+        StudyGroup.objects.filter(pk=self.group.pk).update(member_count=len(leavers))
+
+        joiners = self.users[20:]
+        calls = [(user, f'/api/v1/groups/{self.group.pk}/leave/') for user in leavers]
+        calls += [(user, f'/api/v1/groups/{self.group.pk}/join/') for user in joiners]
+        self.hammer(self.post, calls)
+
+        self.group.refresh_from_db()
+        members = GroupMembership.objects.filter(group=self.group).count()
+        self.assertLessEqual(members, self.seats)
+        self.assertEqual(self.group.member_count, members)
+
+    def test_concurrent_admin_leaves_keep_an_admin(self):
+        admins = self.users[:10]
+        for user in admins:
+            GroupMembership.objects.create(user=user, group=self.group, role='admin')
+        StudyGroup.objects.filter(pk=self.group.pk).update(member_count=len(admins))
+        path = f'/api/v1/groups/{self.group.pk}/leave/'
+        codes = self.hammer(self.post, [(user, path) for user in admins])
+
+        self.assertEqual(codes.count(200), len(admins) - 1)
+        self.assertEqual(
+            GroupMembership.objects.filter(group=self.group, role='admin').count(), 1
+        )
+
+    def test_concurrent_messages_are_all_counted(self):
+        members = self.users[:self.seats]
+        for user in members:
+            GroupMembership.objects.create(user=user, group=self.group)
+        path = f'/api/v1/groups/{self.group.pk}/messages/'
+        codes = self.hammer(
+            self.post, [(user, path, {'content': 'hello'}) for user in members]
+        )
+
+        self.group.refresh_from_db()
+        self.assertEqual(codes.count(201), self.seats)
+        self.assertEqual(self.group.message_count, self.seats)
+
+
+class ConcurrentCheckInTests(ConcurrencyTestCase):
+    def test_concurrent_check_ins_respect_max_participants(self):
+        members = self.users[:self.seats]
+        for user in members:
+            GroupMembership.objects.create(user=user, group=self.group)
+        now = timezone.now()
+        session = StudySession.objects.create(
+            group=self.group,
+            title='Exam prep',
+            facilitator=self.creator,
+            start_time=now,
+            end_time=now + timedelta(hours=2),
+            max_participants=30,
+        )
+        path = f'/api/v1/sessions/{session.pk}/attendance/check-in/'
+        batches = [members[i:i + 5] for i in range(0, len(members), 5)]
+        self.hammer(self.post, [
+            (self.creator, path, {'user_ids': [user.pk for user in batch]}) for batch in batches
+        ])
+
+        summary = SessionAttendanceSummary.objects.get(session=session)
+        attendees = SessionAttendance.objects.filter(session=session).count()
+        self.assertEqual(attendees, 30)
+        self.assertEqual(summary.attendee_count, attendees)
+        self.assertEqual(summary.expected_count, self.seats)
+        self.assertEqual(GroupAttendanceSummary.objects.get(group=self.group).attendee_count, attendees)
+
+
+class ResourceUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        upload_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, upload_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, RESOURCE_UPLOAD_TEMP_DIR=upload_root,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='uploader')
+        self.group = StudyGroup.objects.create(
+            name='Readers', description='d', creator=self.user, max_members=5
+        )
+
+    def start_upload(self, data):
+        return ResourceUpload.objects.create(
+            group=self.group, uploaded_by=self.user, name='Notes',
+            filename='notes.txt', total_size=len(data),
+        )
+
+    def upload(self, data, chunk_size=4):
+        upload = self.start_upload(data)
+        for start in range(0, len(data), chunk_size):
+            write_chunk(upload, BytesIO(data[start:start + chunk_size]), start)
+        return upload
+
+    def test_chunks_are_stored_by_content_hash(self):
+        data = b'chunked upload content'
+        resource = complete_upload(self.upload(data))
+        digest = hashlib.sha256(data).hexdigest()
+        self.assertEqual(resource.file.name, blob_name(digest, 'notes.txt'))
+        with resource.file.open('rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertFalse(ResourceUpload.objects.exists())
+
+    def test_parts_stay_out_of_the_public_media_root(self):
+        upload = self.upload(b'half a file', chunk_size=4)
+        self.assertFalse(part_path(upload).startswith(settings.MEDIA_ROOT))
+        self.assertTrue(os.path.exists(part_path(upload)))
+        self.assertEqual(os.listdir(settings.MEDIA_ROOT), [])
+
+    def test_digest_is_taken_from_the_assembled_file(self):
+        upload = self.upload(b'aaaabbbb')
+        # A racing PUT for the same offset wrote different bytes last
+        with open(part_path(upload), 'r+b') as f:
+            f.seek(4)
+            f.write(b'cccc')
+        resource = complete_upload(upload)
+        digest = hashlib.sha256(b'aaaacccc').hexdigest()
+        self.assertEqual(resource.file.name, blob_name(digest, 'notes.txt'))
+
+    def test_blob_with_other_content_is_not_reused(self):
+        data = b'the real content'
+        poisoned = blob_name(hashlib.sha256(data).hexdigest(), 'notes.txt')
+        default_storage.save(poisoned, ContentFile(b'something else'))
+        resource = complete_upload(self.upload(data))
+        self.assertNotEqual(resource.file.name, poisoned)
+        with resource.file.open('rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_matching_blob_is_shared(self):
+        first = complete_upload(self.upload(b'same bytes'))
+        second = complete_upload(self.upload(b'same bytes'))
+        self.assertEqual(first.file.name, second.file.name)
+
+    def test_cleanup_removes_stale_uploads_and_orphaned_parts(self):
+        stale = self.upload(b'abandoned')
+        fresh = self.upload(b'in progress')
+        ResourceUpload.objects.filter(pk=stale.pk).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        orphan = os.path.join(os.path.dirname(part_path(fresh)), 'gone.part')
+        with open(orphan, 'wb') as f:
+            f.write(b'left by a crash')
+        old = (timezone.now() - timedelta(days=2)).timestamp()
+        os.utime(orphan, (old, old))
+
+        call_command('cleanup_uploads', stdout=StringIO())
+        self.assertEqual(list(ResourceUpload.objects.values_list('pk', flat=True)), [fresh.pk])
+        self.assertFalse(os.path.exists(part_path(stale)))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.exists(part_path(fresh)))
+
+    def test_completing_twice_creates_one_resource(self):
+        upload = self.upload(b'finish me')
+        complete_upload(upload)
+        # A retry holding the same upload loses to the first completion
+        with self.assertRaisesMessage(UploadError, 'already completed'):
+            complete_upload(upload)
+        self.assertEqual(GroupResource.objects.filter(group=self.group).count(), 1)
+
+    def test_chunk_keeps_upload_alive(self):
+        upload = self.start_upload(b'abcdefgh')
+        ResourceUpload.objects.filter(pk=upload.pk).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        write_chunk(upload, BytesIO(b'abcd'), 0)
+        call_command('cleanup_uploads', stdout=StringIO())
+        self.assertTrue(ResourceUpload.objects.filter(pk=upload.pk).exists())
+
+
+class ConcurrentUploadCompleteTests(ConcurrencyTestCase):
+    threads = 5
+
+    def setUp(self):
+        super().setUp()
+        for root in ('MEDIA_ROOT', 'RESOURCE_UPLOAD_TEMP_DIR'):
+            path = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, path)
+            settings_override = override_settings(**{root: path})
+            settings_override.enable()
+            self.addCleanup(settings_override.disable)
+
+    def test_concurrent_completions_create_one_resource(self):
+        data = b'uploaded once'
+        upload = ResourceUpload.objects.create(
+            group=self.group, uploaded_by=self.creator, name='Notes',
+            filename='notes.txt', total_size=len(data),
+        )
+        write_chunk(upload, BytesIO(data), 0)
+        path = reverse('group-resource-upload-complete', args=[self.group.pk, upload.pk])
+        codes = self.hammer(self.post, [(self.creator, path)] * self.threads)
+
+        self.assertEqual(codes.count(201), 1)
+        # The rest either waited for the winner or arrived after the upload was gone
+        self.assertLessEqual(set(codes), {201, 404, 409})
+        self.assertEqual(GroupResource.objects.filter(group=self.group).count(), 1)
+        self.assertFalse(ResourceUpload.objects.exists())
+
+
+class MessageArchiveTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, archive_root)
+        self.archive_root = archive_root
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'group_archive': {
+                    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                    'OPTIONS': {'location': archive_root},
+                },
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(archive._read.cache_clear)
+        archive._read.cache_clear()
+
+        self.user = User.objects.create_user(username='chatty')
+        self.group = StudyGroup.objects.create(
+            name='Chat', description='d', creator=self.user, max_members=5
+        )
+        self.old = timezone.now() - timedelta(days=400)
+        for i in range(5):
+            message = GroupMessage.objects.create(
+                group=self.group, sender=self.user, content=f'message {i}'
+            )
+            GroupMessage.objects.filter(pk=message.pk).update(
+                created_at=self.old + timedelta(minutes=i)
+            )
+
+    def test_segments_round_trip_through_private_storage(self):
+        moved = archive.archive_messages(timezone.now() - timedelta(days=1), segment_size=3)
+        self.assertEqual(moved, {self.group.pk: 5})
+        self.assertFalse(GroupMessage.objects.exists())
+
+        segments = list(MessageArchiveSegment.objects.order_by('first_message_id'))
+        self.assertEqual([s.message_count for s in segments], [3, 2])
+        for segment in segments:
+            path = os.path.join(self.archive_root, segment.path)
+            self.assertTrue(os.path.exists(path))
+        self.assertEqual(os.listdir(default_storage.location), [])
+
+        messages = archive.archived_messages(self.group.pk, 10)
+        self.assertEqual(
+            [m.content for m in messages], [f'message {i}' for i in reversed(range(5))]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            segments[0].delete()
+        self.assertFalse(os.path.exists(os.path.join(self.archive_root, segments[0].path)))
+        messages = archive.archived_messages(self.group.pk, 10)
+        self.assertEqual([m.content for m in messages], ['message 4', 'message 3'])
+
+    def test_history_pages_continue_into_the_archive(self):
+        archive.archive_messages(timezone.now() - timedelta(days=1), segment_size=3)
+        recent = [
+            GroupMessage.objects.create(group=self.group, sender=self.user, content=f'recent {i}')
+            for i in range(2)
+        ]
+        GroupMembership.objects.get_or_create(user=self.user, group=self.group)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('group-messages', args=[self.group.pk])
+
+        page = client.get(url, {'limit': 4}).data
+        self.assertEqual(
+            [m['content'] for m in page], ['recent 1', 'recent 0', 'message 4', 'message 3']
+        )
+        page = client.get(url, {'limit': 4, 'before': page[-1]['id']}).data
+        self.assertEqual([m['content'] for m in page], ['message 2', 'message 1', 'message 0'])
+        first = page[-1]['id']
+        page = client.get(url, {'limit': 4, 'after': first}).data
+        self.assertEqual(
+            [m['content'] for m in page], ['message 4', 'message 3', 'message 2', 'message 1']
+        )
+        self.assertEqual(recent[1].pk, client.get(url, {'limit': 1}).data[0]['id'])
+
+
+class MessageHistoryTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(username='member')
+        self.group = StudyGroup.objects.create(
+            name='Chat', description='d', creator=self.member, max_members=5
+        )
+        GroupMembership.objects.get_or_create(user=self.member, group=self.group)
+        start = timezone.now() - timedelta(hours=1)
+        self.messages = []
+        for i in range(6):
+            message = GroupMessage.objects.create(
+                group=self.group, sender=self.member, content=f'm{i}'
+            )
+            # Pairs share a timestamp, so ties fall back to the id
+            GroupMessage.objects.filter(pk=message.pk).update(
+                created_at=start + timedelta(minutes=i // 2)
+            )
+            self.messages.append(message)
+        self.url = reverse('group-messages', args=[self.group.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def contents(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [message['content'] for message in response.data]
+
+    def test_before_pages_back_through_ties(self):
+        self.assertEqual(self.contents(limit=4), ['m5', 'm4', 'm3', 'm2'])
+        self.assertEqual(self.contents(limit=3, before=self.messages[3].pk), ['m2', 'm1', 'm0'])
+        self.assertEqual(self.contents(before=self.messages[0].pk), [])
+
+    def test_after_returns_only_newer_messages(self):
+        self.assertEqual(self.contents(after=self.messages[2].pk), ['m5', 'm4', 'm3'])
+        # The oldest of the newer messages come first, shown newest first
+        self.assertEqual(self.contents(after=self.messages[0].pk, limit=2), ['m2', 'm1'])
+        self.assertEqual(self.contents(after=self.messages[5].pk), [])
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(self.contents(limit=0), ['m5'])
+        with self.settings(GROUP_MESSAGE_MAX_PAGE_SIZE=2):
+            self.assertEqual(self.contents(limit=100), ['m5', 'm4'])
+
+    def test_bad_cursors_are_rejected(self):
+        other = StudyGroup.objects.create(name='Other', description='d', creator=self.member)
+        foreign = GroupMessage.objects.create(group=other, sender=self.member, content='x')
+        for params in ({'limit': 'ten'}, {'before': 0}, {'after': foreign.pk}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_only_members_read_and_post(self):
+        self.client.force_authenticate(User.objects.create_user(username='outsider'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.post(self.url, {'content': 'hi'}).status_code, 403)
+        self.assertEqual(GroupMessage.objects.filter(group=self.group).count(), 6)
+
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.post(self.url, {'content': 'hi'}).status_code, 201)
+        self.assertEqual(self.contents(limit=1), ['hi'])
+
+
+@override_settings(TIME_ZONE='America/New_York')
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='organizer')
+        self.group = StudyGroup.objects.create(
+            name='Weekly', description='d', creator=self.user, max_members=5
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def create_session(self, **fields):
+        fields.setdefault('start_time', self.start)
+        fields.setdefault('end_time', fields['start_time'] + timedelta(hours=1))
+        return StudySession.objects.create(
+            group=self.group, title='Review', facilitator=self.user, **fields
+        )
+
+    def occurrences(self, session):
+        return list(session.occurrences.order_by('start_time').values_list('pk', 'start_time'))
+
+    def test_rrule_is_materialized(self):
+        session = self.create_session(is_recurring=True, recurrence_pattern='FREQ=DAILY;INTERVAL=2;COUNT=4')
+        starts = [start for _, start in self.occurrences(session)]
+        self.assertEqual(starts, [self.start + timedelta(days=2 * i) for i in range(4)])
+        self.assertTrue(all(
+            o.end_time - o.start_time == timedelta(hours=1) for o in session.occurrences.all()
+        ))
+
+    def test_weekly_rule_keeps_local_time_across_dst(self):
+        # US daylight saving time starts on 8 March 2026
+        start = timezone.make_aware(datetime(2026, 3, 3, 18, 0))
+        session = StudySession(
+            start_time=start, end_time=start + timedelta(hours=1),
+            is_recurring=True, recurrence_pattern='weekly',
+        )
+        occurrences = list(expand(session, start, start + timedelta(weeks=2)))
+        self.assertEqual([timezone.localtime(s).hour for s, _ in occurrences], [18, 18])
+        # An hour less than a week apart in absolute time
+        utc = [s.astimezone(dt_timezone.utc) for s, _ in occurrences]
+        self.assertEqual(utc[1] - utc[0], timedelta(weeks=1) - timedelta(hours=1))
+        self.assertEqual(occurrences[1][1] - occurrences[1][0], timedelta(hours=1))
+
+    def test_only_schedule_changes_regenerate_occurrences(self):
+        session = self.create_session(is_recurring=True, recurrence_pattern='FREQ=WEEKLY;COUNT=3')
+        before = self.occurrences(session)
+
+        session.title = 'Renamed'
+        session.save()
+        session.save(update_fields=['meeting_link'])
+        self.assertEqual(self.occurrences(session), before)
+
+        session.start_time += timedelta(hours=2)
+        session.end_time += timedelta(hours=2)
+        session.save()
+        after = self.occurrences(session)
+        self.assertEqual(
+            [start for _, start in after], [start + timedelta(hours=2) for _, start in before]
+        )
+
+    def test_cancelling_drops_occurrences(self):
+        session = self.create_session()
+        self.assertEqual(len(self.occurrences(session)), 1)
+        session.is_cancelled = True
+        session.save(update_fields=['is_cancelled'])
+        self.assertEqual(self.occurrences(session), [])
+
+    def test_migration_backfills_existing_sessions(self):
+        once = self.create_session()
+        recurring = self.create_session(is_recurring=True, recurrence_pattern='FREQ=DAILY;COUNT=3')
+        cancelled = self.create_session(is_cancelled=True)
+        # As they were before occurrences were materialized
+        SessionOccurrence.objects.all().delete()
+        StudySession.objects.update(occurrences_until=None)
+
+        migration = importlib.import_module('groups.migrations.0009_backfill_session_occurrences')
+        migration.backfill_occurrences(apps, None)
+
+        self.assertEqual(len(self.occurrences(once)), 1)
+        self.assertEqual(len(self.occurrences(recurring)), 3)
+        self.assertEqual(self.occurrences(cancelled), [])
+        self.assertFalse(StudySession.objects.filter(occurrences_until__isnull=True).exists())
+
+    def test_group_calendar_expands_past_the_horizon(self):
+        GroupMembership.objects.get_or_create(user=self.user, group=self.group)
+        self.create_session(is_recurring=True, recurrence_pattern='weekly')
+        self.create_session(start_time=self.start + timedelta(days=2))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('group-calendar', args=[self.group.pk])
+
+        end = self.start + timedelta(weeks=30)
+        response = client.get(url, {'from': self.start.isoformat(), 'to': end.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        starts = [parse_datetime(o['start_time']) for o in response.data]
+        # 12 weeks are materialized, the rest expanded on the fly
+        self.assertEqual(len(starts), 31)
+        self.assertEqual(starts, sorted(starts))
+        self.assertEqual(
+            {timezone.localtime(s).time() for s in starts}, {timezone.localtime(self.start).time()}
+        )
+
+        self.assertEqual(client.get(url, {'from': end.isoformat(), 'to': self.start.isoformat()}).status_code, 400)
+        client.force_authenticate(User.objects.create_user(username='outsider'))
+        self.assertEqual(client.get(url).status_code, 403)
+
+
+class OverlappingPairsTests(SimpleTestCase):
+    def pairs(self, intervals):
+        return sorted(tuple(sorted(pair)) for pair in overlapping_pairs(intervals))
+
+    def test_touching_intervals_do_not_overlap(self):
+        self.assertEqual(self.pairs([(0, 2), (2, 4), (4, 6)]), [])
+
+    def test_nested_and_chained_intervals(self):
+        # 0 contains 1 and 2; 3 only overlaps 0's tail
+        intervals = [(0, 10), (1, 2), (3, 5), (9, 12), (12, 13)]
+        self.assertEqual(self.pairs(intervals), [(0, 1), (0, 2), (0, 3)])
+
+    def test_input_order_does_not_matter(self):
+        intervals = [(5, 8), (0, 6), (7, 9), (0, 1)]
+        self.assertEqual(self.pairs(intervals), [(0, 1), (0, 2), (1, 3)])
+
+
+class SessionConflictTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner')
+        self.group = StudyGroup.objects.create(
+            name='Planning', description='d', creator=self.user, max_members=5
+        )
+        GroupMembership.objects.get_or_create(user=self.user, group=self.group)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_session(self, start, hours):
+        return StudySession.objects.create(
+            group=self.group, title='Marathon', facilitator=self.user,
+            start_time=start, end_time=start + timedelta(hours=hours),
+        )
+
+    def test_sessions_under_way_are_found(self):
+        # Started 20 hours before the proposal, still running for 2 more
+        session = self.create_session(self.start - timedelta(hours=20), 22)
+        conflicts = find_conflicts(self.user, self.start, self.start + timedelta(hours=1))
+        self.assertEqual([c.session_id for c in conflicts], [session.pk])
+        # Ended just as the proposal starts
+        session.delete()
+        self.create_session(self.start - timedelta(hours=24), 24)
+        self.assertEqual(find_conflicts(self.user, self.start, self.start + timedelta(hours=1)), [])
+
+    def test_lookback_follows_the_longest_session(self):
+        session = self.create_session(self.start - timedelta(hours=30), 32)
+        with self.settings(SESSION_MAX_DURATION_HOURS=36):
+            conflicts = find_conflicts(self.user, self.start, self.start + timedelta(hours=1))
+        self.assertEqual([c.session_id for c in conflicts], [session.pk])
+
+    def test_my_sessions_flag_conflicts(self):
+        other = StudyGroup.objects.create(name='Other', description='d', creator=self.user, max_members=5)
+        GroupMembership.objects.get_or_create(user=self.user, group=other)
+        daily = StudySession.objects.create(
+            group=self.group, title='Daily', facilitator=self.user,
+            start_time=self.start, end_time=self.start + timedelta(hours=1),
+            is_recurring=True, recurrence_pattern='FREQ=DAILY;COUNT=3',
+        )
+        # Overlaps the second daily occurrence only
+        once = StudySession.objects.create(
+            group=other, title='Once', facilitator=self.user,
+            start_time=self.start + timedelta(days=1, minutes=30),
+            end_time=self.start + timedelta(days=1, hours=2),
+        )
+        response = self.client.get(reverse('my-sessions'), {
+            'from': (self.start - timedelta(hours=1)).isoformat(),
+            'to': (self.start + timedelta(days=5)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(o['session']['id'], o['conflicts_with']) for o in response.data],
+            [(daily.pk, []), (daily.pk, [once.pk]), (once.pk, [daily.pk]), (daily.pk, [])],
+        )
+
+    def test_sessions_longer_than_the_maximum_are_rejected(self):
+        params = {'start_time': self.start.isoformat()}
+        for hours, status in ((24, 200), (25, 400)):
+            params['end_time'] = (self.start + timedelta(hours=hours)).isoformat()
+            response = self.client.get(reverse('session-conflicts'), params)
+            self.assertEqual(response.status_code, status)
+        self.assertIn('end_time', response.data)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        cases = {
+            'bytes=0-99': (0, 99),
+            'bytes=100-': (100, 999),
+            'bytes=-100': (900, 999),
+            'bytes=-5000': (0, 999),
+            'bytes=990-5000': (990, 999),
+            'bytes = 10 - 20': (10, 20),
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(downloads.parse_range(header, 1000), expected)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=-0', 'bytes=20-10'):
+            with self.subTest(header=header):
+                self.assertIs(downloads.parse_range(header, 1000), False)
+
+    def test_other_ranges_get_the_whole_file(self):
+        for header in ('bytes=0-1,5-9', 'bytes=-', 'lines=1-2', 'garbage'):
+            with self.subTest(header=header):
+                self.assertIsNone(downloads.parse_range(header, 1000))
+
+
+class ResourceDownloadTests(TestCase):
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, GROUP_RESOURCE_SENDFILE=None)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        counter = mock.patch.object(downloads, 'download_counter', downloads.DownloadCounter(interval=0))
+        counter.start()
+        self.addCleanup(counter.stop)
+
+        self.user = User.objects.create_user(username='reader')
+        group = StudyGroup.objects.create(name='Files', description='d', creator=self.user, max_members=5)
+        GroupMembership.objects.get_or_create(user=self.user, group=group)
+        self.resource = GroupResource.objects.create(
+            group=group, uploaded_by=self.user, name='Slides',
+            file=default_storage.save('group_resources/slides.bin', ContentFile(self.content)),
+            file_size=len(self.content),
+        )
+        self.url = reverse('group-resource-download', args=[group.pk, self.resource.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download_count(self):
+        self.resource.refresh_from_db()
+        return self.resource.download_count
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.download_count(), 1)
+
+    def test_range_request_gets_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        # Resuming a download does not count it again
+        self.assertEqual(self.download_count(), 0)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        # A changed file is sent whole
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_missing_file_is_not_found(self):
+        default_storage.delete(self.resource.file.name)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_sendfile_offloads_the_body(self):
+        for header, value in (
+            ('X-Sendfile', self.resource.file.path),
+            ('X-Accel-Redirect', '/protected-media/group_resources/slides.bin'),
+        ):
+            with self.settings(GROUP_RESOURCE_SENDFILE=header, GROUP_RESOURCE_ACCEL_PREFIX='/protected-media/'):
+                response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+            # Ranges are left to the front-end server too
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response[header], value)
+            self.assertEqual(response.content, b'')
+            self.assertIn('filename="Slides.bin"', response['Content-Disposition'])
+            self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        # Both started at byte 10, so neither counts as a new download
+        self.assertEqual(self.download_count(), 0)
+
+
+@override_settings(GROUP_UNREAD_COUNT_CAP=3)
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader')
+        self.writer = User.objects.create_user(username='writer')
+        self.group = StudyGroup.objects.create(
+            name='Chat', description='d', creator=self.writer, max_members=5
+        )
+        for user in (self.reader, self.writer):
+            GroupMembership.objects.get_or_create(user=user, group=self.group)
+        self.messages = [
+            GroupMessage.objects.create(group=self.group, sender=self.writer, content=f'm{i}')
+            for i in range(5)
+        ]
+        self.url = reverse('group-messages-read', args=[self.group.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def mark_read(self, message=None):
+        data = {} if message is None else {'message_id': message.pk}
+        return self.client.post(self.url, data, format='json')
+
+    def test_counts_stop_at_the_cap(self):
+        membership = unread_counts(self.reader).get(group=self.group)
+        self.assertEqual(membership.unread_count, 4)
+        response = self.mark_read(self.messages[0])
+        self.assertEqual(response.data['unread_count'], 4)
+        self.assertEqual(response.data['unread_display'], '3+')
+        response = self.mark_read(self.messages[2])
+        self.assertEqual((response.data['unread_count'], response.data['unread_display']), (2, '2'))
+
+    def test_own_messages_are_not_unread(self):
+        GroupMessage.objects.create(group=self.group, sender=self.reader, content='mine')
+        self.assertEqual(self.mark_read(self.messages[3]).data['unread_count'], 1)
+
+    def test_watermark_never_moves_back(self):
+        self.assertEqual(self.mark_read(self.messages[3]).data['last_read_message_id'], self.messages[3].pk)
+        response = self.mark_read(self.messages[1])
+        self.assertEqual(response.data['last_read_message_id'], self.messages[3].pk)
+        self.assertEqual(response.data['unread_count'], 1)
+        self.assertEqual(
+            advance_watermark(self.reader.pk, self.group.pk, self.messages[2].created_at, self.messages[2].pk), 0
+        )
+        self.assertEqual(self.mark_read().data['unread_count'], 0)
+
+    def test_banned_members_and_inactive_groups(self):
+        GroupMembership.objects.filter(user=self.reader).update(is_banned=True)
+        self.assertEqual(self.mark_read(self.messages[4]).status_code, 200)
+        GroupMembership.objects.filter(user=self.reader).update(is_banned=False)
+        StudyGroup.objects.filter(pk=self.group.pk).update(is_active=False)
+        self.assertEqual(self.mark_read().status_code, 200)
+
+
+class MessageSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer')
+        self.group, self.other = [
+            StudyGroup.objects.create(name=name, description='d', creator=self.user, max_members=5)
+            for name in ('Chat', 'Other')
+        ]
+        for group in (self.group, self.other):
+            GroupMembership.objects.get_or_create(user=self.user, group=group)
+
+    def post(self, content, group=None, **fields):
+        return GroupMessage.objects.create(
+            group=group or self.group, sender=self.user, content=content, **fields
+        )
+
+    def hits(self, query, group=None, include_system=False):
+        return [
+            message.pk
+            for message in search_messages((group or self.group).pk, query, include_system)[:20]
+        ]
+
+    def test_search_is_scoped_to_the_group(self):
+        first = self.post('Integrals tonight')
+        self.post('Integrals tomorrow', group=self.other)
+        system = self.post('Integrals session moved', is_system_message=True)
+        self.assertEqual(self.hits('integ'), [first.pk])
+        self.assertCountEqual(self.hits('integrals', include_system=True), [first.pk, system.pk])
+
+    def test_edits_replace_the_indexed_text(self):
+        message = self.post('Meet at the library')
+        message.content = 'Meet at the cafe'
+        message.save()
+        self.assertEqual(self.hits('library'), [])
+        self.assertEqual(self.hits('cafe'), [message.pk])
+        # Edited twice: the second edit replays the first edit's text
+        message = GroupMessage.objects.get(pk=message.pk)
+        message.content = 'Meet online'
+        message.save()
+        self.assertEqual(self.hits('cafe'), [])
+        self.assertEqual(self.hits('meet'), [message.pk])
+
+    def test_deletes_leave_the_index(self):
+        kept, deleted = self.post('Chapter three notes'), self.post('Chapter four notes')
+        deleted.delete()
+        self.assertEqual(self.hits('chapter'), [kept.pk])
+        GroupMessage.objects.filter(pk=kept.pk).delete()
+        self.assertEqual(self.hits('chapter'), [])
+
+    def test_rebuild_command(self):
+        messages = [self.post(f'Topic {i}') for i in range(5)]
+        GroupMessage.objects.filter(pk=messages[0].pk).update(content='Unrelated')
+        out = StringIO()
+        call_command('rebuild_message_index', batch_size=2, stdout=out)
+        self.assertIn('Indexed 5 messages', out.getvalue())
+        self.assertCountEqual(self.hits('topic'), [message.pk for message in messages[1:]])
+        self.assertEqual(self.hits('unrelated'), [messages[0].pk])
+
+    def test_view_highlights_hits_for_members_only(self):
+        self.post('Bring the <b>calculator</b>')
+        client = APIClient()
+        url = reverse('group-message-search', args=[self.group.pk])
+        client.force_authenticate(User.objects.create_user(username='outsider'))
+        self.assertEqual(client.get(url, {'q': 'calc'}).status_code, 403)
+        client.force_authenticate(self.user)
+        response = client.get(url, {'q': 'calc'})
+        self.assertEqual(
+            [hit['snippet'] for hit in response.data['results']],
+            ['Bring the <mark>&lt;b&gt;calculator&lt;/b&gt;</mark>'],
+        )
+
+
+class InProcessBrokerTests(SimpleTestCase):
+    async def test_messages_reach_the_channel_subscribers(self):
+        broker = realtime.InProcessBroker()
+        chat, other = broker.subscribe('group:1'), broker.subscribe('group:2')
+        broker.publish('group:1', {'type': 'message'})
+        self.assertEqual(await asyncio.wait_for(chat.get(), 1), {'type': 'message'})
+        await asyncio.sleep(0)
+        self.assertTrue(other.queue.empty())
+
+        chat.close()
+        other.close()
+        self.assertEqual(broker._subscribers, {})
+
+    async def test_slow_subscribers_drop_messages(self):
+        broker = realtime.InProcessBroker(queue_size=2)
+        subscription = broker.subscribe('group:1')
+        for i in range(5):
+            broker.publish('group:1', {'type': 'message', 'n': i})
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.queue.qsize(), 2)
+        subscription.close()
+
+
+@override_settings(GROUP_CHAT_KEEPALIVE=60)
+class RealtimeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = User.objects.create_user(username='member')
+        self.outsider = User.objects.create_user(username='outsider')
+        self.group = StudyGroup.objects.create(
+            name='Live', description='d', creator=self.member, max_members=5
+        )
+        GroupMembership.objects.get_or_create(user=self.member, group=self.group)
+        self.channel = realtime.channel_name(self.group.pk)
+        self.broker = realtime.InProcessBroker()
+        broker = mock.patch.object(realtime, '_broker', self.broker)
+        broker.start()
+        self.addCleanup(broker.stop)
+
+    def ticket(self, user=None, group_id=None):
+        return realtime.issue_ticket((user or self.member).pk, group_id or self.group.pk)
+
+    async def test_tickets_are_single_use_and_bound_to_a_group(self):
+        ticket = self.ticket()
+        self.assertEqual(await realtime.authorize({}, f'ticket={ticket}', self.group.pk), self.member)
+        self.assertIsNone(await realtime.authorize({}, f'ticket={ticket}', self.group.pk))
+        self.assertIsNone(
+            await realtime.authorize({}, f'ticket={self.ticket(group_id=self.group.pk + 1)}', self.group.pk)
+        )
+        self.assertIsNone(await realtime.authorize({}, f'ticket={self.ticket(self.outsider)}', self.group.pk))
+
+    async def test_api_token_only_in_the_header(self):
+        token = await Token.objects.acreate(user=self.member)
+        headers = {'authorization': f'Token {token.key}'}
+        self.assertEqual(await realtime.authorize(headers, '', self.group.pk), self.member)
+        self.assertIsNone(await realtime.authorize({}, f'token={token.key}', self.group.pk))
+
+    def test_ticket_endpoint_requires_membership(self):
+        client = APIClient()
+        url = reverse('group-stream-ticket', args=[self.group.pk])
+        client.force_authenticate(self.outsider)
+        self.assertEqual(client.post(url).status_code, 403)
+        client.force_authenticate(self.member)
+        response = client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(cache.get(realtime.TICKET_KEY.format(ticket=response.data['ticket'])),
+                         (self.member.pk, self.group.pk))
+
+    async def test_websocket_forwards_messages_until_revoked(self):
+        inbound, outbound = asyncio.Queue(), asyncio.Queue()
+        scope = {
+            'type': 'websocket',
+            'path': f'/ws/groups/{self.group.pk}/',
+            'query_string': f'ticket={self.ticket()}'.encode(),
+            'headers': [],
+        }
+        connection_task = asyncio.ensure_future(
+            realtime.websocket_application(scope, inbound.get, outbound.put)
+        )
+        await inbound.put({'type': 'websocket.connect'})
+        self.assertEqual(await asyncio.wait_for(outbound.get(), 5), {'type': 'websocket.accept'})
+
+        self.broker.publish(self.channel, {'type': 'message', 'message': {'content': 'hi'}})
+        frame = await asyncio.wait_for(outbound.get(), 5)
+        self.assertEqual(json.loads(frame['text'])['message'], {'content': 'hi'})
+
+        # Someone else leaving does not end this member's subscription
+        self.broker.publish(self.channel, {'type': 'revoked', 'user_id': self.outsider.pk})
+        self.broker.publish(self.channel, {'type': 'revoked', 'user_id': self.member.pk})
+        self.assertEqual(
+            await asyncio.wait_for(outbound.get(), 5), {'type': 'websocket.close', 'code': 4403}
+        )
+        await inbound.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(connection_task, 5)
+        self.assertEqual(self.broker._subscribers, {})
+
+    async def test_websocket_rejects_non_members(self):
+        outbound = asyncio.Queue()
+        scope = {'type': 'websocket', 'path': f'/ws/groups/{self.group.pk}/', 'query_string': b'', 'headers': []}
+
+        async def receive():
+            return {'type': 'websocket.connect'}
+
+        await realtime.websocket_application(scope, receive, outbound.put)
+        self.assertEqual(outbound.get_nowait(), {'type': 'websocket.close', 'code': 4403})
+
+    async def test_event_stream(self):
+        url = reverse('group-message-stream', args=[self.group.pk])
+        response = await AsyncClient().get(url, {'ticket': self.ticket()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = response.streaming_content
+        self.assertEqual(await anext(events), b': connected\n\n')
+
+        self.broker.publish(self.channel, {'type': 'message', 'message': {'content': 'hi'}})
+        event = (await asyncio.wait_for(anext(events), 5)).decode()
+        self.assertTrue(event.startswith('event: message\ndata: '))
+
+        self.broker.publish(self.channel, {'type': 'revoked', 'user_id': self.member.pk})
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(events), 5)
+
+    async def test_membership_is_rechecked(self):
+        subscription = self.broker.subscribe(self.channel)
+        self.addCleanup(subscription.close)
+        events = realtime.member_events(subscription, self.member, self.group.pk, 0.05)
+        self.assertIsNone(await anext(events))
+        # Removed without a revoked event, as a bulk delete would
+        await GroupMembership.objects.filter(user=self.member).aupdate(is_banned=True)
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(events), 5)
+
+    def test_event_stream_refuses_wsgi(self):
+        url = reverse('group-message-stream', args=[self.group.pk])
+        self.assertEqual(self.client.get(url, {'ticket': self.ticket()}).status_code, 501)
+
+    def test_leaving_revokes_subscriptions(self):
+        with mock.patch.object(self.broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                GroupMembership.objects.filter(user=self.member, group=self.group).delete()
+        publish.assert_called_once_with(self.channel, {'type': 'revoked', 'user_id': self.member.pk})
+
+
+class AttendanceSummaryTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='organizer')
+        self.group = StudyGroup.objects.create(
+            name='Study hall', description='d', creator=self.creator, max_members=10
+        )
+        self.members = [User.objects.create_user(username=f'member{i}') for i in range(3)]
+        for user in self.members:
+            GroupMembership.objects.get_or_create(user=user, group=self.group)
+        start = timezone.now() - timedelta(hours=2)
+        self.session = StudySession.objects.create(
+            group=self.group, title='Review', facilitator=self.creator,
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+        self.start = start
+
+    def test_rebuild_creates_missing_summaries(self):
+        # Attendance recorded before the summaries existed
+        SessionAttendance.objects.bulk_create([
+            SessionAttendance(session=self.session, user=self.members[0]),
+            SessionAttendance(session=self.session, user=self.members[1]),
+        ])
+        SessionAttendance.objects.filter(user=self.members[0]).update(
+            joined_at=self.start, left_at=self.start + timedelta(minutes=30)
+        )
+
+        self.assertEqual(rebuild_summaries(), 2)
+        summary = SessionAttendanceSummary.objects.get(session=self.session)
+        self.assertEqual(
+            (summary.expected_count, summary.attendee_count, summary.checked_out_count, summary.attended_seconds),
+            (3, 2, 1, 1800),
+        )
+        group = GroupAttendanceSummary.objects.get(group=self.group)
+        self.assertEqual(
+            (group.session_count, group.expected_count, group.attendee_count, group.attended_seconds),
+            (1, 3, 2, 1800),
+        )
+        self.assertEqual(rebuild_summaries(), 0)
+
+    def post(self, name, data=None):
+        client = APIClient()
+        client.force_authenticate(self.creator)
+        response = client.post(reverse(name, args=[self.session.pk]), data or {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def summary(self, name, pk):
+        client = APIClient()
+        client.force_authenticate(self.members[2])
+        return client.get(reverse(name, args=[pk])).data
+
+    def test_check_out_fills_in_the_summaries(self):
+        first, second, absent = (user.pk for user in self.members)
+        self.post('session-check-in', {'user_ids': [first, second]})
+        SessionAttendance.objects.update(joined_at=timezone.now() - timedelta(minutes=30))
+
+        data = self.post('session-check-out', {'user_ids': [first]})
+        self.assertEqual(data['results'], {str(first): 'checked_out'})
+        self.assertEqual(data['summary']['checked_out_count'], 1)
+        self.assertEqual(data['summary']['average_minutes'], 30.0)
+
+        # Without user_ids everyone still present leaves
+        data = self.post('session-check-out')
+        self.assertEqual(data['results'], {str(second): 'checked_out'})
+        data = self.post('session-check-out', {'user_ids': [first, absent]})
+        self.assertEqual(
+            data['results'], {str(first): 'not_checked_in', str(absent): 'not_checked_in'}
+        )
+
+        session = self.summary('session-attendance-summary', self.session.pk)
+        group = self.summary('group-attendance-summary', self.group.pk)
+        for summary in (session, group):
+            self.assertEqual(
+                (summary['expected_count'], summary['attendee_count'], summary['checked_out_count']),
+                (3, 2, 2),
+            )
+            self.assertEqual(summary['average_minutes'], 30.0)
+            self.assertEqual(summary['no_show_rate'], 0.333)
+        self.assertEqual(group['session_count'], 1)
+
+    def test_deleted_sessions_leave_the_group_summary(self):
+        self.post('session-check-in', {'user_ids': [self.members[0].pk]})
+        SessionAttendance.objects.update(joined_at=timezone.now() - timedelta(minutes=30))
+        self.post('session-check-out')
+        self.session.delete()
+
+        group = self.summary('group-attendance-summary', self.group.pk)
+        self.assertEqual(
+            (group['session_count'], group['expected_count'], group['attendee_count'],
+             group['checked_out_count'], group['average_minutes'], group['no_show_rate']),
+            (0, 0, 0, 0, None, None),
+        )
+        self.assertEqual(rebuild_summaries(), 0)
+
+
+class ReconcileGroupCountersTests(TestCase):
+    def test_counters_are_rebuilt(self):
+        creator = User.objects.create_user(username='creator')
+        group = StudyGroup.objects.create(name='Drift', description='d', creator=creator, max_members=5)
+        GroupMembership.objects.get_or_create(user=creator, group=group)
+        GroupMessage.objects.create(group=group, sender=creator, content='hello')
+        GroupMessage.objects.create(group=group, sender=creator, content='joined', is_system_message=True)
+        StudyGroup.objects.filter(pk=group.pk).update(member_count=9, message_count=9)
+
+        call_command('reconcile_group_counters', stdout=StringIO())
+        group.refresh_from_db()
+        self.assertEqual((group.member_count, group.message_count), (1, 1))
+
+
+class SuggestedGroupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student')
+        self.creator = User.objects.create_user(username='creator')
+        self.course = Course.objects.create(title='Python', description='d', creator=self.creator)
+        Enrollment.objects.create(student=self.user, course=self.course)
+
+    def create_group(self, name, course=None, **fields):
+        fields.setdefault('max_members', 5)
+        return StudyGroup.objects.create(
+            name=name, description='d', creator=self.creator, course=course or self.course, **fields
+        )
+
+    def test_only_joinable_groups_of_enrolled_courses(self):
+        open_group = self.create_group('Open')
+        self.create_group('Private', privacy='private')
+        self.create_group('Inactive', is_active=False)
+        full = self.create_group('Full', max_members=2)
+        StudyGroup.objects.filter(pk=full.pk).update(member_count=2)
+        joined = self.create_group('Joined')
+        GroupMembership.objects.get_or_create(user=self.user, group=joined)
+        other_course = Course.objects.create(title='Art', description='d', creator=self.creator)
+        self.create_group('Other course', course=other_course)
+
+        self.assertEqual([g.name for g in suggested_groups(self.user)], [open_group.name])
+
+    def test_ranked_by_activity_then_free_seats(self):
+        quiet_roomy = self.create_group('Quiet roomy', max_members=10)
+        quiet_small = self.create_group('Quiet small', max_members=3)
+        busy = self.create_group('Busy', max_members=3)
+        StudyGroup.objects.filter(pk=busy.pk).update(activity_score=4.5)
+
+        groups = list(suggested_groups(self.user))
+        self.assertEqual([g.pk for g in groups], [busy.pk, quiet_roomy.pk, quiet_small.pk])
+        self.assertEqual(groups[1].free_seats, quiet_roomy.max_members - quiet_roomy.member_count)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('suggested-studygroups'))
+        groups = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([g['name'] for g in groups], ['Busy', 'Quiet roomy', 'Quiet small'])
+        self.assertEqual(groups[0]['activity_score'], 4.5)
+
+    def test_activity_scores_decay_with_age(self):
+        recent, stale, silent = (self.create_group(name) for name in ('Recent', 'Stale', 'Silent'))
+        StudyGroup.objects.filter(pk=silent.pk).update(activity_score=3)
+        now = timezone.now()
+
+        def post(group, days_ago, **fields):
+            message = GroupMessage.objects.create(
+                group=group, sender=self.creator, content='hi', **fields
+            )
+            GroupMessage.objects.filter(pk=message.pk).update(created_at=now - timedelta(days=days_ago))
+
+        post(recent, 0)
+        post(recent, 0)
+        post(recent, 0, is_system_message=True)
+        post(stale, 7)
+        post(stale, 14)
+        post(stale, 60)
+
+        self.assertEqual(refresh_activity_scores(now), 3)
+        scores = dict(StudyGroup.objects.values_list('name', 'activity_score'))
+        # Half weight per GROUP_ACTIVITY_HALF_LIFE_DAYS; outside the window nothing
+        self.assertEqual(scores, {'Recent': 2.0, 'Stale': 0.75, 'Silent': 0})
+        self.assertEqual(refresh_activity_scores(now), 0)
+
+        out = StringIO()
+        call_command('compute_group_activity', stdout=out)
+        self.assertIn('Updated activity scores of 0 study groups', out.getvalue())
+
+
+class StudyGroupListQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='browser')
+        self.creator = User.objects.create_user(username='creator')
+        self.course = Course.objects.create(title='Python', description='d', creator=self.creator)
+        Enrollment.objects.create(student=self.user, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_groups(self, count):
+        for i in range(count):
+            group = StudyGroup.objects.create(
+                name=f'Group {StudyGroup.objects.count()}', description='d', creator=self.creator,
+                course=self.course, privacy=('public', 'course', 'private')[i % 3], max_members=5,
+            )
+            if i % 2:
+                GroupMembership.objects.get_or_create(user=self.user, group=group)
+
+    def test_query_count_does_not_grow_with_groups(self):
+        # The page, the user's memberships and their enrollments, for 5 or
+        # 25 groups; a token-authenticated request adds its token lookup
+        for total in (5, 25):
+            self.add_groups(total - StudyGroup.objects.count())
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('studygroup-list'))
+            groups = response.data['results'] if isinstance(response.data, dict) else response.data
+            self.assertEqual(len(groups), total)
+            self.assertEqual(sum(group['is_member'] for group in groups), total // 2)
+
+    def test_courses_are_summaries_unless_full_detail(self):
+        self.add_groups(3)
+        response = self.client.get(reverse('studygroup-list'))
+        groups = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(
+            set(groups[0]['course']),
+            {'id', 'slug', 'title', 'short_description', 'level', 'category',
+             'is_paid', 'price', 'total_students', 'creator_name'},
+        )
+        # Full detail adds the course videos, prefetched in one query
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('studygroup-list'), {'detail': 'full'})
+        groups = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(len(groups), 3)
+        self.assertEqual(groups[0]['course']['videos'], [])
+        self.assertIn('description', groups[0]['course'])
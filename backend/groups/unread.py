@@ -0,0 +1,75 @@
+"""
+Per-member read watermarks and unread message counts.
+
+A membership's watermark is the (created_at, id) position of the newest
+message its member has read; it only moves forward. Unread counts for all
+of a user's groups come from one query that, per membership, walks the
+(group, created_at) index from the watermark and stops after
+GROUP_UNREAD_COUNT_CAP + 1 rows, so a long-absent member costs no more than
+an active one. Counts above the cap are shown as "99+".
+"""
+from django.conf import settings
+from django.db.models import F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from accounts import cache as dashboard_cache
+
+from .models import GroupMembership, GroupMessage
+
+
+class CappedCount(Subquery):
+    """COUNT(*) of a sliced subquery, so the count stops at the slice"""
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) AS capped)'
+    output_field = IntegerField()
+
+
+def advance_watermark(user_id, group_id, created_at, message_id):
+    """Move the member's watermark up to the message; never moves it back"""
+    moved = GroupMembership.objects.filter(user_id=user_id, group_id=group_id).filter(
+        Q(last_read_at__isnull=True)
+        | Q(last_read_at__lt=created_at)
+        | Q(last_read_at=created_at, last_read_message_id__lt=message_id)
+    ).update(last_read_at=created_at, last_read_message_id=message_id)
+    if moved:
+        dashboard_cache.bump_versions([user_id])
+    return moved
+
+
+def latest_position(group_id):
+    """(created_at, id) of the group's newest message in the hot table, or None"""
+    return (
+        GroupMessage.objects.filter(group_id=group_id)
+        .order_by('-created_at', '-pk')
+        .values_list('created_at', 'pk')
+        .first()
+    )
+
+
+def with_unread_counts(memberships):
+    """
+    Annotate memberships with `unread_count`: messages from others, newer
+    than the watermark (or the join when never read), up to the cap + 1.
+    """
+    cap = settings.GROUP_UNREAD_COUNT_CAP
+    unread = GroupMessage.objects.filter(
+        Q(created_at__gt=OuterRef('read_at'))
+        | Q(created_at=OuterRef('read_at'), pk__gt=OuterRef('last_read_message_id')),
+        group=OuterRef('group_id'),
+        is_system_message=False,
+    ).exclude(sender=OuterRef('user_id')).order_by('created_at').values('pk')[:cap + 1]
+    return memberships.annotate(
+        read_at=Coalesce('last_read_at', F('joined_at')),
+    ).annotate(unread_count=CappedCount(unread))
+
+
+def unread_counts(user):
+    """The user's active memberships, each with `unread_count`, in one query"""
+    memberships = GroupMembership.objects.filter(
+        user=user, is_banned=False, group__is_active=True
+    ).order_by('group_id')
+    return with_unread_counts(memberships)
+
+
+def unread_display(count):
+    cap = settings.GROUP_UNREAD_COUNT_CAP
+    return f'{cap}+' if count > cap else str(count)
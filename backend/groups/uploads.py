@@ -0,0 +1,204 @@
+"""
+Chunked, resumable uploads and content-addressed storage for group resources.
+
+A client creates a ResourceUpload, PUTs the file in order in chunks of any
+size (each tagged with a Content-Range, or appended at the current
+offset), and completes it. Chunks stream straight to a part file under
+RESOURCE_UPLOAD_TEMP_DIR; a client that lost its connection asks for the
+upload's received_size and resumes from there. Uploads left untouched for
+RESOURCE_UPLOAD_EXPIRE_HOURS are removed by `manage.py cleanup_uploads`.
+
+Finished files are stored once per content hash under resource_blobs/,
+so every GroupResource with the same content shares one blob. The hash is
+taken from the assembled part file, and an existing blob is only reused
+once its own content is found to hash the same. Blobs are never deleted
+along with a resource.
+"""
+import hashlib
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GroupResource, ResourceUpload
+
+BLOB_DIR = 'resource_blobs'
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk or completion request that does not fit the upload's state"""
+
+    def __init__(self, message, received_size=None):
+        super().__init__(message)
+        self.received_size = received_size
+
+
+def blob_name(digest, filename):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{os.path.splitext(filename)[1].lower()}'
+
+
+def file_type(filename):
+    return (mimetypes.guess_type(filename)[0] or 'application/octet-stream')[:50]
+
+
+class PartFile(File):
+    """A finished part file, moved rather than copied into FileSystemStorage"""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def file_digest(file):
+    """SHA-256 hex digest of an open binary file, read from the start"""
+    file.seek(0)
+    hasher = hashlib.sha256()
+    for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+        hasher.update(block)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def store_blob(file, digest, filename):
+    """
+    Storage name of the blob for `digest`, saving `file` unless a blob with
+    that name and the same content is already stored. A blob under the name
+    whose content does not match is left alone and `file` is saved beside it.
+    """
+    name = blob_name(digest, filename)
+    if default_storage.exists(name):
+        with default_storage.open(name, 'rb') as existing:
+            if file_digest(existing) == digest:
+                return name
+    return default_storage.save(name, file)
+
+
+def part_path(upload):
+    return os.path.join(settings.RESOURCE_UPLOAD_TEMP_DIR, f'{upload.pk}.part')
+
+
+def write_chunk(upload, stream, start=None):
+    """
+    Append the bytes of `stream` to the upload at offset `start` (the
+    current received_size when None) and return the new received_size.
+    """
+    if start is None:
+        start = upload.received_size
+    if start != upload.received_size:
+        raise UploadError('Chunk does not start at the received offset', upload.received_size)
+
+    limit = upload.total_size - start
+    path = part_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        f.seek(start)
+        while True:
+            block = stream.read(BLOCK_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if written > limit:
+                raise UploadError('Chunk runs past the declared file size', upload.received_size)
+            f.write(block)
+
+    # Another request for the same offset may have finished first; only one
+    # of them moves the offset. Their bytes may differ, which is why the
+    # digest is taken from the part file on completion
+    offset = start + written
+    moved = ResourceUpload.objects.filter(pk=upload.pk, received_size=start).update(
+        received_size=offset, updated_at=timezone.now()
+    )
+    if not moved:
+        upload.refresh_from_db(fields=['received_size'])
+        raise UploadError('Chunk was already received', upload.received_size)
+    upload.received_size = offset
+    return offset
+
+
+def complete_upload(upload):
+    """Turn a fully received upload into a GroupResource, once"""
+    with transaction.atomic():
+        # Concurrent or retried completions wait for the row lock; only the
+        # first still finds the upload, the others fail instead of creating
+        # a second resource
+        locked = ResourceUpload.objects.select_for_update().filter(pk=upload.pk).first()
+        if locked is None:
+            raise UploadError('Upload was already completed', upload.total_size)
+        upload = locked
+        if upload.received_size != upload.total_size:
+            raise UploadError('Upload is not complete', upload.received_size)
+
+        path = part_path(upload)
+        try:
+            with open(path, 'r+b') as f:
+                # Drop anything an interrupted chunk left past the end
+                f.truncate(upload.total_size)
+                digest = file_digest(f)
+        except FileNotFoundError:
+            raise UploadError('Upload is no longer available', upload.received_size)
+        with open(path, 'rb') as f:
+            name = store_blob(PartFile(f, name=path), digest, upload.filename)
+
+        resource = GroupResource.objects.create(
+            group_id=upload.group_id,
+            uploaded_by_id=upload.uploaded_by_id,
+            name=upload.name,
+            description=upload.description,
+            file=name,
+            file_type=file_type(upload.filename),
+            file_size=upload.total_size,
+        )
+        discard_upload(upload)
+    return resource
+
+
+def discard_upload(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def discard_stale_uploads(cutoff):
+    """
+    Remove uploads last written to before `cutoff`, and part files older
+    than that with no upload left to own them; returns (uploads, files).
+    """
+    uploads = 0
+    for upload in ResourceUpload.objects.filter(updated_at__lt=cutoff).iterator():
+        discard_upload(upload)
+        uploads += 1
+
+    files = 0
+    live = {f'{pk}.part' for pk in ResourceUpload.objects.values_list('pk', flat=True)}
+    try:
+        entries = list(os.scandir(settings.RESOURCE_UPLOAD_TEMP_DIR))
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        if (
+            entry.name.endswith('.part')
+            and entry.name not in live
+            and entry.stat().st_mtime < cutoff.timestamp()
+        ):
+            try:
+                os.remove(entry.path)
+                files += 1
+            except FileNotFoundError:
+                pass
+    return uploads, files
+
+
+def store_uploaded_file(uploaded_file):
+    """Store a single-request upload by content hash; returns the storage name"""
+    hasher = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return store_blob(uploaded_file, hasher.hexdigest(), uploaded_file.name)
@@ -1,22 +1,41 @@
 from django.urls import path
-from . import views
+from . import realtime, views
 
 urlpatterns = [
     # Study Groups
     path('groups/', views.StudyGroupListView.as_view(), name='studygroup-list'),
     path('groups/me/', views.MyStudyGroupsView.as_view(), name='my-studygroups'),
+    path('groups/suggested/', views.SuggestedStudyGroupsView.as_view(), name='suggested-studygroups'),
+    path('groups/me/unread/', views.UnreadCountsView.as_view(), name='my-unread-counts'),
     path('groups/<int:pk>/', views.StudyGroupDetailView.as_view(), name='studygroup-detail'),
     path('groups/<int:pk>/join/', views.JoinStudyGroupView.as_view(), name='join-studygroup'),
     path('groups/<int:pk>/leave/', views.LeaveStudyGroupView.as_view(), name='leave-studygroup'),
     
     # Group Chat
     path('groups/<int:group_id>/messages/', views.GroupMessageListView.as_view(), name='group-messages'),
+    path('groups/<int:group_id>/messages/read/', views.MarkMessagesReadView.as_view(), name='group-messages-read'),
+    path('groups/<int:group_id>/messages/search/', views.GroupMessageSearchView.as_view(), name='group-message-search'),
+    path('groups/<int:group_id>/stream/', realtime.group_message_stream, name='group-message-stream'),
+    path('groups/<int:group_id>/stream/ticket/', views.StreamTicketView.as_view(), name='group-stream-ticket'),
     
     # Group Resources
     path('groups/<int:group_id>/resources/', views.GroupResourceListView.as_view(), name='group-resources'),
+    path('groups/<int:group_id>/resources/uploads/', views.ResourceUploadCreateView.as_view(), name='group-resource-upload-create'),
+    path('groups/<int:group_id>/resources/uploads/<uuid:pk>/', views.ResourceUploadView.as_view(), name='group-resource-upload'),
+    path('groups/<int:group_id>/resources/uploads/<uuid:pk>/complete/', views.ResourceUploadCompleteView.as_view(), name='group-resource-upload-complete'),
+    path('groups/<int:group_id>/resources/<int:pk>/download/', views.GroupResourceDownloadView.as_view(), name='group-resource-download'),
     
     # Study Sessions
     path('groups/<int:group_id>/sessions/', views.StudySessionListView.as_view(), name='study-sessions'),
+    path('groups/<int:group_id>/sessions/calendar/', views.GroupCalendarView.as_view(), name='group-calendar'),
+    path('groups/<int:group_id>/attendance/summary/', views.GroupAttendanceSummaryView.as_view(), name='group-attendance-summary'),
+    path('sessions/<int:pk>/attendance/check-in/', views.SessionAttendanceView.as_view(), name='session-check-in'),
+    path('sessions/<int:pk>/attendance/check-out/', views.SessionCheckOutView.as_view(), name='session-check-out'),
+    path('sessions/<int:pk>/attendance/summary/', views.SessionAttendanceSummaryView.as_view(), name='session-attendance-summary'),
+    
+    # Sessions across all of the user's groups
+    path('sessions/me/', views.MySessionsView.as_view(), name='my-sessions'),
+    path('sessions/conflicts/', views.SessionConflictView.as_view(), name='session-conflicts'),
     
     # Legacy endpoint
     path('groups/legacy/', views.group_list_api, name='group-list-legacy'),
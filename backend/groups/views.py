@@ -1,22 +1,106 @@
+import re
+from datetime import datetime, time, timedelta
+from io import BytesIO
+
 from django.shortcuts import render
 from rest_framework import generics, permissions, status, filters
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.views.generic import TemplateView
 from .models import StudyGroup
 
 # Create your views here.
 
-from .models import StudyGroup, GroupMembership, GroupMessage, GroupResource, StudySession
+from .models import (
+    StudyGroup, GroupMembership, GroupMessage, GroupResource, ResourceUpload, StudySession,
+    SessionAttendanceSummary, GroupAttendanceSummary,
+)
 from .serializers import (
     StudyGroupSerializer, CreateStudyGroupSerializer,
-    GroupMessageSerializer, GroupResourceSerializer,
-    StudySessionSerializer, GroupMembershipSerializer
+    GroupMessageSerializer, GroupMessageSearchSerializer, GroupResourceSerializer,
+    ResourceUploadSerializer, SessionOccurrenceSerializer, CalendarOccurrenceSerializer,
+    ConflictingOccurrenceSerializer, SessionConflictCheckSerializer,
+    StudySessionSerializer, GroupMembershipSerializer,
+    BulkAttendanceSerializer, BulkCheckOutSerializer,
+    SessionAttendanceSummarySerializer, GroupAttendanceSummarySerializer,
+    GroupUnreadSerializer, MarkReadSerializer, SuggestedStudyGroupSerializer,
+)
+from courses.serializers import wants_full_detail
+from .attendance import check_in, check_out
+from .archive import archived_messages, archived_position
+from .calendar import find_conflicts, user_calendar
+from .downloads import serve_resource
+from .uploads import (
+    UploadError, complete_upload, discard_upload, file_type, store_uploaded_file, write_chunk
 )
+from .pagination import MessageSearchPagination
+from .realtime import issue_ticket, publish_message
+from .recurrence import occurrences_between
+from .search import search_messages
+from .suggestions import suggested_groups
+from .unread import advance_watermark, latest_position, unread_counts, with_unread_counts
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (?P<start>\d+)-(?P<end>\d+)/(?P<total>\d+|\*)$')
+
+
+def _parse_moment(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: 'Expected an ISO 8601 date or datetime'})
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def calendar_window(params, default_days=28):
+    """The [from, to) window of a calendar request"""
+    start = _parse_moment(params, 'from') or timezone.now()
+    end = _parse_moment(params, 'to') or start + timedelta(days=default_days)
+    if end <= start:
+        raise ValidationError({'to': 'Must be after from'})
+    if end - start > timedelta(days=settings.SESSION_CALENDAR_MAX_DAYS):
+        raise ValidationError({'to': f'Windows are limited to {settings.SESSION_CALENDAR_MAX_DAYS} days'})
+    return start, end
+
+
+def message_position(group, pk):
+    """
+    (created_at, archived) of message `pk` in the group, its position on
+    the (group, created_at) index, falling back to the archive for messages
+    moved out of it; None when the group has no such message.
+    """
+    created_at = GroupMessage.objects.filter(group=group, pk=pk).values_list(
+        'created_at', flat=True
+    ).first()
+    if created_at is not None:
+        return created_at, False
+    created_at = archived_position(group.pk, pk)
+    if created_at is None:
+        return None
+    return created_at, True
+
+
+def with_list_relations(queryset, request):
+    """Load everything StudyGroupSerializer renders for a page up front"""
+    queryset = queryset.select_related('creator', 'course__creator')
+    if wants_full_detail(request):
+        queryset = queryset.prefetch_related('course__videos')
+    return queryset
+
 
 # Custom Permissions
 class IsGroupMember(permissions.BasePermission):
@@ -56,7 +140,7 @@ class StudyGroupListView(generics.ListCreateAPIView):
         return [permissions.AllowAny()]
     
     def get_queryset(self):
-        queryset = StudyGroup.objects.filter(is_active=True)
+        queryset = with_list_relations(StudyGroup.objects.filter(is_active=True), self.request)
         
         # Filter by course
         course_id = self.request.query_params.get('course', None)
@@ -102,29 +186,33 @@ class JoinStudyGroupView(APIView):
         if not can_join:
             return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create membership
-        membership, created = GroupMembership.objects.get_or_create(
-            user=request.user,
-            group=group,
-            defaults={'role': 'member'}
-        )
-        
-        if created:
-            # Update member count
-            group.member_count += 1
-            group.save()
+        with transaction.atomic():
+            membership, created = GroupMembership.objects.get_or_create(
+                user=request.user,
+                group=group,
+                defaults={'role': 'member'}
+            )
+            if not created:
+                return Response({'error': 'Already a member'}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # The is_full check above can be stale by now; only the
+            # conditional UPDATE decides who gets the last seats
+            if not group.claim_seat():
+                transaction.set_rollback(True)
+                return Response({'error': 'Group is full'}, status=status.HTTP_400_BAD_REQUEST)
             
             # Create system message
-            GroupMessage.objects.create(
+            notice = GroupMessage.objects.create(
                 group=group,
                 sender=request.user,
                 content=f"{request.user.username} joined the group",
                 is_system_message=True
             )
-            
-            return Response({'message': 'Successfully joined the group'}, status=status.HTTP_201_CREATED)
-        else:
-            return Response({'error': 'Already a member'}, status=status.HTTP_400_BAD_REQUEST)
+            publish_message(notice)
+            # New members start caught up; history before joining is not unread
+            advance_watermark(request.user.id, group.pk, notice.created_at, notice.pk)
+        
+        return Response({'message': 'Successfully joined the group'}, status=status.HTTP_201_CREATED)
 
 
 class LeaveStudyGroupView(APIView):
@@ -134,36 +222,36 @@ class LeaveStudyGroupView(APIView):
     def post(self, request, pk):
         group = get_object_or_404(StudyGroup, pk=pk)
         
-        try:
-            membership = GroupMembership.objects.get(user=request.user, group=group)
+        with transaction.atomic():
+            membership = GroupMembership.objects.filter(user=request.user, group=group).first()
+            if membership is None:
+                return Response({'error': 'Not a member of this group'}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Check if user is the last admin
+            # Check if user is the last admin. The admin rows are locked so
+            # two admins leaving at once cannot both see the other one stay
             if membership.role == 'admin':
-                admin_count = GroupMembership.objects.filter(group=group, role='admin').count()
-                if admin_count <= 1:
+                admins = GroupMembership.objects.select_for_update().filter(group=group, role='admin')
+                if len(admins.values_list('pk', flat=True)) <= 1:
                     return Response(
                         {'error': 'Cannot leave as the only admin. Transfer admin role first.'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
             
-            membership.delete()
-            
-            # Update member count
-            group.member_count -= 1
-            group.save()
+            # Only the request that actually removed the row frees the seat
+            deleted, _ = GroupMembership.objects.filter(pk=membership.pk).delete()
+            if not deleted:
+                return Response({'error': 'Not a member of this group'}, status=status.HTTP_400_BAD_REQUEST)
+            group.release_seat()
             
             # Create system message
-            GroupMessage.objects.create(
+            publish_message(GroupMessage.objects.create(
                 group=group,
                 sender=request.user,
                 content=f"{request.user.username} left the group",
                 is_system_message=True
-            )
-            
-            return Response({'message': 'Successfully left the group'})
-            
-        except GroupMembership.DoesNotExist:
-            return Response({'error': 'Not a member of this group'}, status=status.HTTP_400_BAD_REQUEST)
+            ))
+        
+        return Response({'message': 'Successfully left the group'})
 
 
 # Group Chat Views
@@ -172,17 +260,159 @@ class GroupMessageListView(generics.ListCreateAPIView):
     serializer_class = GroupMessageSerializer
     permission_classes = [permissions.IsAuthenticated, IsGroupMember]
     
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Reading and posting both need the group's membership
+        self.group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
+        self.check_object_permissions(request, self.group)
+    
     def get_queryset(self):
-        group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
-        return GroupMessage.objects.filter(group=group).order_by('-created_at')[:50]
+        """
+        Newest messages first. ?before=<id> pages back through history and
+        ?after=<id> returns only messages newer than the one a polling client
+        already has; ?limit= sets the page size. Pages that run past the hot
+        table continue into the message archive.
+        """
+        group = self.group
+        params = self.request.query_params
+        limit = self._int_param('limit', settings.GROUP_MESSAGE_PAGE_SIZE)
+        limit = max(1, min(limit, settings.GROUP_MESSAGE_MAX_PAGE_SIZE))
+        queryset = GroupMessage.objects.filter(group=group).select_related('sender')
+        
+        if 'after' in params:
+            created_at, pk, archived = self._cursor(group, 'after')
+            newer = []
+            if archived:
+                newer = archived_messages(group.pk, limit, after=(created_at, pk))
+            newer += queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            ).order_by('created_at', 'pk')[:limit - len(newer)]
+            return list(reversed(newer))
+        
+        position = None
+        if 'before' in params:
+            created_at, pk, archived = self._cursor(group, 'before')
+            position = (created_at, pk)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            )
+        messages = list(queryset.order_by('-created_at', '-pk')[:limit])
+        if len(messages) < limit:
+            if messages:
+                position = (messages[-1].created_at, messages[-1].pk)
+            messages += archived_messages(group.pk, limit - len(messages), before=position)
+        return messages
+    
+    def _int_param(self, name, default=None):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: 'Must be an integer'})
+    
+    def _cursor(self, group, name):
+        pk = self._int_param(name)
+        position = message_position(group, pk)
+        if position is None:
+            raise ValidationError({name: 'Unknown message'})
+        created_at, archived = position
+        return created_at, pk, archived
     
     def perform_create(self, serializer):
-        group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
-        serializer.save(group=group, sender=self.request.user)
+        group = self.group
+        message = serializer.save(group=group, sender=self.request.user)
+        publish_message(message)
+        # Your own messages are read
+        advance_watermark(self.request.user.id, group.pk, message.created_at, message.pk)
         
         # Update message count
-        group.message_count += 1
-        group.save()
+        group.message_count = F('message_count') + 1
+        group.save(update_fields=['message_count'])
+
+
+class MarkMessagesReadView(APIView):
+    """Advance the user's read watermark in a group; it never moves back"""
+    permission_classes = [permissions.IsAuthenticated, IsGroupMember]
+    
+    def post(self, request, group_id):
+        group = get_object_or_404(StudyGroup, pk=group_id)
+        self.check_object_permissions(request, group)
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        message_id = serializer.validated_data.get('message_id')
+        if message_id is None:
+            latest = latest_position(group.pk)
+            if latest is not None:
+                advance_watermark(request.user.id, group.pk, *latest)
+        else:
+            position = message_position(group, message_id)
+            if position is None:
+                raise ValidationError({'message_id': 'Unknown message'})
+            advance_watermark(request.user.id, group.pk, position[0], message_id)
+        
+        # From the membership itself: unread_counts() leaves out banned
+        # members and inactive groups, which may still mark messages read
+        membership = get_object_or_404(
+            with_unread_counts(GroupMembership.objects.filter(user=request.user, group=group))
+        )
+        return Response(GroupUnreadSerializer(membership).data)
+
+
+class StreamTicketView(APIView):
+    """
+    A single-use ticket for subscribing to the group's chat over a
+    WebSocket or SSE, passed as ?ticket= (see groups.realtime)
+    """
+    permission_classes = [permissions.IsAuthenticated, IsGroupMember]
+    
+    def post(self, request, group_id):
+        group = get_object_or_404(StudyGroup, pk=group_id)
+        self.check_object_permissions(request, group)
+        return Response(
+            {
+                'ticket': issue_ticket(request.user.pk, group.pk),
+                'expires_in': settings.GROUP_CHAT_TICKET_TIMEOUT,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+class UnreadCountsView(generics.ListAPIView):
+    """Unread message counts for all of the user's groups, from one query"""
+    serializer_class = GroupUnreadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return unread_counts(self.request.user)
+
+
+class GroupMessageSearchView(generics.ListAPIView):
+    """
+    Ranked full-text search over a group's messages. System messages are
+    left out unless ?include_system=true.
+    """
+    serializer_class = GroupMessageSearchSerializer
+    permission_classes = [permissions.IsAuthenticated, IsGroupMember]
+    pagination_class = MessageSearchPagination
+    
+    def get_queryset(self):
+        group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
+        self.check_object_permissions(self.request, group)
+        params = self.request.query_params
+        return search_messages(
+            group.pk,
+            params.get('q', ''),
+            include_system=params.get('include_system') == 'true',
+            queryset=GroupMessage.objects.select_related('sender'),
+        )
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['search_query'] = self.request.query_params.get('q', '')
+        return context
 
 
 # Group Resources Views
@@ -198,13 +428,102 @@ class GroupResourceListView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
         
-        # Get file info
-        file = self.request.FILES.get('file')
-        if file:
-            serializer.validated_data['file_size'] = file.size
-            serializer.validated_data['file_type'] = file.content_type
-        
-        serializer.save(group=group, uploaded_by=self.request.user)
+        # Get file info; identical content is stored once across groups
+        file = serializer.validated_data.pop('file')
+        serializer.save(
+            group=group,
+            uploaded_by=self.request.user,
+            file=store_uploaded_file(file),
+            file_size=file.size,
+            file_type=file_type(file.name),
+        )
+
+
+class ResourceUploadCreateView(APIView):
+    """Start a chunked upload of a group resource"""
+    permission_classes = [permissions.IsAuthenticated, IsGroupMember]
+    
+    def post(self, request, group_id):
+        group = get_object_or_404(StudyGroup, pk=group_id)
+        self.check_object_permissions(request, group)
+        serializer = ResourceUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(group=group, uploaded_by=request.user)
+        data = dict(ResourceUploadSerializer(upload).data)
+        data['chunk_size'] = settings.RESOURCE_UPLOAD_CHUNK_SIZE
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class ResourceUploadView(APIView):
+    """
+    GET reports how much of an upload has arrived, so an interrupted client
+    can resume; PUT sends the next chunk as the raw request body, optionally
+    with a Content-Range saying where it starts; DELETE abandons the upload.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_upload(self, request, group_id, pk):
+        return get_object_or_404(
+            ResourceUpload, pk=pk, group_id=group_id, uploaded_by=request.user
+        )
+    
+    def get(self, request, group_id, pk):
+        return Response(ResourceUploadSerializer(self.get_upload(request, group_id, pk)).data)
+    
+    def put(self, request, group_id, pk):
+        upload = self.get_upload(request, group_id, pk)
+        start = None
+        content_range = request.headers.get('Content-Range')
+        if content_range:
+            match = CONTENT_RANGE_RE.match(content_range.strip())
+            if not match:
+                raise ValidationError({'Content-Range': 'Expected "bytes <start>-<end>/<total>"'})
+            start = int(match.group('start'))
+        try:
+            received_size = write_chunk(upload, request.stream or BytesIO(), start)
+        except UploadError as e:
+            return Response(
+                {'error': str(e), 'received_size': e.received_size},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'received_size': received_size, 'total_size': upload.total_size})
+    
+    def delete(self, request, group_id, pk):
+        discard_upload(self.get_upload(request, group_id, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ResourceUploadCompleteView(ResourceUploadView):
+    """Assemble a fully received upload into a group resource"""
+    http_method_names = ['post', 'options']
+    
+    def post(self, request, group_id, pk):
+        upload = self.get_upload(request, group_id, pk)
+        try:
+            resource = complete_upload(upload)
+        except UploadError as e:
+            return Response(
+                {'error': str(e), 'received_size': e.received_size},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(
+            GroupResourceSerializer(resource, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+class GroupResourceDownloadView(APIView):
+    """Download a group resource; supports conditional and Range requests"""
+    permission_classes = [permissions.IsAuthenticated, IsGroupMember]
+    
+    def get(self, request, group_id, pk):
+        resource = get_object_or_404(
+            GroupResource.objects.select_related('group'), pk=pk, group_id=group_id
+        )
+        self.check_object_permissions(request, resource)
+        if not resource.file:
+            return Response({'error': 'Resource has no file'}, status=status.HTTP_404_NOT_FOUND)
+        return serve_resource(request, resource)
 
 
 # Study Session Views
@@ -214,19 +533,125 @@ class StudySessionListView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsGroupMember]
     
     def get_queryset(self):
+        """Sessions that still have an occurrence to come, by the next one"""
         group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
         now = timezone.now()
         return StudySession.objects.filter(
             group=group,
-            start_time__gte=now,
             is_cancelled=False
-        ).order_by('start_time')
+        ).annotate(
+            next_start=Min('occurrences__start_time', filter=Q(occurrences__start_time__gte=now))
+        ).filter(next_start__isnull=False).select_related('facilitator', 'group').order_by('next_start')
     
     def perform_create(self, serializer):
         group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
         serializer.save(group=group, facilitator=self.request.user)
 
 
+class GroupCalendarView(generics.ListAPIView):
+    """
+    Occurrences of a group's sessions starting in [?from, ?to), expanding
+    recurring sessions. Defaults to the next four weeks.
+    """
+    serializer_class = SessionOccurrenceSerializer
+    permission_classes = [permissions.IsAuthenticated, IsGroupMember]
+    
+    def get_queryset(self):
+        group = get_object_or_404(StudyGroup, pk=self.kwargs['group_id'])
+        self.check_object_permissions(self.request, group)
+        start, end = calendar_window(self.request.query_params)
+        return occurrences_between(start, end, group=group)
+
+
+class SessionAttendanceView(APIView):
+    """Bulk check-in or check-out, by the session's facilitator or a group admin/moderator"""
+    permission_classes = [permissions.IsAuthenticated, IsGroupAdmin]
+    serializer_class = BulkAttendanceSerializer
+    
+    def get_session(self, request, pk):
+        session = get_object_or_404(StudySession.objects.select_related('group'), pk=pk)
+        if session.facilitator_id != request.user.id:
+            self.check_object_permissions(request, session)
+        return session
+    
+    def post(self, request, pk):
+        session = self.get_session(request, pk)
+        if session.is_cancelled:
+            return Response({'error': 'Session is cancelled'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = self.apply(session, serializer.validated_data.get('user_ids'))
+        summary = SessionAttendanceSummary.objects.filter(session=session).first()
+        return Response({
+            'results': {str(user_id): result for user_id, result in results.items()},
+            'summary': summary and SessionAttendanceSummarySerializer(summary).data,
+        })
+    
+    def apply(self, session, user_ids):
+        return check_in(session, user_ids)
+
+
+class SessionCheckOutView(SessionAttendanceView):
+    serializer_class = BulkCheckOutSerializer
+    
+    def apply(self, session, user_ids):
+        return check_out(session, user_ids)
+
+
+class SessionAttendanceSummaryView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsGroupMember]
+    
+    def get(self, request, pk):
+        session = get_object_or_404(StudySession.objects.select_related('group'), pk=pk)
+        self.check_object_permissions(request, session)
+        summary = SessionAttendanceSummary.objects.filter(session=session).first()
+        if summary is None:
+            summary = SessionAttendanceSummary(session=session)
+        return Response(SessionAttendanceSummarySerializer(summary).data)
+
+
+class GroupAttendanceSummaryView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsGroupMember]
+    
+    def get(self, request, group_id):
+        group = get_object_or_404(StudyGroup, pk=group_id)
+        self.check_object_permissions(request, group)
+        summary = GroupAttendanceSummary.objects.filter(group=group).first()
+        if summary is None:
+            summary = GroupAttendanceSummary(group=group)
+        return Response(GroupAttendanceSummarySerializer(summary).data)
+
+
+class MySessionsView(generics.ListAPIView):
+    """
+    Session occurrences in [?from, ?to) across all of the user's groups,
+    each listing the sessions it overlaps in conflicts_with.
+    """
+    serializer_class = CalendarOccurrenceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        start, end = calendar_window(self.request.query_params)
+        return user_calendar(self.request.user, start, end)
+
+
+class SessionConflictView(APIView):
+    """
+    Check a proposed session (?start_time, ?end_time and an optional
+    ?recurrence_pattern) against the user's calendar before creating it.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        serializer = SessionConflictCheckSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        conflicts = find_conflicts(request.user, **serializer.validated_data)
+        return Response({
+            'has_conflicts': bool(conflicts),
+            'conflicts': ConflictingOccurrenceSerializer(conflicts, many=True).data,
+        })
+
+
 class MyStudyGroupsView(generics.ListAPIView):
     """Get study groups where user is a member"""
     serializer_class = StudyGroupSerializer
@@ -234,14 +659,26 @@ class MyStudyGroupsView(generics.ListAPIView):
     
     def get_queryset(self):
         user = self.request.user
-        return StudyGroup.objects.filter(members=user, is_active=True).order_by('-created_at')
+        return with_list_relations(
+            StudyGroup.objects.filter(members=user, is_active=True), self.request
+        ).order_by('-created_at')
+
+
+class SuggestedStudyGroupsView(generics.ListAPIView):
+    """Joinable groups of the user's enrolled courses, most active first"""
+    serializer_class = SuggestedStudyGroupSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        groups = with_list_relations(suggested_groups(self.request.user), self.request)
+        return groups[:settings.GROUP_SUGGESTION_LIMIT]
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def group_list_api(request):
     """Legacy API endpoint"""
-    groups = StudyGroup.objects.filter(is_active=True)
+    groups = with_list_relations(StudyGroup.objects.filter(is_active=True), request)
     serializer = StudyGroupSerializer(groups, many=True, context={'request': request})
     return Response(serializer.data)
 